@@ -0,0 +1,247 @@
+"""
+Modo ASGI da API (ex: uvicorn --factory app.asgi:create_asgi_app).
+
+As rotas continuam sendo as do Flask; cada requisição roda num executor
+limitado, separado por faixa: extrações em massa não ocupam as threads das
+consultas curtas. Estourado o prazo da faixa, as consultas da requisição são
+canceladas com interrupt() e o cliente recebe 504 (ou a conexão é encerrada,
+se o streaming já tinha começado).
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from app.db import QUERY_HANDLE_KEY, QueryHandle
+import asyncio
+import contextvars
+import io
+import json
+import logging
+import os
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+# Faixas de execução: (threads, prazo em segundos por requisição)
+ASGI_INTERACTIVE_WORKERS = int(os.environ.get("ASGI_INTERACTIVE_WORKERS", "8"))
+ASGI_INTERACTIVE_TIMEOUT = float(os.environ.get("ASGI_INTERACTIVE_TIMEOUT", "5"))
+ASGI_BULK_WORKERS = int(os.environ.get("ASGI_BULK_WORKERS", "2"))
+ASGI_BULK_TIMEOUT = float(os.environ.get("ASGI_BULK_TIMEOUT", "600"))
+
+# Rotas que vão para a faixa de extração em massa
+BULK_PATHS = ("/terceirizados/export",)
+
+
+class Lane:
+    """Executor limitado com prazo próprio."""
+
+    def __init__(self, name, workers, timeout):
+        self.name = name
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix=f"asgi-{name}"
+        )
+
+
+class RequestTimeout(Exception):
+    """Prazo estourado; `future` é a execução que ainda pode estar em curso."""
+
+    def __init__(self, future):
+        super().__init__()
+        self.future = future
+
+
+def build_environ(scope, body):
+    """Environ WSGI equivalente ao scope HTTP do ASGI."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope["headers"]:
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif name != "CONTENT_LENGTH":
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+async def read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+def create_asgi_app(flask_app=None):
+    """App ASGI sobre as rotas do Flask, com executores limitados por faixa."""
+    if flask_app is None:
+        from app.main import create_app
+
+        flask_app = create_app()
+
+    interactive = Lane(
+        "interactive", ASGI_INTERACTIVE_WORKERS, ASGI_INTERACTIVE_TIMEOUT
+    )
+    bulk = Lane("bulk", ASGI_BULK_WORKERS, ASGI_BULK_TIMEOUT)
+
+    async def run(lane, deadline, handle, context, fn, *args):
+        """
+        Executa `fn` na faixa; estourado o prazo, interrompe as consultas.
+        As chamadas de uma requisição são sequenciais e compartilham o mesmo
+        `context`: o stream_with_context do Flask guarda o app context em
+        contextvars, e cada bloco pode rodar numa thread diferente.
+        """
+        loop = asyncio.get_running_loop()
+        future = lane.executor.submit(context.run, fn, *args)
+        try:
+            return await asyncio.wait_for(
+                asyncio.wrap_future(future, loop=loop),
+                timeout=max(deadline - time.monotonic(), 0),
+            )
+        except asyncio.TimeoutError:
+            # Ainda na fila: cancelado sem nunca rodar. Em execução: interrupt()
+            if not future.cancel():
+                handle.interrupt()
+            raise RequestTimeout(future) from None
+
+    def start(environ):
+        status_headers = []
+
+        def start_response(status, headers, exc_info=None):
+            status_headers[:] = [status, headers]
+
+        iterator = flask_app.wsgi_app(environ, start_response)
+        return iterator, iter(iterator), status_headers
+
+    def next_chunk(chunks):
+        # Pula blocos vazios; None marca o fim
+        for chunk in chunks:
+            if chunk:
+                return chunk
+        return None
+
+    def close(iterator):
+        if hasattr(iterator, "close"):
+            iterator.close()
+
+    def close_after(context, future, iterator=None):
+        """
+        Fecha a resposta (e dispara o teardown do Flask, que fecha o cursor)
+        só depois que a execução interrompida terminar: fechar um gerador que
+        ainda roda em outra thread falha.
+        """
+
+        def done(future):
+            target = iterator
+            if target is None:
+                # Timeout no start(): só há o que fechar se ele chegou a responder
+                if future.cancelled() or future.exception() is not None:
+                    return
+                target = future.result()[0]
+            context.run(close, target)
+
+        future.add_done_callback(done)
+
+    async def send_timeout(send):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 504,
+                "headers": [(b"content-type", b"application/json")],
+            }
+        )
+        await send(
+            {
+                "type": "http.response.body",
+                "body": json.dumps({"error": "Tempo limite excedido"}).encode(),
+            }
+        )
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    interactive.executor.shutdown(wait=False, cancel_futures=True)
+                    bulk.executor.shutdown(wait=False, cancel_futures=True)
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        if scope["type"] != "http":
+            return
+
+        lane = bulk if scope["path"] in BULK_PATHS else interactive
+        deadline = time.monotonic() + lane.timeout
+        handle = QueryHandle()
+        context = contextvars.copy_context()
+
+        environ = build_environ(scope, await read_body(receive))
+        environ[QUERY_HANDLE_KEY] = handle
+
+        try:
+            iterator, chunks, (status, headers) = await run(
+                lane, deadline, handle, context, start, environ
+            )
+        except RequestTimeout as timeout:
+            logger.warning("[ASGI] %s excedeu %ss", scope["path"], lane.timeout)
+            close_after(context, timeout.future)
+            await send_timeout(send)
+            return
+
+        started = False
+        pending = None
+        try:
+            chunk = await run(lane, deadline, handle, context, next_chunk, chunks)
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": int(status.split(" ", 1)[0]),
+                    "headers": [
+                        (name.lower().encode("latin-1"), value.encode("latin-1"))
+                        for name, value in headers
+                    ],
+                }
+            )
+            started = True
+            while chunk is not None:
+                await send(
+                    {"type": "http.response.body", "body": chunk, "more_body": True}
+                )
+                chunk = await run(lane, deadline, handle, context, next_chunk, chunks)
+            await send({"type": "http.response.body", "body": b""})
+        except RequestTimeout as timeout:
+            logger.warning("[ASGI] %s excedeu %ss", scope["path"], lane.timeout)
+            pending = timeout.future
+            if not started:
+                await send_timeout(send)
+            # Com o streaming já iniciado, só resta encerrar a resposta incompleta
+        finally:
+            if pending is not None:
+                close_after(context, pending, iterator)
+            else:
+                # Fecha no executor: dispara o teardown do Flask (fecha o cursor)
+                lane.executor.submit(context.run, close, iterator)
+
+    return app
@@ -0,0 +1,139 @@
+from flask import make_response, request, Response
+from collections import OrderedDict
+from functools import wraps
+from app.db import get_snapshot_version
+import hashlib
+import os
+import threading
+import time
+
+# Orçamento do cache de respostas (bytes do corpo) e validade de cada entrada
+RESPONSE_CACHE_MAX_BYTES = int(
+    os.environ.get("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))
+)
+RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", "3600"))
+
+# Só respostas determinísticas para um snapshot entram no cache
+CACHEABLE_STATUS = (200, 404)
+
+
+class ResponseCache:
+    """
+    LRU com TTL e limite de memória para corpos de resposta já serializados.
+    As entradas pertencem a uma versão do snapshot gold: quando a versão muda,
+    o cache inteiro é descartado.
+    """
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._size = 0
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _check_version(self, version):
+        if version != self._version:
+            self._entries.clear()
+            self._size = 0
+            self._version = version
+
+    def get(self, version, key):
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry["expires"] < time.monotonic():
+                self._evict(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, version, key, status, body, mimetype, etag):
+        size = len(body)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._check_version(version)
+            if key in self._entries:
+                self._evict(key)
+            self._entries[key] = {
+                "status": status,
+                "body": body,
+                "mimetype": mimetype,
+                "etag": etag,
+                "expires": time.monotonic() + self.ttl,
+            }
+            self._size += size
+            while self._size > self.max_bytes:
+                self._evict(next(iter(self._entries)))
+
+    def _evict(self, key):
+        entry = self._entries.pop(key)
+        self._size -= len(entry["body"])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL)
+
+
+def cache_key():
+    """
+    Endpoint + parâmetros de query em ordem canônica. Valores vazios são
+    mantidos: `after=` (início do modo cursor) difere de omitir `after`.
+    """
+    params = sorted(
+        (name, value) for name, values in request.args.lists() for value in values
+    )
+    return (request.path, tuple(params))
+
+
+def make_etag(version, body):
+    return f"{version}-{hashlib.blake2b(body, digest_size=8).hexdigest()}"
+
+
+def cached_response(view):
+    """
+    Serve a resposta do cache quando possível e responde 304 quando o
+    If-None-Match do cliente ainda corresponde ao ETag.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        version = get_snapshot_version()
+        key = cache_key()
+
+        entry = response_cache.get(version, key)
+        if entry is None:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code not in CACHEABLE_STATUS:
+                return response
+
+            body = response.get_data()
+            entry = {
+                "status": response.status_code,
+                "body": body,
+                "mimetype": response.mimetype,
+                "etag": make_etag(version, body),
+            }
+            response_cache.set(version, key, **entry)
+
+        response = Response(
+            entry["body"], status=entry["status"], mimetype=entry["mimetype"]
+        )
+        if response.status_code != 200:
+            return response
+
+        response.set_etag(entry["etag"])
+        # Clientes e proxies podem guardar, mas devem revalidar via ETag
+        response.cache_control.public = True
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+    return wrapper
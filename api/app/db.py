@@ -1,50 +1,698 @@
-from google.cloud import storage
 import duckdb
+from flask import g, has_request_context, request
 from pathlib import Path
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
 
 BUCKET_NAME = "dw-bucket-storage"
 BLOB_NAME = "gold/app_terceirizados/app_terceirizados.parquet"
 
+METRICS_BLOB_NAME = "gold/metricas_terceirizados/metricas_terceirizados.parquet"
+
+# Banco pronto para servir publicado pela pipeline (publish_api_database)
+ARTIFACT_BLOB_NAME = "gold/app_database/app.duckdb"
+ARTIFACT_MANIFEST_BLOB_NAME = "gold/app_database/manifest.json"
+
+# Layout do banco (tabelas, ordenação, índices) montado por build_database e
+# pela pipeline; um artefato com outro layout é ignorado
+DATABASE_LAYOUT = 1
+
 LOCAL_PARQUET_PATH = Path("/tmp/app_terceirizados.parquet")
+LOCAL_METRICS_PATH = Path("/tmp/metricas_terceirizados.parquet")
 LOCAL_DB_PATH = Path("/tmp/app.duckdb")
 
+# Configuração da instância DuckDB compartilhada pelo processo
+DUCKDB_THREADS = int(os.environ.get("DUCKDB_THREADS", "4"))
+DUCKDB_MEMORY_LIMIT = os.environ.get("DUCKDB_MEMORY_LIMIT", "1GB")
+
+# Intervalo (s) entre verificações de novo snapshot no GCS; 0 desliga
+SNAPSHOT_REFRESH_INTERVAL = int(os.environ.get("SNAPSHOT_REFRESH_INTERVAL", "900"))
+
+# Como o snapshot é servido: "table" materializa as tabelas num banco local
+# (consultas mais rápidas, start mais lento); "parquet" cria views sobre o
+# parquet baixado, sem copiar nada (start em segundos, varreduras maiores)
+SNAPSHOT_MODE = os.environ.get("SNAPSHOT_MODE", "table")
+
+# Colunas de busca; cada uma ganha uma cópia da tabela ordenada por (coluna, id)
+SEARCH_COLUMNS = ("cnpj", "cpf", "orgao_superior_sigla")
+
+# Chave do environ WSGI onde o servidor ASGI deixa o QueryHandle da requisição
+QUERY_HANDLE_KEY = "terceirizados.query_handle"
+
+logger = logging.getLogger(__name__)
+
+_database = None
+_database_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+_total_rows = None
+_snapshot_version = None
+_startup_error = None
+# Arquivos lidos pelas views do modo "parquet": os do snapshot atual e os do
+# anterior, que ainda pode ter requisições em andamento
+_snapshot_files = []
+_retired_files = []
+
+
+def side_path(path, version):
+    """Arquivo lateral de `path` para a versão `version` (ex: app.<versão>.duckdb)."""
+    path = Path(path)
+    return path.with_name(f"{path.stem}.{version}{path.suffix}")
+
+
+def remove_side_files(keep=()):
+    """
+    Remove os arquivos laterais de qualquer versão, menos os de `keep`:
+    sobras de refreshes anteriores e de processos que pararam no meio.
+    """
+    keep = {Path(path) for path in keep}
+    for path in (LOCAL_PARQUET_PATH, LOCAL_METRICS_PATH, LOCAL_DB_PATH):
+        for side in path.parent.glob(f"{path.stem}.*{path.suffix}"):
+            if side not in keep:
+                side.unlink(missing_ok=True)
+
+
+def get_blob(blob_name=BLOB_NAME):
+    # Import adiado: o cliente do GCS pesa no start e só é usado aqui
+    from google.cloud import storage
+
+    client = storage.Client()
+    return client.bucket(BUCKET_NAME).get_blob(blob_name)
+
+
+def blobs_version(blob, metrics_blob):
+    """Versão do snapshot: generation do app e, quando publicadas, das métricas."""
+    if metrics_blob is None:
+        return str(blob.generation)
+    return f"{blob.generation}-{metrics_blob.generation}"
+
 
 def download_parquet():
+    """
+    Baixa o snapshot gold e retorna sua versão (None se já existia). App e
+    métricas descem para arquivos laterais e só então viram os locais, as
+    métricas primeiro: com o parquet do app no lugar, as métricas em disco
+    são sempre as do mesmo snapshot (ou nenhuma, se ele não as publicou).
+    """
     if LOCAL_PARQUET_PATH.exists():
-        return
+        return None
 
-    client = storage.Client()
-    bucket = client.bucket(BUCKET_NAME)
-    blob = bucket.blob(BLOB_NAME)
+    blob = get_blob()
+    metrics_blob = get_blob(METRICS_BLOB_NAME)
+    version = blobs_version(blob, metrics_blob)
+    side_parquet = side_path(LOCAL_PARQUET_PATH, version)
+    side_metrics = side_path(LOCAL_METRICS_PATH, version)
 
-    blob.download_to_filename(LOCAL_PARQUET_PATH)
+    try:
+        blob.download_to_filename(side_parquet, if_generation_match=blob.generation)
+        if metrics_blob is not None:
+            metrics_blob.download_to_filename(
+                side_metrics, if_generation_match=metrics_blob.generation
+            )
+    except Exception:
+        side_parquet.unlink(missing_ok=True)
+        side_metrics.unlink(missing_ok=True)
+        raise
 
+    if metrics_blob is not None:
+        os.replace(side_metrics, LOCAL_METRICS_PATH)
+    else:
+        LOCAL_METRICS_PATH.unlink(missing_ok=True)
+    os.replace(side_parquet, LOCAL_PARQUET_PATH)
+    return version
 
-def initialize_duckdb():
+
+def get_artifact_manifest():
+    """Manifesto do banco publicado pela pipeline, ou None se não houver um utilizável."""
+    blob = get_blob(ARTIFACT_MANIFEST_BLOB_NAME)
+    if blob is None:
+        return None
+
+    manifest = json.loads(blob.download_as_bytes())
+    if manifest.get("layout") != DATABASE_LAYOUT:
+        logger.warning(
+            "[SNAPSHOT] Artefato com layout %s ignorado (esperado %s)",
+            manifest.get("layout"),
+            DATABASE_LAYOUT,
+        )
+        return None
+
+    # O banco é montado do gold da mesma execução: se um run posterior trocou
+    # os parquets sem publicar o banco, o manifesto ficou para trás
+    sources = {
+        name: source.generation
+        for name in (BLOB_NAME, METRICS_BLOB_NAME)
+        if (source := get_blob(name)) is not None
+    }
+    if manifest.get("sources") != sources:
+        logger.warning(
+            "[SNAPSHOT] Artefato %s ignorado: o gold mudou desde a publicação",
+            manifest.get("version"),
+        )
+        return None
+    return manifest
+
+
+def schema_hash(con, schema="ouro", table="app_terceirizados"):
+    """Hash das colunas (nome e tipo, em ordem), calculado igual na pipeline."""
+    columns = con.execute(
+        """
+        SELECT column_name, data_type
+        FROM information_schema.columns
+        WHERE table_schema = ? AND table_name = ?
+        ORDER BY ordinal_position
+        """,
+        [schema, table],
+    ).fetchall()
+    return hashlib.sha256(json.dumps(columns).encode()).hexdigest()
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def verify_artifact(db_path, manifest):
     """
-    Cria banco local e registra tabela ouro.app_terceirizados
+    Confere o banco baixado contra o manifesto: bytes (tamanho e sha256), total
+    de linhas, schema e versão. Todas as réplicas servem o mesmo arquivo, ou nenhum.
     """
-    if LOCAL_DB_PATH.exists():
-        return
+    if Path(db_path).stat().st_size != manifest["size"]:
+        raise ValueError("Artefato com tamanho diferente do manifesto")
+    if file_sha256(db_path) != manifest["sha256"]:
+        raise ValueError("Artefato com sha256 diferente do manifesto")
 
-    download_parquet()
+    con = duckdb.connect(str(db_path), read_only=True)
+    try:
+        row_count = con.execute(
+            "SELECT COUNT(*) FROM ouro.app_terceirizados"
+        ).fetchone()[0]
+        if row_count != manifest["row_count"]:
+            raise ValueError(
+                f"Artefato com {row_count} linhas, manifesto diz {manifest['row_count']}"
+            )
+        if schema_hash(con) != manifest["schema_hash"]:
+            raise ValueError("Artefato com schema diferente do manifesto")
+        version = con.execute("SELECT version FROM ouro.app_snapshot").fetchone()[0]
+        if version != manifest["version"]:
+            raise ValueError(
+                f"Artefato na versão {version}, manifesto diz {manifest['version']}"
+            )
+    finally:
+        con.close()
 
-    con = duckdb.connect(str(LOCAL_DB_PATH))
+
+def download_artifact(manifest, db_path):
+    """Baixa a generation do banco indicada no manifesto e a valida."""
+    blob = get_blob(ARTIFACT_BLOB_NAME)
+    if blob is None:
+        raise ValueError(f"{ARTIFACT_BLOB_NAME} não encontrado no bucket")
+
+    blob.download_to_filename(db_path, if_generation_match=manifest["generation"])
+    verify_artifact(db_path, manifest)
+
+
+def build_database(db_path, parquet_path, version=None, metrics_path=None):
+    """
+    Materializa ouro.app_terceirizados ordenada por id_terceirizado, para que
+    os zonemaps podem os row groups, e com índice ART na chave de busca.
+    Se houver parquet de métricas, carrega também ouro.metricas_terceirizados.
+    A versão do snapshot fica gravada junto, em ouro.app_snapshot.
+    """
+    has_metrics = metrics_path is not None and Path(metrics_path).exists()
+    if version is None:
+        version = local_version(parquet_path, metrics_path)
+
+    con = duckdb.connect(str(db_path))
 
     # Cria schema
     con.execute("CREATE SCHEMA IF NOT EXISTS ouro;")
 
-    # Cria tabela a partir do parquet
+    # Cria tabela a partir do parquet, já ordenada pela chave de busca
     con.execute(
         f"""
         CREATE TABLE ouro.app_terceirizados AS
-        SELECT * FROM read_parquet('{LOCAL_PARQUET_PATH}');
+        SELECT * FROM read_parquet('{parquet_path}')
+        ORDER BY id_terceirizado;
+    """
+    )
+    con.execute(
+        """
+        CREATE INDEX idx_app_terceirizados_id
+        ON ouro.app_terceirizados (id_terceirizado);
     """
     )
 
+    # Cópias ordenadas por coluna de busca: os registros de um mesmo valor ficam
+    # contíguos e em ordem de id, e os zonemaps descartam o resto da tabela
+    for column in SEARCH_COLUMNS:
+        con.execute(
+            f"""
+            CREATE TABLE ouro.app_terceirizados_por_{column} AS
+            SELECT * FROM ouro.app_terceirizados
+            ORDER BY {column}, id_terceirizado;
+        """
+        )
+
+    # Agregados do mart metricas_terceirizados, na ordem dos filtros da API
+    if has_metrics:
+        con.execute(
+            f"""
+            CREATE TABLE ouro.metricas_terceirizados AS
+            SELECT * FROM read_parquet('{metrics_path}')
+            ORDER BY id_tempo, orgao_superior_sigla, id_categoria_profissional;
+        """
+        )
+
+    con.execute(
+        "CREATE TABLE ouro.app_snapshot AS SELECT ?::VARCHAR AS version;", [version]
+    )
+    con.execute("CHECKPOINT;")
+
     con.close()
 
 
-def get_connection():
+def initialize_duckdb():
+    """
+    Cria banco local e registra tabela ouro.app_terceirizados
+    """
+    if LOCAL_DB_PATH.exists():
+        return
+
+    # Constrói ao lado e renomeia: um start interrompido não deixa banco pela metade
+    building = LOCAL_DB_PATH.with_name(f"{LOCAL_DB_PATH.name}.building")
+    building.unlink(missing_ok=True)
+
+    # Com o banco publicado pela pipeline, basta baixá-lo; senão, monta do
+    # parquet. Sem acesso ao GCS, um parquet já baixado basta para subir
+    try:
+        manifest = get_artifact_manifest()
+    except Exception:
+        if not LOCAL_PARQUET_PATH.exists():
+            raise
+        logger.warning(
+            "[SNAPSHOT] Manifesto indisponível; montando do parquet local",
+            exc_info=True,
+        )
+        manifest = None
+
+    if manifest is not None:
+        download_artifact(manifest, building)
+    else:
+        version = download_parquet()
+        build_database(building, LOCAL_PARQUET_PATH, version, LOCAL_METRICS_PATH)
+    os.replace(building, LOCAL_DB_PATH)
+
+
+def snapshot_version(path):
+    """Identificador do snapshot gold a partir do arquivo local (mtime + tamanho)."""
+    stat = Path(path).stat()
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+
+def local_version(parquet_path, metrics_path=None):
+    """Versão do snapshot a partir dos arquivos locais de app e de métricas."""
+    version = snapshot_version(parquet_path)
+    if metrics_path is not None and Path(metrics_path).exists():
+        version += "-" + snapshot_version(metrics_path)
+    return version
+
+
+def duckdb_config():
+    return {
+        "threads": DUCKDB_THREADS,
+        "memory_limit": DUCKDB_MEMORY_LIMIT,
+        # Páginas pequenas com ORDER BY + LIMIT: a materialização tardia
+        # relê a tabela por rowid e custa mais que ler as 4 colunas direto
+        "late_materialization_max_rows": 0,
+    }
+
+
+def open_database(db_path):
+    """Abre o banco em modo leitura e retorna a conexão e a versão do snapshot."""
+    database = duckdb.connect(str(db_path), read_only=True, config=duckdb_config())
+    version = database.execute("SELECT version FROM ouro.app_snapshot").fetchone()[0]
+    return database, version
+
+
+def open_parquet(parquet_path, version=None, metrics_path=None):
+    """
+    Instância em memória com views sobre os parquets, no lugar das tabelas de
+    build_database: nada é copiado, e cada consulta lê o arquivo direto. As
+    cópias por coluna de busca viram a própria tabela (sem a ordenação).
+    """
+    has_metrics = metrics_path is not None and Path(metrics_path).exists()
+    if version is None:
+        version = local_version(parquet_path, metrics_path)
+
+    database = duckdb.connect(":memory:", config=duckdb_config())
+    database.execute("CREATE SCHEMA ouro;")
+    database.execute(
+        f"""
+        CREATE VIEW ouro.app_terceirizados AS
+        SELECT * FROM read_parquet('{parquet_path}');
+    """
+    )
+    for column in SEARCH_COLUMNS:
+        database.execute(
+            f"""
+            CREATE VIEW ouro.app_terceirizados_por_{column} AS
+            SELECT * FROM ouro.app_terceirizados;
+        """
+        )
+    if has_metrics:
+        database.execute(
+            f"""
+            CREATE VIEW ouro.metricas_terceirizados AS
+            SELECT * FROM read_parquet('{metrics_path}');
+        """
+        )
+    database.execute(
+        "CREATE TABLE ouro.app_snapshot AS SELECT ?::VARCHAR AS version;", [version]
+    )
+    return database, version
+
+
+def link_snapshot_file(path, target):
+    """Aponta `target` (hard link) para o conteúdo de `path`, trocando-o de uma vez."""
+    building = Path(target).with_name(f"{Path(target).name}.building")
+    building.unlink(missing_ok=True)
+    os.link(path, building)
+    os.replace(building, target)
+
+
+def load_snapshot():
+    """Abre o snapshot local (baixando-o se preciso) no modo SNAPSHOT_MODE."""
+    global _snapshot_files
+
+    remove_side_files()
+
+    if SNAPSHOT_MODE == "parquet":
+        version = download_parquet() or local_version(
+            LOCAL_PARQUET_PATH, LOCAL_METRICS_PATH
+        )
+        # As views leem links com a versão no nome, não os arquivos locais, que
+        # o refresh substitui enquanto ainda há requisições no snapshot antigo
+        _snapshot_files = []
+        for path in (LOCAL_PARQUET_PATH, LOCAL_METRICS_PATH):
+            if path.exists():
+                link_snapshot_file(path, side_path(path, version))
+                _snapshot_files.append(side_path(path, version))
+        return open_parquet(
+            side_path(LOCAL_PARQUET_PATH, version),
+            version,
+            side_path(LOCAL_METRICS_PATH, version),
+        )
+
     initialize_duckdb()
-    return duckdb.connect(str(LOCAL_DB_PATH))
+    return open_database(LOCAL_DB_PATH)
+
+
+def count_rows(database):
+    """COUNT(*) de ouro.app_terceirizados na instância `database`."""
+    cursor = database.cursor()
+    try:
+        return cursor.execute("SELECT COUNT(*) FROM ouro.app_terceirizados").fetchone()[
+            0
+        ]
+    finally:
+        cursor.close()
+
+
+def get_database():
+    """
+    Conexão única do processo, aberta em modo leitura. Todas as requisições
+    compartilham a mesma instância (e o buffer cache) do DuckDB.
+    """
+    global _database, _snapshot_version, _total_rows, _startup_error
+
+    if _database is None:
+        with _database_lock:
+            if _database is None:
+                start = time.perf_counter()
+                try:
+                    database, version = load_snapshot()
+                    total_rows = count_rows(database)
+                except Exception as error:
+                    _startup_error = error
+                    raise
+                _database, _snapshot_version, _total_rows = (
+                    database,
+                    version,
+                    total_rows,
+                )
+                _startup_error = None
+                logger.info(
+                    "[SNAPSHOT] Snapshot %s aberto em %.2fs (modo %s)",
+                    _snapshot_version,
+                    time.perf_counter() - start,
+                    SNAPSHOT_MODE,
+                )
+    return _database
+
+
+def start_database_loader():
+    """
+    Abre o snapshot numa thread daemon, para o servidor aceitar conexões (e
+    responder à liveness) sem esperar o download e a carga. Requisições que
+    chegam antes aguardam em get_database().
+    """
+
+    def load():
+        try:
+            get_database()
+        except Exception:
+            logger.exception("[SNAPSHOT] Falha ao abrir o snapshot")
+
+    thread = threading.Thread(target=load, name="snapshot-loader", daemon=True)
+    thread.start()
+    return thread
+
+
+def is_ready():
+    """True quando o snapshot já está aberto e as consultas não vão esperar."""
+    return _database is not None
+
+
+def get_startup_error():
+    """Erro da última tentativa de abrir o snapshot, se ainda não abriu."""
+    return _startup_error
+
+
+def swap_database(database, version):
+    """
+    Troca a instância compartilhada. A antiga não é fechada explicitamente:
+    fechar a conexão derruba os cursores das requisições em andamento, e a
+    instância é liberada sozinha quando o último cursor fecha. O total de
+    linhas é contado antes e trocado junto, sob o mesmo lock.
+    """
+    global _database, _snapshot_version, _total_rows
+
+    total_rows = count_rows(database)
+    with _database_lock:
+        _database, _snapshot_version, _total_rows = database, version, total_rows
+
+
+def refresh_snapshot():
+    """
+    Verifica a versão do banco publicado pela pipeline (ou, sem ele, a
+    generation dos blobs gold) e, se mudou, baixa e materializa o novo
+    snapshot em arquivos laterais antes de trocá-lo pelo atual. Nenhuma
+    requisição enxerga uma tabela pela metade.
+    """
+    with _refresh_lock:
+        manifest = get_artifact_manifest() if SNAPSHOT_MODE == "table" else None
+        if manifest is not None:
+            return refresh_from_artifact(manifest)
+
+        blob = get_blob()
+        if blob is None:
+            logger.warning("[SNAPSHOT] %s não encontrado no bucket", BLOB_NAME)
+            return False
+
+        metrics_blob = get_blob(METRICS_BLOB_NAME)
+        version = blobs_version(blob, metrics_blob)
+        if version == get_snapshot_version():
+            return False
+
+        side_parquet = side_path(LOCAL_PARQUET_PATH, version)
+        side_metrics = side_path(LOCAL_METRICS_PATH, version)
+        side_db = side_path(LOCAL_DB_PATH, version)
+        side_db.unlink(missing_ok=True)
+
+        try:
+            blob.download_to_filename(side_parquet, if_generation_match=blob.generation)
+            if metrics_blob is not None:
+                metrics_blob.download_to_filename(
+                    side_metrics, if_generation_match=metrics_blob.generation
+                )
+            if SNAPSHOT_MODE == "parquet":
+                database, version = open_parquet(side_parquet, version, side_metrics)
+            else:
+                build_database(side_db, side_parquet, version, side_metrics)
+                database, version = open_database(side_db)
+        except Exception:
+            side_parquet.unlink(missing_ok=True)
+            side_metrics.unlink(missing_ok=True)
+            side_db.unlink(missing_ok=True)
+            raise
+
+        swap_database(database, version)
+
+        if SNAPSHOT_MODE == "parquet":
+            # As views abrem o arquivo a cada consulta: os laterais ficam onde
+            # estão e os locais passam a apontar para eles, para um próximo
+            # start. Saem os laterais do penúltimo snapshot, já sem requisições
+            if metrics_blob is not None:
+                link_snapshot_file(side_metrics, LOCAL_METRICS_PATH)
+            else:
+                LOCAL_METRICS_PATH.unlink(missing_ok=True)
+            link_snapshot_file(side_parquet, LOCAL_PARQUET_PATH)
+            retire_snapshot_files(
+                [path for path in (side_parquet, side_metrics) if path.exists()]
+            )
+            logger.info("[SNAPSHOT] Novo snapshot carregado (generation %s)", version)
+            return True
+
+        # Os arquivos laterais passam a ser os atuais, usados num próximo start.
+        # A instância aberta segue o arquivo renomeado.
+        os.replace(side_db, LOCAL_DB_PATH)
+        os.replace(side_parquet, LOCAL_PARQUET_PATH)
+        if metrics_blob is not None:
+            os.replace(side_metrics, LOCAL_METRICS_PATH)
+        else:
+            LOCAL_METRICS_PATH.unlink(missing_ok=True)
+        remove_side_files()
+
+        logger.info("[SNAPSHOT] Novo snapshot carregado (generation %s)", version)
+        return True
+
+
+def refresh_from_artifact(manifest):
+    """Troca o snapshot pelo banco publicado pela pipeline, se a versão mudou."""
+    version = manifest["version"]
+    if version == get_snapshot_version():
+        return False
+
+    side_db = side_path(LOCAL_DB_PATH, version)
+    side_db.unlink(missing_ok=True)
+    try:
+        download_artifact(manifest, side_db)
+        database, version = open_database(side_db)
+    except Exception:
+        side_db.unlink(missing_ok=True)
+        raise
+
+    swap_database(database, version)
+    os.replace(side_db, LOCAL_DB_PATH)
+    # Os parquets locais são de um snapshot anterior: o banco publicado já
+    # traz app e métricas, e um rebuild precisa baixá-los de novo
+    LOCAL_PARQUET_PATH.unlink(missing_ok=True)
+    LOCAL_METRICS_PATH.unlink(missing_ok=True)
+    remove_side_files()
+
+    logger.info("[SNAPSHOT] Novo artefato carregado (versão %s)", version)
+    return True
+
+
+def retire_snapshot_files(files):
+    """
+    Passa `files` a arquivos do snapshot atual e os atuais a do anterior; os
+    laterais de qualquer outra versão são removidos.
+    """
+    global _snapshot_files, _retired_files
+
+    _retired_files, _snapshot_files = _snapshot_files, files
+    remove_side_files(keep=_snapshot_files + _retired_files)
+
+
+def start_snapshot_refresher(interval=SNAPSHOT_REFRESH_INTERVAL):
+    """Verifica periodicamente, numa thread daemon, se há novo snapshot no GCS."""
+    if interval <= 0:
+        return None
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                refresh_snapshot()
+            except Exception:
+                logger.exception("[SNAPSHOT] Falha ao atualizar o snapshot")
+
+    thread = threading.Thread(target=loop, name="snapshot-refresher", daemon=True)
+    thread.start()
+    return thread
+
+
+def get_snapshot_version():
+    """Versão do snapshot servido pela instância compartilhada."""
+    get_database()
+    return _snapshot_version
+
+
+def get_total_rows():
+    """
+    Total de linhas de ouro.app_terceirizados. A tabela só muda com um novo
+    snapshot, então o COUNT(*) roda ao abri-lo e é trocado junto com ele.
+    """
+    get_database()
+    return _total_rows
+
+
+class QueryHandle:
+    """
+    Cursores DuckDB abertos por uma requisição. O servidor ASGI guarda o
+    handle para interromper as consultas quando a requisição estoura o prazo.
+    """
+
+    def __init__(self):
+        self._cursors = []
+        self._interrupted = False
+        self._lock = threading.Lock()
+
+    def register(self, cursor):
+        with self._lock:
+            self._cursors.append(cursor)
+            interrupted = self._interrupted
+        if interrupted:
+            cursor.interrupt()
+
+    def interrupt(self):
+        with self._lock:
+            self._interrupted = True
+            cursors = list(self._cursors)
+        for cursor in cursors:
+            try:
+                cursor.interrupt()
+            except duckdb.Error:
+                # Cursor já fechado: a consulta terminou antes do prazo
+                pass
+
+
+def open_cursor():
+    """Cursor da instância compartilhada, registrado no QueryHandle da requisição."""
+    cursor = get_database().cursor()
+    if has_request_context():
+        handle = request.environ.get(QUERY_HANDLE_KEY)
+        if handle is not None:
+            handle.register(cursor)
+    return cursor
+
+
+def get_connection():
+    """Cursor da requisição atual; é fechado no teardown do app context."""
+    if "duckdb_cursor" not in g:
+        g.duckdb_cursor = open_cursor()
+    return g.duckdb_cursor
+
+
+def close_connection(exception=None):
+    cursor = g.pop("duckdb_cursor", None)
+    if cursor is not None:
+        cursor.close()
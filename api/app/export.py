@@ -0,0 +1,53 @@
+import io
+
+ARROW_MIMETYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MIMETYPE = "application/vnd.apache.parquet"
+
+# Formato pedido em ?format= -> (mimetype, extensão do arquivo)
+EXPORT_FORMATS = {
+    "arrow": (ARROW_MIMETYPE, "arrows"),
+    "parquet": (PARQUET_MIMETYPE, "parquet"),
+}
+
+# Linhas por record batch lido do DuckDB (e por row group no parquet)
+EXPORT_BATCH_SIZE = 100_000
+
+
+def drain(sink):
+    """Retorna o que foi escrito no buffer desde a última chamada e o esvazia."""
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
+
+
+def iter_arrow_stream(reader):
+    """Serializa um RecordBatchReader em Arrow IPC (stream), batch a batch."""
+    # pyarrow só é importado na primeira extração, fora do caminho do start
+    import pyarrow as pa
+
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, reader.schema) as writer:
+        yield drain(sink)
+        for batch in reader:
+            writer.write_batch(batch)
+            yield drain(sink)
+    yield drain(sink)
+
+
+def iter_parquet(reader):
+    """Serializa um RecordBatchReader em Parquet, um row group por batch."""
+    import pyarrow.parquet as pq
+
+    sink = io.BytesIO()
+    with pq.ParquetWriter(sink, reader.schema, compression="zstd") as writer:
+        for batch in reader:
+            writer.write_batch(batch, row_group_size=EXPORT_BATCH_SIZE)
+            yield drain(sink)
+    yield drain(sink)
+
+
+EXPORT_WRITERS = {
+    "arrow": iter_arrow_stream,
+    "parquet": iter_parquet,
+}
@@ -1,17 +1,31 @@
 from flask import Flask
 from app.routes.terceirizados import terceirizados_bp
-from app.db import initialize_duckdb
-from flasgger import Swagger
+from app.routes.metricas import metricas_bp
+from app.routes.health import health_bp
+from app.db import close_connection, start_database_loader, start_snapshot_refresher
+import os
+
+# Documentação em /apidocs; desligar poupa o import do flasgger no start
+API_DOCS_ENABLED = os.environ.get("API_DOCS_ENABLED", "1") == "1"
 
 
 def create_app():
     app = Flask(__name__)
 
-    # Inicializa banco ao subir aplicação
-    initialize_duckdb()
-    Swagger(app)
+    # Abre o snapshot em segundo plano: o servidor sobe sem esperar a carga,
+    # e /health/ready só responde 200 quando o banco estiver aberto
+    start_database_loader()
+    start_snapshot_refresher()
+    app.teardown_appcontext(close_connection)
+
+    if API_DOCS_ENABLED:
+        from flasgger import Swagger
+
+        Swagger(app)
 
     app.register_blueprint(terceirizados_bp)
+    app.register_blueprint(metricas_bp)
+    app.register_blueprint(health_bp)
 
     return app
 
@@ -19,4 +33,4 @@ def create_app():
 app = create_app()
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=8000)
+    app.run(host="0.0.0.0", port=8000, threaded=True)
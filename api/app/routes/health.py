@@ -0,0 +1,40 @@
+from flask import Blueprint, jsonify
+from app.db import get_snapshot_version, get_startup_error, is_ready
+
+health_bp = Blueprint("health", __name__)
+
+
+@health_bp.route("/health/live", methods=["GET"])
+def live():
+    """
+    Liveness: o processo está de pé e respondendo
+    ---
+    tags:
+      - Health
+    responses:
+      200:
+        description: Processo vivo
+    """
+    return jsonify({"status": "ok"})
+
+
+@health_bp.route("/health/ready", methods=["GET"])
+def ready():
+    """
+    Readiness: o snapshot está aberto e as consultas respondem sem esperar
+    ---
+    tags:
+      - Health
+    responses:
+      200:
+        description: Pronto para receber tráfego
+      503:
+        description: Snapshot ainda carregando (ou falhou ao carregar)
+    """
+    if not is_ready():
+        error = get_startup_error()
+        if error is not None:
+            return jsonify({"status": "erro", "error": str(error)}), 503
+        return jsonify({"status": "carregando"}), 503
+
+    return jsonify({"status": "ok", "snapshot": get_snapshot_version()})
@@ -0,0 +1,198 @@
+from flask import Blueprint, request, jsonify
+from app.cache import cached_response
+from app.db import get_connection
+from app.routes.terceirizados import json_page_response
+import duckdb
+
+metricas_bp = Blueprint("metricas", __name__)
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# id_orgao_superior é um hash de 64 bits: vai como string para não perder
+# precisão em clientes JavaScript
+
+# Recorte por órgão superior: só medidas aditivas entre categorias; médias são
+# recalculadas a partir das somas, divididas pelos vínculos com valor
+# informado (qtd_salarios/qtd_custos), e percentis não se somam
+ORGAOS_SQL = """
+    SELECT
+        id_tempo,
+        id_orgao_superior::VARCHAR AS id_orgao_superior,
+        any_value(orgao_superior_sigla) AS orgao_superior_sigla,
+        any_value(unidade_gestora_nome) AS unidade_gestora_nome,
+        SUM(qtd_vinculos) AS qtd_vinculos,
+        SUM(salario_total) AS salario_total,
+        SUM(salario_total) / SUM(qtd_salarios) AS salario_medio,
+        SUM(custo_total) AS custo_total,
+        SUM(custo_total) / SUM(qtd_custos) AS custo_medio
+    FROM ouro.metricas_terceirizados
+    {where}
+    GROUP BY id_tempo, id_orgao_superior
+"""
+
+METRICAS_SQL = """
+    SELECT * REPLACE (id_orgao_superior::VARCHAR AS id_orgao_superior)
+    FROM ouro.metricas_terceirizados
+    {where}
+"""
+
+
+def parse_filters(columns):
+    """Filtros de igualdade presentes na query; id_* e id_tempo são inteiros."""
+    filters = {}
+    for column in columns:
+        value = request.args.get(column)
+        if value:
+            filters[column] = int(value) if column.startswith("id_") else value
+    return filters
+
+
+def query_metricas(base_sql, filters, order_by):
+    """
+    Executa a consulta de métricas paginada por b_start/limit e devolve a
+    resposta JSON com o total de linhas do recorte.
+    """
+    try:
+        b_start = int(request.args.get("b_start", 0))
+        limit = int(request.args.get("limit", DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({"error": "Parâmetros inválidos"}), 400
+
+    if b_start < 0:
+        return jsonify({"error": "b_start deve ser >= 0"}), 400
+
+    if limit <= 0:
+        return jsonify({"error": "limit deve ser > 0"}), 400
+
+    if limit > MAX_LIMIT:
+        limit = MAX_LIMIT
+
+    where = ""
+    if filters:
+        where = "WHERE " + " AND ".join(f"{column} = ?" for column in filters)
+    sql = base_sql.format(where=where)
+    params = list(filters.values())
+
+    conn = get_connection()
+    try:
+        total = conn.execute(f"SELECT COUNT(*) FROM ({sql})", params).fetchone()[0]
+        rows = conn.execute(
+            f"""
+            SELECT to_json(page)::VARCHAR
+            FROM ({sql} ORDER BY {order_by} LIMIT ? OFFSET ?) AS page
+            """,
+            [*params, limit, b_start],
+        ).fetchall()
+    except (duckdb.CatalogException, duckdb.BinderException):
+        # Snapshot publicado antes do mart de métricas (ou das colunas usadas
+        # aqui) existir
+        return jsonify({"error": "Métricas indisponíveis"}), 503
+
+    next_start = b_start + limit if (b_start + limit) < total else None
+
+    return json_page_response(
+        {
+            **filters,
+            "b_start": b_start,
+            "limit": limit,
+            "total": total,
+            "next": next_start,
+        },
+        rows,
+    )
+
+
+@metricas_bp.route("/metricas", methods=["GET"])
+@cached_response
+def list_metricas():
+    """
+    Métricas mensais por órgão superior e categoria profissional
+    ---
+    description: |
+        Agregados pré-calculados (mart metricas_terceirizados): quantidade de
+        vínculos e terceirizados, soma, média, mediana e p90 de salário e
+        custo, por id_tempo x órgão superior x categoria profissional.
+    parameters:
+      - name: id_tempo
+        in: query
+        type: integer
+        required: false
+        description: Mês de referência (AAAAMM)
+      - name: orgao_superior_sigla
+        in: query
+        type: string
+        required: false
+      - name: id_categoria_profissional
+        in: query
+        type: integer
+        required: false
+      - name: b_start
+        in: query
+        type: integer
+        required: false
+      - name: limit
+        in: query
+        type: integer
+        required: false
+    responses:
+        200:
+            description: Lista paginada de métricas
+        503:
+            description: Métricas ainda não publicadas na camada gold
+    """
+    try:
+        filters = parse_filters(
+            ("id_tempo", "orgao_superior_sigla", "id_categoria_profissional")
+        )
+    except ValueError:
+        return jsonify({"error": "Parâmetros inválidos"}), 400
+
+    return query_metricas(
+        METRICAS_SQL,
+        filters,
+        "id_tempo DESC, orgao_superior_sigla, id_categoria_profissional",
+    )
+
+
+@metricas_bp.route("/metricas/orgaos", methods=["GET"])
+@cached_response
+def list_metricas_orgaos():
+    """
+    Métricas mensais por órgão superior
+    ---
+    description: |
+        Totais mensais por órgão superior, somando as categorias
+        profissionais: quantidade de vínculos, soma e média de salário e custo.
+    parameters:
+      - name: id_tempo
+        in: query
+        type: integer
+        required: false
+        description: Mês de referência (AAAAMM)
+      - name: orgao_superior_sigla
+        in: query
+        type: string
+        required: false
+      - name: b_start
+        in: query
+        type: integer
+        required: false
+      - name: limit
+        in: query
+        type: integer
+        required: false
+    responses:
+        200:
+            description: Lista paginada de métricas por órgão superior
+        503:
+            description: Métricas ainda não publicadas na camada gold
+    """
+    try:
+        filters = parse_filters(("id_tempo", "orgao_superior_sigla"))
+    except ValueError:
+        return jsonify({"error": "Parâmetros inválidos"}), 400
+
+    return query_metricas(
+        ORGAOS_SQL, filters, "id_tempo DESC, orgao_superior_sigla, id_orgao_superior"
+    )
@@ -1,5 +1,10 @@
-from flask import Blueprint, request, jsonify
-from app.db import get_connection
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from app.db import SEARCH_COLUMNS, get_connection, get_total_rows, open_cursor
+from app.cache import cached_response
+from app.export import EXPORT_BATCH_SIZE, EXPORT_FORMATS, EXPORT_WRITERS
+import base64
+import duckdb
+import json
 
 terceirizados_bp = Blueprint("terceirizados", __name__)
 
@@ -7,7 +12,63 @@ DEFAULT_LIMIT = 20
 MAX_LIMIT = 200
 
 
+def encode_cursor(id_terceirizado):
+    """Cursor opaco com a última chave de ordenação da página."""
+    token = base64.urlsafe_b64encode(str(id_terceirizado).encode()).decode()
+    return token.rstrip("=")
+
+
+def decode_cursor(cursor):
+    padding = "=" * (-len(cursor) % 4)
+    return int(base64.urlsafe_b64decode((cursor + padding).encode()).decode())
+
+
+def next_cursor(rows, limit):
+    """
+    Cursor da próxima página a partir das `limit + 1` linhas buscadas (a
+    linha extra só indica que há mais), ou None na última página.
+    """
+    if limit <= 0 or len(rows) <= limit:
+        return None
+    return encode_cursor(rows[limit - 1][1])
+
+
+def fetch_json_rows(conn, page_sql, params, extra_sql="NULL", extra_params=()):
+    """
+    Executa a consulta da página com cada linha já serializada pelo DuckDB
+    (to_json), sem dicts em Python. Retorna tuplas (json, id_terceirizado,
+    resultado de `extra_sql`).
+    """
+    return conn.execute(
+        f"""
+        SELECT to_json(page)::VARCHAR, page.id_terceirizado, ({extra_sql})
+        FROM ({page_sql}) AS page
+        """,
+        [*extra_params, *params],
+    ).fetchall()
+
+
+def json_page_response(envelope, rows):
+    """
+    Resposta com o envelope serializado e `data` montado a partir do JSON de
+    cada linha. O corpo é montado inteiro: as páginas são limitadas a
+    MAX_LIMIT linhas e passam pelo cache de respostas, que guarda o corpo
+    completo; downloads grandes ficam com /terceirizados/export.
+    """
+    head = json.dumps(envelope, separators=(",", ":"))[:-1]
+    data = ",".join(row[0] for row in rows)
+    body = head + (',"data":[' if envelope else '"data":[') + data + "]}\n"
+    return Response(body, mimetype="application/json")
+
+
+def parse_bool(value, default):
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "sim")
+
+
 @terceirizados_bp.route("/terceirizados", methods=["GET"])
+@cached_response
 def list_terceirizados():
     """
     Lista terceirizados com paginação
@@ -15,39 +76,87 @@ def list_terceirizados():
     description: |
         Retorna os valores presentes na camada gold.
 
-        A paginação é controlada pelos parâmetros:
-        - b_start
-        - limit
-        parameters:
-        - name: b_start
-            in: query
-            type: integer
-            required: false
-        - name: limit
-            in: query
-            type: integer
-            required: false
+        A paginação pode ser feita de dois modos:
+        - b_start + limit: offset tradicional (compatibilidade).
+        - after + limit: cursor (keyset). Use o valor de `next` da página
+          anterior em `after`; a busca vai direto à chave, sem custo de offset.
+
+        `total` vem do metadado em cache da tabela; no modo cursor só é
+        retornado com include_total=true.
+    parameters:
+      - name: b_start
+        in: query
+        type: integer
+        required: false
+      - name: after
+        in: query
+        type: string
+        required: false
+      - name: limit
+        in: query
+        type: integer
+        required: false
+      - name: include_total
+        in: query
+        type: boolean
+        required: false
     responses:
         200:
             description: Lista paginada retornada com sucesso
     """
+    after = request.args.get("after")
     try:
         b_start = int(request.args.get("b_start", 0))
         limit = int(request.args.get("limit", DEFAULT_LIMIT))
+        after_id = decode_cursor(after) if after else None
     except ValueError:
         return jsonify({"error": "Parâmetros inválidos"}), 400
 
     if b_start < 0:
         return jsonify({"error": "b_start deve ser >= 0"}), 400
 
+    if limit <= 0:
+        return jsonify({"error": "limit deve ser > 0"}), 400
+
+    # after vazio (primeira página do modo cursor) também conta como cursor
+    if after is not None and "b_start" in request.args:
+        return jsonify({"error": "Use b_start ou after, não os dois"}), 400
+
     if limit > MAX_LIMIT:
         limit = MAX_LIMIT
 
     conn = get_connection()
 
-    total = conn.execute("SELECT COUNT(*) FROM ouro.app_terceirizados").fetchone()[0]
+    if after is not None:
+        # Keyset: busca direto pela chave de ordenação, uma linha a mais
+        # para saber se existe próxima página
+        # after vazio começa do início da tabela
+        seek = "WHERE id_terceirizado > ?" if after_id is not None else ""
+        params = [after_id, limit + 1] if after_id is not None else [limit + 1]
+        rows = fetch_json_rows(
+            conn,
+            f"""
+            SELECT *
+            FROM ouro.app_terceirizados
+            {seek}
+            ORDER BY id_terceirizado
+            LIMIT ?
+            """,
+            params,
+        )
 
-    rows = conn.execute(
+        response = {
+            "after": after,
+            "limit": limit,
+            "next": next_cursor(rows, limit),
+        }
+        rows = rows[:limit]
+        if parse_bool(request.args.get("include_total"), default=False):
+            response["total"] = get_total_rows()
+        return json_page_response(response, rows)
+
+    rows = fetch_json_rows(
+        conn,
         """
         SELECT *
         FROM ouro.app_terceirizados
@@ -56,28 +165,26 @@ def list_terceirizados():
         OFFSET ?
         """,
         [limit, b_start],
-    ).fetchall()
-
-    columns = [desc[0] for desc in conn.description]
-
-    data = [dict(zip(columns, row)) for row in rows]
-
-    conn.close()
+    )
 
+    total = get_total_rows()
     next_start = b_start + limit if (b_start + limit) < total else None
 
-    return jsonify(
-        {
-            "b_start": b_start,
-            "limit": limit,
-            "total": total,
-            "next": next_start,
-            "data": data,
-        }
-    )
+    response = {
+        "b_start": b_start,
+        "limit": limit,
+        "next": next_start,
+    }
+    if parse_bool(request.args.get("include_total"), default=True):
+        response["total"] = total
+    # Primeira página já entrega o cursor para quem quiser migrar para o modo keyset
+    if b_start == 0 and rows and next_start is not None:
+        response["next_cursor"] = encode_cursor(rows[-1][1])
+    return json_page_response(response, rows)
 
 
 @terceirizados_bp.route("/terceirizados/<int:id_terceirizado>", methods=["GET"])
+@cached_response
 def get_terceirizado_by_id(id_terceirizado):
     """
     Lista registros por id_terceirizado
@@ -131,21 +238,9 @@ def get_terceirizado_by_id(id_terceirizado):
 
     conn = get_connection()
 
-    # Total apenas daquele ID
-    total = conn.execute(
-        """
-        SELECT COUNT(*)
-        FROM ouro.app_terceirizados
-        WHERE id_terceirizado = ?
-        """,
-        [id_terceirizado],
-    ).fetchone()[0]
-
-    if total == 0:
-        conn.close()
-        return jsonify({"error": "Nenhum registro encontrado para esse id"}), 404
-
-    rows = conn.execute(
+    # Total daquele ID e a página numa única consulta (busca pelo índice)
+    rows = fetch_json_rows(
+        conn,
         """
         SELECT *
         FROM ouro.app_terceirizados
@@ -155,22 +250,267 @@ def get_terceirizado_by_id(id_terceirizado):
         OFFSET ?
         """,
         [id_terceirizado, limit, b_start],
-    ).fetchall()
+        extra_sql="""
+            SELECT COUNT(*)
+            FROM ouro.app_terceirizados
+            WHERE id_terceirizado = ?
+        """,
+        extra_params=[id_terceirizado],
+    )
 
-    columns = [desc[0] for desc in conn.description]
-    data = [dict(zip(columns, row)) for row in rows]
+    if rows:
+        total = rows[0][2]
+    else:
+        # Página vazia: só um offset além do fim ainda pode ter registros
+        total = (
+            conn.execute(
+                """
+                SELECT COUNT(*)
+                FROM ouro.app_terceirizados
+                WHERE id_terceirizado = ?
+                """,
+                [id_terceirizado],
+            ).fetchone()[0]
+            if b_start
+            else 0
+        )
 
-    conn.close()
+    if total == 0:
+        return jsonify({"error": "Nenhum registro encontrado para esse id"}), 404
 
     next_start = b_start + limit if (b_start + limit) < total else None
 
-    return jsonify(
+    return json_page_response(
         {
             "id_terceirizado": id_terceirizado,
             "b_start": b_start,
             "limit": limit,
             "total": total,
             "next": next_start,
-            "data": data,
-        }
+        },
+        rows,
+    )
+
+
+@terceirizados_bp.route("/terceirizados/search", methods=["GET"])
+@cached_response
+def search_terceirizados():
+    """
+    Busca terceirizados por cnpj, cpf e/ou orgao_superior_sigla
+    ---
+    description: |
+        Filtra a camada gold por igualdade em uma ou mais colunas, com
+        paginação por cursor (keyset) em id_terceirizado: use o valor de
+        `next` da página anterior em `after`.
+
+        A consulta usa a cópia da tabela ordenada pelo primeiro filtro
+        informado (cnpj, cpf, orgao_superior_sigla, nessa ordem).
+    parameters:
+      - name: cnpj
+        in: query
+        type: string
+        required: false
+      - name: cpf
+        in: query
+        type: string
+        required: false
+      - name: orgao_superior_sigla
+        in: query
+        type: string
+        required: false
+      - name: after
+        in: query
+        type: string
+        required: false
+      - name: limit
+        in: query
+        type: integer
+        required: false
+    responses:
+        200:
+            description: Página de registros que atendem aos filtros
+        400:
+            description: Nenhum filtro informado ou parâmetros inválidos
+    """
+    filters = {
+        column: request.args[column]
+        for column in SEARCH_COLUMNS
+        if request.args.get(column)
+    }
+    if not filters:
+        return (
+            jsonify(
+                {"error": f"Informe ao menos um filtro: {', '.join(SEARCH_COLUMNS)}"}
+            ),
+            400,
+        )
+
+    after = request.args.get("after")
+    try:
+        limit = int(request.args.get("limit", DEFAULT_LIMIT))
+        after_id = decode_cursor(after) if after else None
+    except ValueError:
+        return jsonify({"error": "Parâmetros inválidos"}), 400
+
+    if limit <= 0:
+        return jsonify({"error": "limit deve ser > 0"}), 400
+
+    if limit > MAX_LIMIT:
+        limit = MAX_LIMIT
+
+    # Primeiro filtro escolhe a cópia ordenada; os demais viram predicados
+    table = f"ouro.app_terceirizados_por_{next(iter(filters))}"
+    conditions = [f"{column} = ?" for column in filters]
+    params = list(filters.values())
+    if after_id is not None:
+        conditions.append("id_terceirizado > ?")
+        params.append(after_id)
+
+    conn = get_connection()
+    rows = fetch_json_rows(
+        conn,
+        f"""
+        SELECT *
+        FROM {table}
+        WHERE {' AND '.join(conditions)}
+        ORDER BY id_terceirizado
+        LIMIT ?
+        """,
+        [*params, limit + 1],
+    )
+
+    return json_page_response(
+        {
+            **filters,
+            "after": after,
+            "limit": limit,
+            "next": next_cursor(rows, limit),
+        },
+        rows[:limit],
+    )
+
+
+@terceirizados_bp.route("/terceirizados/export", methods=["GET"])
+def export_terceirizados():
+    """
+    Exporta a tabela inteira (ou um recorte) num único streaming
+    ---
+    description: |
+        Extração em massa da camada gold, sem paginação. O resultado sai do
+        DuckDB em record batches e é transmitido em partes (chunked) como
+        Arrow IPC (stream) ou Parquet.
+
+        O formato vem de `format` ou, na falta dele, do cabeçalho Accept
+        (application/vnd.apache.arrow.stream ou application/vnd.apache.parquet).
+
+        `columns` recebe uma lista separada por vírgula. Qualquer outro
+        parâmetro com nome de coluna vira filtro de igualdade (repita o
+        parâmetro para mais de um valor).
+    parameters:
+      - name: format
+        in: query
+        type: string
+        enum: [arrow, parquet]
+        required: false
+      - name: columns
+        in: query
+        type: string
+        required: false
+      - name: cnpj
+        in: query
+        type: string
+        required: false
+      - name: cpf
+        in: query
+        type: string
+        required: false
+      - name: orgao_superior_sigla
+        in: query
+        type: string
+        required: false
+    responses:
+        200:
+            description: Arquivo Arrow IPC ou Parquet transmitido em streaming
+        406:
+            description: Nenhum formato suportado no Accept
+    """
+    export_format = request.args.get("format")
+    if export_format is None and not request.accept_mimetypes:
+        # Sem Accept: Arrow IPC
+        export_format = "arrow"
+    elif export_format is None:
+        best = request.accept_mimetypes.best_match(
+            [mimetype for mimetype, _ in EXPORT_FORMATS.values()]
+        )
+        export_format = next(
+            (
+                name
+                for name, (mimetype, _) in EXPORT_FORMATS.items()
+                if mimetype == best
+            ),
+            None,
+        )
+        if export_format is None:
+            return jsonify({"error": "Formato não suportado"}), 406
+    elif export_format not in EXPORT_FORMATS:
+        return jsonify({"error": "format deve ser arrow ou parquet"}), 400
+
+    conn = get_connection()
+    table_columns = [
+        desc[0]
+        for desc in conn.execute(
+            "SELECT * FROM ouro.app_terceirizados LIMIT 0"
+        ).description
+    ]
+
+    columns = table_columns
+    if request.args.get("columns"):
+        columns = [name.strip() for name in request.args["columns"].split(",")]
+        unknown = [name for name in columns if name not in table_columns]
+        if unknown:
+            return jsonify({"error": f"Colunas inválidas: {', '.join(unknown)}"}), 400
+
+    filters, params = [], []
+    for name, values in request.args.lists():
+        if name in ("format", "columns"):
+            continue
+        if name not in table_columns:
+            return jsonify({"error": f"Filtro inválido: {name}"}), 400
+        placeholders = ", ".join("?" for _ in values)
+        filters.append(f'"{name}" IN ({placeholders})')
+        params.extend(values)
+
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+    projection = ", ".join(f'"{name}"' for name in columns)
+    query = f"""
+        SELECT {projection}
+        FROM ouro.app_terceirizados
+        {where}
+        ORDER BY id_terceirizado
+    """
+
+    # Cursor próprio: o streaming continua depois que a view retorna
+    cursor = open_cursor()
+    try:
+        reader = cursor.execute(query, params).to_arrow_reader(EXPORT_BATCH_SIZE)
+    except duckdb.ConversionException:
+        cursor.close()
+        return jsonify({"error": "Valor de filtro inválido"}), 400
+    except Exception:
+        cursor.close()
+        raise
+
+    def generate():
+        try:
+            yield from EXPORT_WRITERS[export_format](reader)
+        finally:
+            cursor.close()
+
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={
+            "Content-Disposition": f"attachment; filename=terceirizados.{extension}",
+        },
     )
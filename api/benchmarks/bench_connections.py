@@ -0,0 +1,76 @@
+"""
+Requisições/s da API com uma conexão DuckDB por requisição (comportamento
+antigo) x a instância compartilhada com um cursor por requisição.
+
+No modo antigo a abertura da conexão é serializada por um lock: conexões
+simultâneas ao mesmo arquivo disputam o cache de instâncias do DuckDB e
+falham com "Unique file handle conflict" sob um servidor multi-thread.
+
+Uso (a partir de api/):
+    python benchmarks/bench_connections.py --rows 1000000 --requests 2000 --threads 8
+"""
+
+import argparse
+import random
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+import duckdb
+from flask import g
+
+from common import print_results, run_load, use_synthetic_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = use_synthetic_database(tmp_dir, args.rows)
+        db.initialize_duckdb()
+
+        # Cópia do banco para o modo antigo não disputar o arquivo com o compartilhado
+        legacy_db_path = Path(tmp_dir) / "legacy.duckdb"
+        shutil.copy(db.LOCAL_DB_PATH, legacy_db_path)
+
+        from app.main import create_app
+        from app.routes import terceirizados
+
+        app = create_app()
+        ids = random.sample(range(args.rows), 200)
+        paths = ["/terceirizados?limit=20"] + [f"/terceirizados/{i}" for i in ids]
+
+        results = {}
+        shared_get_connection = terceirizados.get_connection
+
+        connect_lock = threading.Lock()
+
+        def legacy_get_connection():
+            db.initialize_duckdb()
+            with connect_lock:
+                g.duckdb_cursor = duckdb.connect(str(legacy_db_path))
+            return g.duckdb_cursor
+
+        terceirizados.get_connection = legacy_get_connection
+        results["conexão por requisição"] = run_load(
+            app, paths, args.requests, args.threads
+        )
+
+        terceirizados.get_connection = shared_get_connection
+        results["conexão compartilhada"] = run_load(
+            app, paths, args.requests, args.threads
+        )
+
+        print_results(
+            f"{args.rows} linhas, {args.requests} requisições, {args.threads} threads",
+            results,
+        )
+
+
+if __name__ == "__main__":
+    main()
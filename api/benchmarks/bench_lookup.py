@@ -0,0 +1,106 @@
+"""
+Latência p50/p99 de GET /terceirizados/<id> sobre a tabela sem ordem e sem
+índice, com COUNT e página em duas consultas (layout antigo), x a tabela
+ordenada por id_terceirizado com índice ART e uma única consulta.
+
+Uso (a partir de api/):
+    python benchmarks/bench_lookup.py --rows 5000000 --lookups 2000
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import duckdb
+
+from common import build_synthetic_parquet
+from app.db import build_database
+
+LEGACY_COUNT = """
+    SELECT COUNT(*) FROM ouro.app_terceirizados WHERE id_terceirizado = ?
+"""
+LEGACY_ROWS = """
+    SELECT * FROM ouro.app_terceirizados
+    WHERE id_terceirizado = ?
+    ORDER BY id_terceirizado
+    LIMIT 10 OFFSET 0
+"""
+INDEXED_ROWS = """
+    SELECT *, COUNT(*) OVER () AS _total FROM ouro.app_terceirizados
+    WHERE id_terceirizado = ?
+    ORDER BY id_terceirizado
+    LIMIT 10 OFFSET 0
+"""
+
+
+def build_legacy_database(db_path, parquet_path):
+    """Layout antigo: CTAS direto do parquet, na ordem do arquivo e sem índice."""
+    con = duckdb.connect(str(db_path))
+    con.execute("CREATE SCHEMA IF NOT EXISTS ouro;")
+    con.execute(
+        f"""
+        CREATE TABLE ouro.app_terceirizados AS
+        SELECT * FROM read_parquet('{parquet_path}');
+    """
+    )
+    con.close()
+
+
+def measure(db_path, queries, ids):
+    con = duckdb.connect(str(db_path), read_only=True)
+    latencies = []
+    for id_terceirizado in ids:
+        start = time.perf_counter()
+        for query in queries:
+            con.execute(query, [id_terceirizado]).fetchall()
+        latencies.append(time.perf_counter() - start)
+    con.close()
+
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        parquet_path = tmp_dir / "app_terceirizados.parquet"
+        build_synthetic_parquet(parquet_path, args.rows)
+
+        legacy_path = tmp_dir / "legacy.duckdb"
+        indexed_path = tmp_dir / "indexed.duckdb"
+        build_legacy_database(legacy_path, parquet_path)
+        build_database(indexed_path, parquet_path)
+
+        # Ids existentes e alguns inexistentes (caminho do 404)
+        ids = [random.randrange(args.rows) for _ in range(args.lookups)]
+        ids += [args.rows + i for i in range(args.lookups // 20)]
+        random.shuffle(ids)
+
+        results = {
+            "sem ordem, sem índice": measure(
+                legacy_path, [LEGACY_COUNT, LEGACY_ROWS], ids
+            ),
+            "ordenada + índice ART": measure(indexed_path, [INDEXED_ROWS], ids),
+        }
+
+        print(f"\n{args.rows} linhas, {len(ids)} buscas por id")
+        for name, stats in results.items():
+            print(
+                f"  {name:<28} p50 {stats['p50_ms']:>7.2f} ms   "
+                f"p99 {stats['p99_ms']:>7.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Latência p50/p99 de /terceirizados/search por coluna: filtro direto na tabela
+ordenada por id (sem cópias) x cópia ordenada por (coluna, id), na primeira
+página e numa página seguinte do cursor.
+
+Uso (a partir de api/):
+    python benchmarks/bench_search.py --rows 5000000 --lookups 500
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from common import build_synthetic_parquet
+from app.db import SEARCH_COLUMNS, build_database, open_database
+
+PAGE_SQL = """
+    SELECT *
+    FROM {table}
+    WHERE {column} = ? AND id_terceirizado > ?
+    ORDER BY id_terceirizado
+    LIMIT 21
+"""
+
+
+def measure(con, table, column, samples):
+    query = PAGE_SQL.format(table=table, column=column)
+    latencies = []
+    for value, after_id in samples:
+        start = time.perf_counter()
+        con.execute(query, [value, after_id]).fetchall()
+        latencies.append(time.perf_counter() - start)
+
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--lookups", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        parquet_path = tmp_dir / "app_terceirizados.parquet"
+        build_synthetic_parquet(parquet_path, args.rows)
+        build_database(tmp_dir / "app.duckdb", parquet_path)
+        con, _ = open_database(tmp_dir / "app.duckdb")
+
+        print(f"\n{args.rows} linhas, {args.lookups} buscas por coluna")
+        for column in SEARCH_COLUMNS:
+            # Valores existentes; metade das buscas começa no meio do cursor
+            rows = con.execute(
+                f"""
+                SELECT {column}, id_terceirizado
+                FROM ouro.app_terceirizados
+                USING SAMPLE {args.lookups} ROWS
+                """
+            ).fetchall()
+            samples = [
+                (value, id_terceirizado if random.random() < 0.5 else -1)
+                for value, id_terceirizado in rows
+            ]
+
+            for name, table in (
+                ("tabela por id", "ouro.app_terceirizados"),
+                ("cópia ordenada", f"ouro.app_terceirizados_por_{column}"),
+            ):
+                stats = measure(con, table, column, samples)
+                print(
+                    f"  {column:<22} {name:<16} p50 {stats['p50_ms']:>7.2f} ms   "
+                    f"p99 {stats['p99_ms']:>7.2f} ms"
+                )
+
+        con.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Custo de serializar uma página em JSON, por 1k linhas: fetchall + dict(zip)
++ json do Flask (caminho antigo) x JSON de cada linha gerado pelo DuckDB
+(to_json) e apenas concatenado em Python, como fazem os endpoints paginados.
+
+A página fica numa tabela em memória do tamanho do limit, para que o custo
+medido seja o da serialização e não o da busca.
+
+Uso (a partir de api/):
+    python benchmarks/bench_serialization.py --page-sizes 200 1000 10000
+"""
+
+import argparse
+import statistics
+import time
+
+import duckdb
+from flask import Flask
+
+import common  # noqa: F401 (coloca api/ no sys.path)
+from app.routes.terceirizados import fetch_json_rows, json_page_response
+
+PAGE_SQL = "SELECT * FROM page ORDER BY id_terceirizado"
+
+
+def build_page(con, rows):
+    con.execute(
+        f"""
+        CREATE OR REPLACE TABLE page AS
+        SELECT
+            i::INTEGER AS id_terceirizado,
+            lpad((i % 5000)::VARCHAR, 14, '0') AS cnpj,
+            '***.' || lpad((i % 1000)::VARCHAR, 3, '0') || '.726-**' AS cpf,
+            'ORG-' || (i % 300)::VARCHAR AS orgao_superior_sigla
+        FROM range({rows}) AS t (i)
+        """
+    )
+
+
+def measure(serialize, limit, repeat):
+    """Serializa `repeat` páginas de `limit` linhas com `serialize(limit)`."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        serialize(limit)
+        timings.append(time.perf_counter() - start)
+    # Microssegundos por 1k linhas
+    return statistics.median(timings) * 1e6 * 1000 / limit
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[200, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    con = duckdb.connect()
+
+    def legacy(limit):
+        rows = con.execute(PAGE_SQL).fetchall()
+        columns = [desc[0] for desc in con.description]
+        data = [dict(zip(columns, row)) for row in rows]
+        return app.json.response({"limit": limit, "data": data}).get_data()
+
+    def duckdb_json(limit):
+        rows = fetch_json_rows(con, PAGE_SQL, [])
+        return json_page_response({"limit": limit}, rows).get_data()
+
+    print(f"\nMediana de {args.repeat} páginas (µs por 1k linhas)")
+    with app.app_context():
+        for limit in args.page_sizes:
+            build_page(con, limit)
+            legacy_cost = measure(legacy, limit, args.repeat)
+            duckdb_cost = measure(duckdb_json, limit, args.repeat)
+            print(
+                f"  limit={limit:<7} dict + jsonify {legacy_cost:>8.0f} µs   "
+                f"DuckDB to_json {duckdb_cost:>8.0f} µs   "
+                f"({legacy_cost / duckdb_cost:.1f}x)"
+            )
+
+    con.close()
+
+
+if __name__ == "__main__":
+    main()
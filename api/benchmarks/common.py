@@ -0,0 +1,88 @@
+"""
+Utilitários compartilhados pelos benchmarks da API: geração de dados
+sintéticos no formato de ouro.app_terceirizados e um gerador de carga simples.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import statistics
+import sys
+import time
+
+import duckdb
+
+# Permite importar o pacote `app` rodando a partir de api/
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def build_synthetic_parquet(path, rows):
+    """Gera um parquet com o schema de app_terceirizados e `rows` linhas."""
+    con = duckdb.connect()
+    con.execute(
+        f"""
+        COPY (
+            SELECT
+                i::INTEGER AS id_terceirizado,
+                lpad(((i % 5000) * 104729 % 100000000)::VARCHAR, 8, '0')
+                    || '0001' || lpad((i % 97)::VARCHAR, 2, '0') AS cnpj,
+                '***.' || lpad((i % 1000)::VARCHAR, 3, '0') || '.'
+                    || lpad((i * 7 % 1000)::VARCHAR, 3, '0') || '-**' AS cpf,
+                'ORG-' || (i % 300)::VARCHAR AS orgao_superior_sigla
+            FROM range({rows}) AS t (i)
+            ORDER BY random()
+        ) TO '{path}' (FORMAT PARQUET)
+        """
+    )
+    con.close()
+
+
+def use_synthetic_database(tmp_dir, rows):
+    """Aponta app.db para um parquet sintético em `tmp_dir`."""
+    from app import db
+
+    tmp_dir = Path(tmp_dir)
+    db.LOCAL_PARQUET_PATH = tmp_dir / "app_terceirizados.parquet"
+    db.LOCAL_DB_PATH = tmp_dir / "app.duckdb"
+    build_synthetic_parquet(db.LOCAL_PARQUET_PATH, rows)
+    return db
+
+
+def run_load(app, paths, total_requests, threads):
+    """
+    Dispara `total_requests` GETs (ciclando por `paths`) com `threads` clientes
+    e retorna requisições/s e latências p50/p99 em milissegundos.
+    """
+
+    def worker(worker_id):
+        client = app.test_client()
+        latencies = []
+        for i in range(worker_id, total_requests, threads):
+            start = time.perf_counter()
+            response = client.get(paths[i % len(paths)])
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 500:
+                raise RuntimeError(f"{paths[i % len(paths)]}: {response.status_code}")
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        latencies = [
+            lat for lats in executor.map(worker, range(threads)) for lat in lats
+        ]
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def print_results(title, results):
+    print(f"\n{title}")
+    for name, stats in results.items():
+        print(
+            f"  {name:<28} {stats['rps']:>9.1f} req/s   "
+            f"p50 {stats['p50_ms']:>7.2f} ms   p99 {stats['p99_ms']:>7.2f} ms"
+        )
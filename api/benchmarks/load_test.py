@@ -0,0 +1,148 @@
+"""
+Carga mista contra a API servida de verdade (HTTP): clientes fazendo buscas
+curtas (por id e por filtro) enquanto outros puxam /terceirizados/export.
+Compara o servidor WSGI com threads (app.run) e o modo ASGI com faixas
+separadas, reportando vazão e latência p50/p99 por tipo de requisição.
+
+Uso (a partir de api/):
+    python benchmarks/load_test.py --rows 2000000 --duration 20 --mode wsgi asgi
+"""
+
+import argparse
+import http.client
+import logging
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from common import use_synthetic_database
+
+PORT = 8765
+
+
+def serve_wsgi(app):
+    from werkzeug.serving import make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", PORT, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.shutdown
+
+
+def serve_asgi(app):
+    import uvicorn
+
+    from app.asgi import create_asgi_app
+
+    config = uvicorn.Config(
+        create_asgi_app(app), host="127.0.0.1", port=PORT, log_level="warning"
+    )
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    def shutdown():
+        server.should_exit = True
+        thread.join()
+
+    return shutdown
+
+
+def client(paths, stop, results):
+    conn = http.client.HTTPConnection("127.0.0.1", PORT, timeout=120)
+    while not stop.is_set():
+        path = random.choice(paths)
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", PORT, timeout=120)
+            status = None
+        results.append((time.perf_counter() - start, status))
+    conn.close()
+
+
+def summarize(results, duration):
+    latencies = sorted(lat for lat, status in results if status == 200)
+    if not latencies:
+        return "sem respostas 200"
+    errors = sum(1 for _, status in results if status != 200)
+    return (
+        f"{len(latencies) / duration:>8.1f} req/s   "
+        f"p50 {statistics.median(latencies) * 1000:>8.2f} ms   "
+        f"p99 {latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000:>8.2f} ms   "
+        f"erros {errors}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--lookup-clients", type=int, default=8)
+    parser.add_argument("--bulk-clients", type=int, default=4)
+    parser.add_argument("--mode", nargs="+", default=["wsgi", "asgi"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = use_synthetic_database(tmp_dir, args.rows)
+
+        from app.main import create_app
+
+        app = create_app()
+        cursor = db.get_database().cursor()
+        cnpjs = [
+            row[0]
+            for row in cursor.execute(
+                "SELECT cnpj FROM ouro.app_terceirizados USING SAMPLE 200 ROWS"
+            ).fetchall()
+        ]
+        cursor.close()
+
+        lookups = [
+            f"/terceirizados/{random.randrange(args.rows)}" for _ in range(2000)
+        ] + [f"/terceirizados/search?cnpj={cnpj}" for cnpj in cnpjs]
+        bulk = [
+            "/terceirizados/export?format=parquet",
+            "/terceirizados/export?columns=id_terceirizado,cnpj",
+        ]
+
+        print(
+            f"\n{args.rows} linhas, {args.duration:.0f}s, "
+            f"{args.lookup_clients} clientes de busca + {args.bulk_clients} de export"
+        )
+        for mode in args.mode:
+            shutdown = serve_wsgi(app) if mode == "wsgi" else serve_asgi(app)
+
+            stop = threading.Event()
+            lookup_results, bulk_results = [], []
+            threads = [
+                threading.Thread(target=client, args=(lookups, stop, lookup_results))
+                for _ in range(args.lookup_clients)
+            ] + [
+                threading.Thread(target=client, args=(bulk, stop, bulk_results))
+                for _ in range(args.bulk_clients)
+            ]
+            for thread in threads:
+                thread.start()
+            time.sleep(args.duration)
+            stop.set()
+            for thread in threads:
+                thread.join()
+            shutdown()
+
+            print(f"  {mode}")
+            print(f"    buscas  {summarize(lookup_results, args.duration)}")
+            print(f"    export  {summarize(bulk_results, args.duration)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Fixtures da API: um snapshot gold sintético (parquet + banco montado por
+build_database) em tmp_path e o app Flask servindo esse snapshot, sem GCS.
+"""
+
+import os
+import shutil
+
+# Antes de importar o app: sem flasgger e sem a thread de refresh
+os.environ.setdefault("API_DOCS_ENABLED", "0")
+os.environ.setdefault("SNAPSHOT_REFRESH_INTERVAL", "0")
+
+import duckdb
+import pytest
+
+from app import db
+from app.cache import response_cache
+
+ROWS = 50
+
+
+def write_app_parquet(path, rows=ROWS, sigla_prefix="ORG"):
+    """
+    Parquet no formato de ouro.app_terceirizados: ids 0..rows-1, uma linha
+    por terceirizado (como no mart), fora de ordem.
+    """
+    duckdb.execute(
+        f"""
+        COPY (
+            SELECT
+                i::INTEGER AS id_terceirizado,
+                lpad((i % 7)::VARCHAR, 14, '0') AS cnpj,
+                '***.' || lpad(i::VARCHAR, 3, '0') || '.***-**' AS cpf,
+                '{sigla_prefix}' || (i % 3)::VARCHAR AS orgao_superior_sigla
+            FROM range({rows}) AS t (i)
+            ORDER BY random()
+        ) TO '{path}' (FORMAT PARQUET)
+        """
+    )
+
+
+def write_metrics_parquet(path, id_tempo=202409):
+    """
+    6 linhas: categorias 0..5, alternando entre ORG0 e ORG1. A categoria i tem
+    10 vínculos, dos quais 10 - i com salário informado (média 100.0).
+    """
+    duckdb.execute(
+        f"""
+        COPY (
+            SELECT
+                {id_tempo} AS id_tempo,
+                hash(i % 2) AS id_orgao_superior,
+                'ORG' || (i % 2)::VARCHAR AS orgao_superior_sigla,
+                'Unidade ' || (i % 2)::VARCHAR AS unidade_gestora_nome,
+                i AS id_categoria_profissional,
+                'Categoria ' || i::VARCHAR AS categoria_profissional_nome,
+                10 AS qtd_vinculos,
+                10 AS qtd_terceirizados,
+                10 - i AS qtd_salarios,
+                10 AS qtd_custos,
+                100.0 * (10 - i) AS salario_total,
+                100.0 AS salario_medio,
+                2000.0 AS custo_total,
+                200.0 AS custo_medio
+            FROM range(6) AS t (i)
+        ) TO '{path}' (FORMAT PARQUET)
+        """
+    )
+
+
+@pytest.fixture
+def snapshot(tmp_path, monkeypatch):
+    """Snapshot local já aberto como a instância compartilhada do processo."""
+    monkeypatch.setattr(
+        db, "LOCAL_PARQUET_PATH", tmp_path / "app_terceirizados.parquet"
+    )
+    monkeypatch.setattr(
+        db, "LOCAL_METRICS_PATH", tmp_path / "metricas_terceirizados.parquet"
+    )
+    monkeypatch.setattr(db, "LOCAL_DB_PATH", tmp_path / "app.duckdb")
+    for name in ("_database", "_snapshot_version", "_total_rows", "_startup_error"):
+        monkeypatch.setattr(db, name, None)
+    monkeypatch.setattr(db, "_snapshot_files", [])
+    monkeypatch.setattr(db, "_retired_files", [])
+
+    write_app_parquet(db.LOCAL_PARQUET_PATH)
+    write_metrics_parquet(db.LOCAL_METRICS_PATH)
+    db.build_database(
+        db.LOCAL_DB_PATH, db.LOCAL_PARQUET_PATH, "v1", db.LOCAL_METRICS_PATH
+    )
+    db.get_database()
+    response_cache.clear()
+    yield db
+    response_cache.clear()
+
+
+class FakeBlob:
+    """Blob do GCS sobre um arquivo local, com a generation dada."""
+
+    def __init__(self, path, generation):
+        self.path = path
+        self.generation = generation
+
+    def download_to_filename(self, filename, if_generation_match=None):
+        shutil.copyfile(self.path, filename)
+
+    def download_as_bytes(self):
+        return self.path.read_bytes()
+
+
+@pytest.fixture
+def bucket(snapshot, monkeypatch):
+    """Bucket falso (nome do blob -> FakeBlob) servido por db.get_blob."""
+    blobs = {}
+    monkeypatch.setattr(db, "get_blob", lambda name=db.BLOB_NAME: blobs.get(name))
+    return blobs
+
+
+def publish(bucket, tmp_path, generation, rows, metrics=True):
+    """Publica no bucket falso um snapshot gold com `rows` linhas."""
+    directory = tmp_path / f"bucket-{generation}"
+    directory.mkdir()
+    write_app_parquet(directory / "app.parquet", rows)
+    bucket[db.BLOB_NAME] = FakeBlob(directory / "app.parquet", generation)
+    if metrics:
+        write_metrics_parquet(directory / "metricas.parquet", id_tempo=generation)
+        bucket[db.METRICS_BLOB_NAME] = FakeBlob(
+            directory / "metricas.parquet", generation
+        )
+    else:
+        bucket.pop(db.METRICS_BLOB_NAME, None)
+
+
+@pytest.fixture
+def app(snapshot):
+    from app.main import create_app
+
+    flask_app = create_app()
+    flask_app.config["TESTING"] = True
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
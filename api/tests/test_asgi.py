@@ -0,0 +1,203 @@
+import asyncio
+import threading
+
+import duckdb
+import pytest
+from flask import Response, g, jsonify, stream_with_context
+
+from app import asgi
+from app.db import get_connection, open_cursor
+
+# Sem interrupt(), leva minutos
+SLOW_SQL = "SELECT sum(hash(i)) FROM range(1000000000000) AS t (i)"
+
+WAIT = 10
+
+
+async def call(app, path, query=b""):
+    """Executa uma requisição GET no app ASGI e devolve as mensagens enviadas."""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": query,
+        "headers": [],
+    }
+    await app(scope, receive, send)
+    return messages
+
+
+def status(messages):
+    return messages[0]["status"]
+
+
+def body(messages):
+    return b"".join(m.get("body", b"") for m in messages[1:])
+
+
+async def shutdown(app):
+    queue = asyncio.Queue()
+    for message in ("lifespan.startup", "lifespan.shutdown"):
+        queue.put_nowait({"type": message})
+
+    async def send(message):
+        pass
+
+    await app({"type": "lifespan"}, queue.get, send)
+
+
+@pytest.fixture
+def probes(app):
+    """
+    Rotas de teste: consulta lenta, streaming que trava depois do primeiro
+    bloco, rota bloqueada até `release` e uma que só conta as execuções.
+    """
+    state = {
+        "release": threading.Event(),
+        "interrupted": threading.Event(),
+        "teardown": threading.Event(),
+        "closed": threading.Event(),
+        "calls": 0,
+    }
+
+    def slow():
+        try:
+            get_connection().execute(SLOW_SQL).fetchall()
+        except duckdb.InterruptException:
+            state["interrupted"].set()
+            raise
+        return jsonify({})
+
+    def slow_stream():
+        # Cursor próprio, como no export: o streaming continua depois da view
+        cursor = open_cursor()
+
+        def generate():
+            try:
+                yield "inicio"
+                cursor.execute(SLOW_SQL).fetchall()
+                yield "fim"
+            except duckdb.InterruptException:
+                state["interrupted"].set()
+                raise
+            finally:
+                cursor.close()
+                state["closed"].set()
+
+        return Response(stream_with_context(generate()))
+
+    def blocked():
+        state["release"].wait(WAIT)
+        return jsonify({"thread": threading.current_thread().name})
+
+    def counted():
+        state["calls"] += 1
+        return jsonify({"thread": threading.current_thread().name})
+
+    def teardown(exception=None):
+        if "duckdb_cursor" in g:
+            state["teardown"].set()
+
+    app.add_url_rule("/teste/lento", view_func=slow)
+    app.add_url_rule("/teste/stream-lento", view_func=slow_stream)
+    app.add_url_rule("/teste/bloqueado", view_func=blocked)
+    app.add_url_rule("/teste/contador", view_func=counted)
+    # Registrado antes de close_connection: teardowns rodam em ordem inversa
+    app.teardown_appcontext(teardown)
+    yield state
+    state["release"].set()
+
+
+def make_asgi(app, monkeypatch, workers=1, timeout=0.3, bulk_timeout=WAIT):
+    monkeypatch.setattr(asgi, "ASGI_INTERACTIVE_WORKERS", workers)
+    monkeypatch.setattr(asgi, "ASGI_INTERACTIVE_TIMEOUT", timeout)
+    monkeypatch.setattr(asgi, "ASGI_BULK_WORKERS", 1)
+    monkeypatch.setattr(asgi, "ASGI_BULK_TIMEOUT", bulk_timeout)
+    return asgi.create_asgi_app(app)
+
+
+def test_rota_do_flask_responde_pelo_asgi(app, monkeypatch):
+    asgi_app = make_asgi(app, monkeypatch, timeout=WAIT)
+
+    messages = asyncio.run(call(asgi_app, "/terceirizados", b"limit=2"))
+
+    assert status(messages) == 200
+    assert b'"limit":2' in body(messages)
+    assert messages[-1] == {"type": "http.response.body", "body": b""}
+    asyncio.run(shutdown(asgi_app))
+
+
+def test_consulta_lenta_e_interrompida_e_responde_504(app, probes, monkeypatch):
+    asgi_app = make_asgi(app, monkeypatch)
+
+    messages = asyncio.run(call(asgi_app, "/teste/lento"))
+
+    assert status(messages) == 504
+    assert b"Tempo limite excedido" in body(messages)
+    assert probes["interrupted"].wait(WAIT)
+    # O cursor da requisição é fechado depois que a consulta para
+    assert probes["teardown"].wait(WAIT)
+    asyncio.run(shutdown(asgi_app))
+
+
+def test_requisicao_na_fila_e_cancelada_sem_rodar(app, probes, monkeypatch):
+    asgi_app = make_asgi(app, monkeypatch, workers=1)
+
+    async def scenario():
+        # A única thread fica presa; a segunda requisição estoura o prazo na fila
+        return await asyncio.gather(
+            call(asgi_app, "/teste/bloqueado"), call(asgi_app, "/teste/contador")
+        )
+
+    blocked, queued = asyncio.run(scenario())
+    probes["release"].set()
+
+    assert status(blocked) == 504
+    assert status(queued) == 504
+    # A fila anda depois da cancelada, que nunca chega a rodar
+    assert status(asyncio.run(call(asgi_app, "/teste/contador"))) == 200
+    assert probes["calls"] == 1
+    asyncio.run(shutdown(asgi_app))
+
+
+def test_prazo_estourado_no_streaming_encerra_a_resposta(app, probes, monkeypatch):
+    asgi_app = make_asgi(app, monkeypatch)
+
+    messages = asyncio.run(call(asgi_app, "/teste/stream-lento"))
+
+    # Cabeçalhos e primeiro bloco já enviados: sem 504 e sem o fim do corpo
+    assert status(messages) == 200
+    assert [m["body"] for m in messages[1:]] == [b"inicio"]
+    assert all(m.get("more_body") for m in messages[1:])
+    assert probes["interrupted"].wait(WAIT)
+    assert probes["closed"].wait(WAIT)
+    asyncio.run(shutdown(asgi_app))
+
+
+def test_extracao_em_massa_nao_ocupa_as_threads_interativas(app, probes, monkeypatch):
+    monkeypatch.setattr(asgi, "BULK_PATHS", ("/teste/bloqueado",))
+    asgi_app = make_asgi(app, monkeypatch, workers=1, timeout=WAIT)
+
+    async def scenario():
+        bulk = asyncio.ensure_future(call(asgi_app, "/teste/bloqueado"))
+        # Com a faixa bulk ocupada, a interativa continua respondendo
+        interactive = await call(asgi_app, "/teste/contador")
+        assert not bulk.done()
+        probes["release"].set()
+        return await bulk, interactive
+
+    bulk, interactive = asyncio.run(scenario())
+
+    assert status(interactive) == 200
+    assert b"asgi-interactive" in body(interactive)
+    assert status(bulk) == 200
+    assert b"asgi-bulk" in body(bulk)
+    asyncio.run(shutdown(asgi_app))
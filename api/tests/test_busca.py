@@ -0,0 +1,49 @@
+import pytest
+
+from conftest import ROWS
+
+
+def ids(response):
+    return [row["id_terceirizado"] for row in response.get_json()["data"]]
+
+
+def test_busca_sem_filtro_retorna_400(client):
+    assert client.get("/terceirizados/search?limit=5").status_code == 400
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("orgao_superior_sigla=ORG1", [i for i in range(ROWS) if i % 3 == 1]),
+        ("cnpj=00000000000002", [i for i in range(ROWS) if i % 7 == 2]),
+        (
+            "cnpj=00000000000002&orgao_superior_sigla=ORG1",
+            [i for i in range(ROWS) if i % 7 == 2 and i % 3 == 1],
+        ),
+        ("cpf=***.010.***-**", [10]),
+        ("orgao_superior_sigla=NAO_EXISTE", []),
+    ],
+)
+def test_busca_filtra_por_igualdade_em_ordem_de_id(client, query, expected):
+    response = client.get(f"/terceirizados/search?{query}&limit={ROWS}")
+
+    assert ids(response) == expected
+    assert response.get_json()["next"] is None
+
+
+def test_cursor_da_busca_percorre_o_recorte_inteiro(client):
+    seen, after = [], ""
+    while after is not None:
+        body = client.get(
+            f"/terceirizados/search?orgao_superior_sigla=ORG0&limit=4&after={after}"
+        ).get_json()
+        seen += [row["id_terceirizado"] for row in body["data"]]
+        after = body["next"]
+
+    assert seen == [i for i in range(ROWS) if i % 3 == 0]
+
+
+def test_busca_com_cursor_invalido_retorna_400(client):
+    response = client.get("/terceirizados/search?cnpj=1&after=nao-e-cursor")
+
+    assert response.status_code == 400
@@ -0,0 +1,58 @@
+from app.cache import response_cache
+from conftest import ROWS, publish
+
+
+def test_resposta_traz_etag_e_exige_revalidacao(client):
+    response = client.get("/terceirizados?after=&limit=5")
+
+    assert response.status_code == 200
+    assert response.headers["ETag"]
+    assert response.cache_control.no_cache
+    assert response.cache_control.public
+
+
+def test_if_none_match_com_o_etag_atual_retorna_304(client):
+    etag = client.get("/terceirizados?after=&limit=5").headers["ETag"]
+    response = client.get(
+        "/terceirizados?after=&limit=5", headers={"If-None-Match": etag}
+    )
+
+    assert response.status_code == 304
+    assert response.get_data() == b""
+
+
+def test_ordem_dos_parametros_nao_muda_a_entrada_do_cache(client):
+    first = client.get("/terceirizados?after=&limit=5")
+    second = client.get("/terceirizados?limit=5&after=")
+
+    assert first.headers["ETag"] == second.headers["ETag"]
+    assert len(response_cache._entries) == 1
+
+
+def test_after_vazio_e_ausente_sao_entradas_distintas(client):
+    cursor = client.get("/terceirizados?after=&limit=5").get_json()
+    offset = client.get("/terceirizados?limit=5").get_json()
+
+    assert "next" in cursor and "next_cursor" in offset
+    assert len(response_cache._entries) == 2
+
+
+def test_erros_nao_entram_no_cache(client):
+    response = client.get("/terceirizados?limit=0")
+
+    assert response.status_code == 400
+    assert "ETag" not in response.headers
+    assert len(response_cache._entries) == 0
+
+
+def test_novo_snapshot_invalida_etag_e_cache(snapshot, bucket, tmp_path, client):
+    url = "/terceirizados?after=&limit=5&include_total=true"
+    old = client.get(url)
+    publish(bucket, tmp_path, 202410, rows=ROWS + 30)
+    snapshot.refresh_snapshot()
+
+    response = client.get(url, headers={"If-None-Match": old.headers["ETag"]})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != old.headers["ETag"]
+    assert response.get_json()["total"] == ROWS + 30
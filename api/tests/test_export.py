@@ -0,0 +1,70 @@
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from app.export import ARROW_MIMETYPE, PARQUET_MIMETYPE
+from conftest import ROWS
+
+
+def read_arrow(response):
+    return pa.ipc.open_stream(io.BytesIO(response.get_data())).read_all()
+
+
+def test_sem_format_nem_accept_exporta_arrow_ordenado(client):
+    response = client.get("/terceirizados/export")
+
+    assert response.status_code == 200
+    assert response.mimetype == ARROW_MIMETYPE
+    table = read_arrow(response)
+    assert table["id_terceirizado"].to_pylist() == list(range(ROWS))
+
+
+def test_format_parquet(client):
+    response = client.get("/terceirizados/export?format=parquet")
+
+    assert response.mimetype == PARQUET_MIMETYPE
+    assert "terceirizados.parquet" in response.headers["Content-Disposition"]
+    assert pq.read_table(io.BytesIO(response.get_data())).num_rows == ROWS
+
+
+def test_formato_negociado_pelo_accept(client):
+    response = client.get("/terceirizados/export", headers={"Accept": PARQUET_MIMETYPE})
+
+    assert response.status_code == 200
+    assert response.mimetype == PARQUET_MIMETYPE
+
+
+def test_accept_sem_formato_suportado_retorna_406(client):
+    response = client.get("/terceirizados/export", headers={"Accept": "text/csv"})
+
+    assert response.status_code == 406
+
+
+def test_columns_projeta_as_colunas_pedidas(client):
+    response = client.get("/terceirizados/export?columns=id_terceirizado,cnpj")
+
+    assert read_arrow(response).column_names == ["id_terceirizado", "cnpj"]
+
+
+def test_filtro_repetido_vira_in(client):
+    response = client.get(
+        "/terceirizados/export?orgao_superior_sigla=ORG0&orgao_superior_sigla=ORG1"
+    )
+
+    ids = read_arrow(response)["id_terceirizado"].to_pylist()
+    assert ids == [i for i in range(ROWS) if i % 3 in (0, 1)]
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "format=csv",
+        "columns=id_terceirizado,nao_existe",
+        "nao_existe=1",
+        "id_terceirizado=abc",
+    ],
+)
+def test_parametros_invalidos_retornam_400(client, query):
+    assert client.get(f"/terceirizados/export?{query}").status_code == 400
@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+WAIT = 10
+
+
+@pytest.fixture
+def loading(snapshot, monkeypatch):
+    """
+    Processo recém-iniciado: snapshot fechado e a carga em segundo plano
+    presa até `release`; `error` faz a carga falhar.
+    """
+    state = {"release": threading.Event(), "error": None}
+    load_snapshot = snapshot.load_snapshot
+
+    def blocked_load():
+        state["release"].wait(WAIT)
+        if state["error"] is not None:
+            raise state["error"]
+        return load_snapshot()
+
+    monkeypatch.setattr(snapshot, "load_snapshot", blocked_load)
+    monkeypatch.setattr(snapshot, "_database", None)
+    yield state
+    state["release"].set()
+
+
+@pytest.fixture
+def booting_client(loading):
+    from app.main import create_app
+
+    flask_app = create_app()
+    flask_app.config["TESTING"] = True
+    return flask_app.test_client()
+
+
+def wait_ready(client):
+    deadline = time.monotonic() + WAIT
+    while time.monotonic() < deadline:
+        response = client.get("/health/ready")
+        if response.get_json()["status"] != "carregando":
+            return response
+        time.sleep(0.01)
+    raise AssertionError("o snapshot não terminou de carregar")
+
+
+def test_live_responde_antes_do_snapshot_abrir(loading, booting_client):
+    response = booting_client.get("/health/live")
+
+    assert response.status_code == 200
+    assert response.get_json() == {"status": "ok"}
+    assert not loading["release"].is_set()
+
+
+def test_ready_retorna_503_enquanto_carrega(booting_client):
+    response = booting_client.get("/health/ready")
+
+    assert response.status_code == 503
+    assert response.get_json() == {"status": "carregando"}
+
+
+def test_ready_retorna_200_com_o_snapshot_aberto(loading, booting_client):
+    assert booting_client.get("/health/ready").status_code == 503
+    loading["release"].set()
+
+    response = wait_ready(booting_client)
+
+    assert response.status_code == 200
+    assert response.get_json() == {"status": "ok", "snapshot": "v1"}
+
+
+def test_ready_retorna_503_com_o_erro_da_carga(loading, booting_client):
+    loading["error"] = RuntimeError("snapshot indisponível")
+    loading["release"].set()
+
+    response = wait_ready(booting_client)
+
+    assert response.status_code == 503
+    assert response.get_json() == {
+        "status": "erro",
+        "error": "snapshot indisponível",
+    }
+    assert booting_client.get("/health/live").status_code == 200
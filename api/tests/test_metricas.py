@@ -0,0 +1,132 @@
+import duckdb
+import pytest
+
+from app import db
+from conftest import FakeBlob, ROWS, publish
+
+
+def rows(response):
+    return response.get_json()["data"]
+
+
+def test_metricas_lista_o_mart_inteiro(client):
+    body = client.get("/metricas").get_json()
+
+    assert body["total"] == 6
+    assert body["next"] is None
+    assert [row["id_categoria_profissional"] for row in body["data"]] == [
+        0,
+        2,
+        4,
+        1,
+        3,
+        5,
+    ]
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("id_tempo=202409", [0, 2, 4, 1, 3, 5]),
+        ("id_tempo=202410", []),
+        ("orgao_superior_sigla=ORG1", [1, 3, 5]),
+        ("id_categoria_profissional=2", [2]),
+        ("orgao_superior_sigla=ORG1&id_categoria_profissional=2", []),
+    ],
+)
+def test_metricas_filtros(client, query, expected):
+    response = client.get(f"/metricas?{query}")
+
+    assert [row["id_categoria_profissional"] for row in rows(response)] == expected
+    assert response.get_json()["total"] == len(expected)
+
+
+def test_metricas_paginacao(client):
+    body = client.get("/metricas?b_start=2&limit=3").get_json()
+
+    assert [row["id_categoria_profissional"] for row in body["data"]] == [4, 1, 3]
+    assert body["next"] == 5
+
+
+def test_metricas_id_orgao_superior_vai_como_string(client):
+    row = rows(client.get("/metricas?id_categoria_profissional=0"))[0]
+
+    assert row["id_orgao_superior"] == str(
+        duckdb.execute("SELECT hash(0)").fetchone()[0]
+    )
+
+
+def test_orgaos_soma_as_categorias(client):
+    body = client.get("/metricas/orgaos").get_json()
+
+    assert [row["orgao_superior_sigla"] for row in body["data"]] == ["ORG0", "ORG1"]
+    org0 = body["data"][0]
+    assert org0["qtd_vinculos"] == 30
+    assert org0["salario_total"] == 2400.0
+    assert org0["custo_total"] == 6000.0
+
+
+def test_orgaos_media_ignora_vinculos_sem_valor(client):
+    org0, org1 = rows(client.get("/metricas/orgaos"))
+
+    # salario_total / qtd_salarios, não / qtd_vinculos (que daria 80.0 e 70.0)
+    assert org0["salario_medio"] == 100.0
+    assert org1["salario_medio"] == 100.0
+    assert org0["custo_medio"] == 200.0
+
+
+def test_orgaos_filtro_por_sigla(client):
+    body = client.get("/metricas/orgaos?orgao_superior_sigla=ORG1").get_json()
+
+    assert body["orgao_superior_sigla"] == "ORG1"
+    assert [row["orgao_superior_sigla"] for row in body["data"]] == ["ORG1"]
+    assert body["data"][0]["qtd_vinculos"] == 30
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/metricas?id_tempo=abc",
+        "/metricas?id_categoria_profissional=1.5",
+        "/metricas?b_start=-1",
+        "/metricas?limit=0",
+        "/metricas?limit=abc",
+        "/metricas/orgaos?id_tempo=abc",
+        "/metricas/orgaos?b_start=x",
+        "/metricas/orgaos?limit=-5",
+    ],
+)
+def test_parametros_invalidos_retornam_400(client, url):
+    assert client.get(url).status_code == 400
+
+
+@pytest.mark.parametrize("url", ["/metricas", "/metricas/orgaos"])
+def test_sem_mart_de_metricas_retorna_503(snapshot, bucket, tmp_path, client, url):
+    publish(bucket, tmp_path, 202410, rows=ROWS, metrics=False)
+    snapshot.refresh_snapshot()
+
+    assert client.get(url).status_code == 503
+
+
+def test_mart_sem_as_contagens_de_valores_retorna_503(
+    snapshot, bucket, tmp_path, client
+):
+    # Snapshot publicado antes de qtd_salarios/qtd_custos existirem no mart
+    publish(bucket, tmp_path, 202410, rows=ROWS, metrics=False)
+    path = tmp_path / "metricas-antigas.parquet"
+    duckdb.execute(
+        f"""
+        COPY (SELECT 202410 AS id_tempo, 1 AS id_orgao_superior,
+                     'ORG0' AS orgao_superior_sigla,
+                     'Unidade 0' AS unidade_gestora_nome,
+                     0 AS id_categoria_profissional,
+                     10 AS qtd_vinculos, 1000.0 AS salario_total,
+                     2000.0 AS custo_total)
+        TO '{path}' (FORMAT PARQUET)
+        """
+    )
+    bucket[db.METRICS_BLOB_NAME] = FakeBlob(path, 202410)
+    snapshot.refresh_snapshot()
+
+    assert client.get("/metricas").status_code == 200
+    assert client.get("/metricas/orgaos").status_code == 503
@@ -0,0 +1,78 @@
+import pytest
+
+from conftest import ROWS
+
+
+def ids(response):
+    return [row["id_terceirizado"] for row in response.get_json()["data"]]
+
+
+def test_cursor_percorre_a_tabela_inteira_em_ordem(client):
+    seen, after = [], ""
+    while after is not None:
+        body = client.get(f"/terceirizados?after={after}&limit=7").get_json()
+        seen += [row["id_terceirizado"] for row in body["data"]]
+        after = body["next"]
+
+    assert seen == list(range(ROWS))
+
+
+def test_cursor_da_primeira_pagina_offset_continua_no_modo_keyset(client):
+    first = client.get("/terceirizados?limit=5").get_json()
+    second = client.get(f"/terceirizados?after={first['next_cursor']}&limit=5")
+
+    assert ids(second)[0] > first["data"][-1]["id_terceirizado"]
+
+
+def test_cursor_na_ultima_pagina_e_none(client):
+    body = client.get(f"/terceirizados?after=&limit={ROWS}").get_json()
+
+    assert len(body["data"]) == ROWS
+    assert body["next"] is None
+
+
+def test_total_so_vem_no_modo_cursor_com_include_total(client):
+    assert "total" not in client.get("/terceirizados?after=").get_json()
+    body = client.get("/terceirizados?after=&include_total=true").get_json()
+    assert body["total"] == ROWS
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "after=&limit=0",
+        "after=&limit=-1",
+        "limit=0",
+        "limit=-5",
+        "b_start=-1",
+        "limit=abc",
+        "after=nao-e-cursor",
+    ],
+)
+def test_parametros_invalidos_retornam_400(client, query):
+    assert client.get(f"/terceirizados?{query}").status_code == 400
+
+
+@pytest.mark.parametrize("query", ["b_start=5&after=", "b_start=0&after=MQ"])
+def test_b_start_e_after_sao_exclusivos(client, query):
+    assert client.get(f"/terceirizados?{query}").status_code == 400
+
+
+def test_limit_acima_do_maximo_e_limitado(client):
+    from app.routes.terceirizados import MAX_LIMIT
+
+    body = client.get(f"/terceirizados?after=&limit={MAX_LIMIT * 10}").get_json()
+    assert body["limit"] == MAX_LIMIT
+
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_busca_rejeita_limit_nao_positivo(client, limit):
+    response = client.get(
+        f"/terceirizados/search?orgao_superior_sigla=ORG1&limit={limit}"
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_busca_por_id_rejeita_limit_nao_positivo(client, limit):
+    assert client.get(f"/terceirizados/10?limit={limit}").status_code == 400
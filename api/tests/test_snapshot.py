@@ -0,0 +1,139 @@
+import json
+
+import pytest
+
+from app.db import (
+    ARTIFACT_MANIFEST_BLOB_NAME,
+    BLOB_NAME,
+    DATABASE_LAYOUT,
+    METRICS_BLOB_NAME,
+)
+from conftest import ROWS, FakeBlob, publish
+
+
+def count(cursor):
+    return cursor.execute("SELECT COUNT(*) FROM ouro.app_terceirizados").fetchone()[0]
+
+
+def side_files(db):
+    return sorted(path.name for path in db.LOCAL_DB_PATH.parent.glob("*.*.*"))
+
+
+@pytest.fixture(params=["table", "parquet"])
+def mode(request, snapshot, monkeypatch):
+    """Snapshot reaberto no SNAPSHOT_MODE do parâmetro."""
+    monkeypatch.setattr(snapshot, "SNAPSHOT_MODE", request.param)
+    # Sem guardar a instância antiga: o DuckDB reaproveita a instância ainda
+    # aberta de um mesmo arquivo
+    snapshot._database = None
+    snapshot.get_database()
+    return snapshot
+
+
+def test_refresh_mantem_cursores_abertos_no_snapshot_anterior(mode, bucket, tmp_path):
+    old = mode.get_database().cursor()
+    publish(bucket, tmp_path, 202410, rows=ROWS + 30)
+
+    assert mode.refresh_snapshot()
+
+    assert count(old) == ROWS
+    assert count(mode.get_database().cursor()) == ROWS + 30
+
+
+def test_total_de_linhas_e_trocado_junto_com_o_snapshot(mode, bucket, tmp_path):
+    assert mode.get_total_rows() == ROWS
+    publish(bucket, tmp_path, 202410, rows=ROWS + 30)
+    mode.refresh_snapshot()
+
+    assert mode.get_total_rows() == ROWS + 30
+
+
+def test_refresh_sem_metricas_nao_serve_as_do_snapshot_anterior(
+    mode, bucket, tmp_path, client
+):
+    assert client.get("/metricas").status_code == 200
+    publish(bucket, tmp_path, 202410, rows=ROWS, metrics=False)
+    mode.refresh_snapshot()
+
+    assert client.get("/metricas").status_code == 503
+    assert not mode.LOCAL_METRICS_PATH.exists()
+
+
+def test_refresh_nao_acumula_arquivos_laterais(mode, bucket, tmp_path):
+    for generation in (202410, 202411, 202412):
+        publish(bucket, tmp_path, generation, rows=ROWS + generation % 100)
+        mode.refresh_snapshot()
+
+    if mode.SNAPSHOT_MODE == "table":
+        assert side_files(mode) == []
+    else:
+        # Só os laterais do snapshot atual e do anterior
+        assert len(side_files(mode)) == 4
+    assert mode.LOCAL_PARQUET_PATH.exists()
+
+
+def test_arquivos_locais_seguem_o_snapshot_atual(mode, bucket, tmp_path):
+    publish(bucket, tmp_path, 202410, rows=ROWS + 30)
+    mode.refresh_snapshot()
+
+    # Um próximo start abre o que está em disco: o snapshot novo
+    mode.LOCAL_DB_PATH.unlink(missing_ok=True)
+    mode._database = None
+    assert count(mode.get_database().cursor()) == ROWS + 30
+
+
+def test_start_remove_laterais_de_processos_anteriores(mode):
+    leftover = mode.side_path(mode.LOCAL_PARQUET_PATH, "antiga")
+    leftover.write_bytes(b"")
+    mode._database = None
+    mode.get_database()
+
+    assert not leftover.exists()
+
+
+def offline(name=BLOB_NAME):
+    raise OSError("sem acesso ao GCS")
+
+
+def test_start_sem_gcs_monta_do_parquet_local(snapshot, monkeypatch):
+    monkeypatch.setattr(snapshot, "get_blob", offline)
+    snapshot.LOCAL_DB_PATH.unlink()
+    snapshot._database = None
+
+    assert count(snapshot.get_database().cursor()) == ROWS
+
+
+def test_start_sem_gcs_e_sem_parquet_local_falha(snapshot, monkeypatch):
+    monkeypatch.setattr(snapshot, "get_blob", offline)
+    snapshot.LOCAL_DB_PATH.unlink()
+    snapshot.LOCAL_PARQUET_PATH.unlink()
+    snapshot._database = None
+
+    with pytest.raises(OSError):
+        snapshot.get_database()
+
+
+def publish_manifest(bucket, tmp_path, sources):
+    path = tmp_path / "manifest.json"
+    path.write_text(
+        json.dumps(
+            {"layout": DATABASE_LAYOUT, "version": "artefato", "sources": sources}
+        )
+    )
+    bucket[ARTIFACT_MANIFEST_BLOB_NAME] = FakeBlob(path, 1)
+
+
+def test_manifesto_do_gold_atual_e_usado(snapshot, bucket, tmp_path):
+    publish(bucket, tmp_path, 202410, rows=ROWS)
+    publish_manifest(bucket, tmp_path, {BLOB_NAME: 202410, METRICS_BLOB_NAME: 202410})
+
+    assert snapshot.get_artifact_manifest()["version"] == "artefato"
+
+
+def test_manifesto_de_gold_anterior_e_ignorado(snapshot, bucket, tmp_path):
+    publish(bucket, tmp_path, 202410, rows=ROWS)
+    publish_manifest(bucket, tmp_path, {BLOB_NAME: 202410, METRICS_BLOB_NAME: 202410})
+    # Run seguinte com publish_database=False: o gold avança, o banco não
+    publish(bucket, tmp_path, 202411, rows=ROWS + 30)
+
+    assert snapshot.get_artifact_manifest() is None
@@ -0,0 +1,176 @@
+"""
+Tempo das dimensões (bronze + tag:dimension) x tamanho da fonte: uma carga
+completa de um mês e, em seguida, o mês seguinte com uma fração dos
+terceirizados alterada. No incremental, o delete+insert de cada dimensão só
+recebe as chaves novas ou alteradas (macro ultima_versao), não uma linha por
+terceirizado-mês da bronze.
+
+Uso (a partir de dw/, com `dbt deps` já rodado):
+    python benchmarks/bench_dimensoes.py --rows 100000 1000000 --change-rate 0.01
+"""
+
+import argparse
+import json
+import tempfile
+from pathlib import Path
+
+import duckdb
+from dbt.cli.main import dbtRunner
+
+DW_DIR = Path(__file__).resolve().parents[1]
+
+DIMENSIONS = {
+    "dim_categoria_profissional": "id_categoria_profissional",
+    "dim_contratos": "id_contrato",
+    "dim_orgaos": "id_orgao",
+    "dim_orgaos_superiores": "id_orgao_superior",
+    "dim_terceirizados": "id_terceirizado",
+}
+
+PROFILE = """
+dw:
+  target: bench
+  outputs:
+    bench:
+      type: duckdb
+      path: "{path}"
+      threads: 4
+"""
+
+
+def build_synthetic_raw(path, rows, mes, change_every):
+    """
+    Gera um parquet no formato da raw (tudo string) com `rows` terceirizados
+    do mês `mes` de 2024; com `change_every`, um a cada `change_every` muda
+    de escolaridade e de empresa.
+    """
+    changed = f"i % {change_every} = 0" if change_every else "false"
+    con = duckdb.connect()
+    con.execute(
+        f"""
+        COPY (
+            SELECT
+                i::VARCHAR AS id_terc,
+                'SUP' || (i % 40)::VARCHAR AS sg_orgao_sup_tabela_ug,
+                (i % 300)::VARCHAR AS cd_ug_gestora,
+                'Unidade gestora ' || (i % 300)::VARCHAR AS nm_ug_tabela_ug,
+                'UG' || (i % 300)::VARCHAR AS sg_ug_gestora,
+                (i % ({rows} // 20 + 1))::VARCHAR || '/2024' AS nr_contrato,
+                lpad(empresa::VARCHAR, 14, '0') AS nr_cnpj,
+                'Empresa ' || empresa::VARCHAR AS nm_razao_social,
+                '***.' || lpad((i % 1000)::VARCHAR, 3, '0') || '.***-**' AS nr_cpf,
+                'Terceirizado ' || i::VARCHAR AS nm_terceirizado,
+                (510000 + i % 500)::VARCHAR || ' - CATEGORIA '
+                    || (i % 500)::VARCHAR AS nm_categoria_profissional,
+                CASE WHEN {changed} THEN 'DOUTORADO' ELSE 'MEDIO COMPLETO' END
+                    AS nm_escolaridade,
+                '40' AS nr_jornada,
+                'Unidade ' || (i % 2000)::VARCHAR AS nm_unidade_prestacao,
+                (1500 + i % 3000)::VARCHAR AS vl_mensal_salario,
+                (3000 + i % 6000)::VARCHAR AS vl_mensal_custo,
+                '{mes}' AS num_mes_carga,
+                'MES {mes}' AS mes_carga,
+                '2024' AS ano_carga,
+                'OG' || (i % 2000)::VARCHAR AS sg_orgao,
+                'Orgao ' || (i % 2000)::VARCHAR AS nm_orgao,
+                (i % 2000)::VARCHAR AS cd_orgao_siafi,
+                (i % 2000)::VARCHAR AS cd_orgao_siape
+            FROM (
+                SELECT
+                    i,
+                    CASE WHEN {changed} THEN i % ({rows} // 50 + 1) + 1
+                        ELSE i % ({rows} // 50 + 1) END AS empresa
+                FROM range({rows}) AS t (i)
+            )
+        ) TO '{path}' (FORMAT PARQUET)
+        """
+    )
+    con.close()
+
+
+def run_dimensions(tmp_dir, project_dir, parquet_path):
+    """Roda bronze + dimensões e retorna o tempo de dbt de cada modelo."""
+    result = dbtRunner().invoke(
+        [
+            "run",
+            "--project-dir",
+            str(project_dir),
+            "--profiles-dir",
+            str(tmp_dir),
+            "--target-path",
+            str(tmp_dir / "target"),
+            "--log-path",
+            str(tmp_dir / "logs"),
+            "--select",
+            "brutos_terceirizados",
+            "tag:dimension",
+            "--exclude",
+            "dim_periodo",
+            "--vars",
+            json.dumps({"parquet_path": str(parquet_path)}),
+            "--quiet",
+        ]
+    )
+    if not result.success:
+        raise RuntimeError(f"dbt run falhou: {result.exception or result.result}")
+    return {r.node.name: r.execution_time for r in result.result.results}
+
+
+def written_rows(db_path, id_tempo):
+    """Linhas gravadas por dimensão na versão `id_tempo`."""
+    con = duckdb.connect(str(db_path), read_only=True)
+    counts = {
+        model: con.execute(
+            f"SELECT count(*) FROM main_prata.{model} "
+            f"WHERE id_tempo_atualizacao = {id_tempo}"
+        ).fetchone()[0]
+        for model in DIMENSIONS
+    }
+    con.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--change-rate", type=float, default=0.01)
+    parser.add_argument("--project-dir", type=Path, default=DW_DIR)
+    args = parser.parse_args()
+
+    change_every = round(1 / args.change_rate) if args.change_rate else 0
+
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tmp_dir = Path(tmp_dir)
+            db_path = tmp_dir / "bench.duckdb"
+            (tmp_dir / "profiles.yml").write_text(PROFILE.format(path=db_path))
+
+            completo = tmp_dir / "terceirizados_2024-08.parquet"
+            incremental = tmp_dir / "terceirizados_2024-09.parquet"
+            build_synthetic_raw(completo, rows, 8, 0)
+            build_synthetic_raw(incremental, rows, 9, change_every)
+
+            full_times = run_dimensions(tmp_dir, args.project_dir, completo)
+            full_rows = written_rows(db_path, 202408)
+            incremental_times = run_dimensions(tmp_dir, args.project_dir, incremental)
+            incremental_rows = written_rows(db_path, 202409)
+
+            print(
+                f"\n{rows} linhas na fonte por mês, "
+                f"{args.change_rate:.1%} dos terceirizados alterados no mês seguinte"
+            )
+            print(
+                f"  {'modelo':<28} {'completo':>9} {'linhas':>9}   "
+                f"{'incremental':>11} {'upserts':>9}"
+            )
+            for model in ["brutos_terceirizados", *DIMENSIONS]:
+                print(
+                    f"  {model:<28} {full_times[model]:>8.2f}s "
+                    f"{full_rows.get(model, rows):>9}   "
+                    f"{incremental_times[model]:>10.2f}s "
+                    f"{incremental_rows.get(model, rows):>9}"
+                )
+
+
+if __name__ == "__main__":
+    main()
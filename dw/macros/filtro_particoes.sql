@@ -0,0 +1,11 @@
+{#
+    Filtro do modo incremental por partição: com a var `id_tempos` (lista de
+    AAAAMM passada pelo flow), uma execução incremental só lê os meses do lote.
+    Sem a var, ou num build completo, não filtra nada.
+#}
+{% macro filtro_particoes(coluna) -%}
+    {%- set id_tempos = var('id_tempos', none) -%}
+    {%- if is_incremental() and id_tempos -%}
+        where {{ coluna }} in ({{ id_tempos | join(', ') }})
+    {%- endif -%}
+{%- endmacro %}
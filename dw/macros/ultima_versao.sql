@@ -0,0 +1,65 @@
+{#
+    Fonte deduplicada de uma dimensão: a partir do CTE `fonte` (uma linha por
+    terceirizado-mês, com as colunas da dimensão e `id_tempo`), fica uma linha
+    por `chave`, a versão do mês mais recente (empate desfeito pelo hash, para
+    o resultado não depender da ordem de leitura). `hash_atributos` guarda o
+    hash das colunas em `atributos` e `id_tempo_atualizacao` o mês da versão.
+
+    No modo incremental só saem as chaves novas ou com atributos diferentes
+    dos da tabela, e nunca uma versão mais antiga que a gravada: o
+    delete+insert da dimensão recebe só o que mudou.
+#}
+{% macro ultima_versao(fonte, chave, atributos) -%}
+    {%- set colunas = [chave] + atributos -%}
+
+versoes as (
+
+    -- Colapsa as linhas repetidas do mesmo valor antes da janela
+    select
+        {{ colunas | join(',\n        ') }},
+        max(id_tempo) as id_tempo_atualizacao
+    from {{ fonte }}
+    group by all
+
+),
+
+versoes_com_hash as (
+
+    select
+        *,
+        hash({{ atributos | join(', ') }}) as hash_atributos
+    from versoes
+
+),
+
+ultima_versao as (
+
+    select
+        {{ colunas | join(',\n        ') }},
+        hash_atributos,
+        id_tempo_atualizacao
+    from versoes_com_hash
+    qualify row_number() over (
+        partition by {{ chave }}
+        order by id_tempo_atualizacao desc, hash_atributos desc
+    ) = 1
+
+)
+
+select novo.*
+from ultima_versao as novo
+{%- if is_incremental() %}
+    {%- set colunas_atuais = adapter.get_columns_in_relation(this) | map(attribute='name') | list %}
+    {#- Tabela criada antes do hash: regrava a fonte toda; as chaves de fora do lote
+        ficam sem hash e são regravadas quando voltarem a aparecer #}
+    {%- if 'hash_atributos' in colunas_atuais %}
+left join {{ this }} as atual
+    on novo.{{ chave }} = atual.{{ chave }}
+where atual.{{ chave }} is null
+    or (
+        novo.hash_atributos is distinct from atual.hash_atributos
+        and novo.id_tempo_atualizacao >= coalesce(atual.id_tempo_atualizacao, 0)
+    )
+    {%- endif %}
+{%- endif %}
+{%- endmacro %}
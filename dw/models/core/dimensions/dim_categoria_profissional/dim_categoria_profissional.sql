@@ -4,11 +4,24 @@ config(
     schema='prata',
     tags=['core','dimension'],
     unique_key='id_categoria_profissional',
-    incremental_strategy='merge'
+    incremental_strategy='delete+insert',
+    on_schema_change='append_new_columns'
 )
 }}
 
-SELECT
-    id_categoria_profissional,
-    categoria_profissional_nome
-FROM {{ ref('brutos_terceirizados') }}
+-- Uma linha por terceirizado-mês na bronze; ultima_versao deixa uma por chave
+WITH fonte AS (
+    SELECT
+        id_categoria_profissional,
+        categoria_profissional_nome,
+        (ano * 100 + mes_numero)::int AS id_tempo
+    FROM {{ ref('brutos_terceirizados') }}
+),
+
+{{ ultima_versao(
+    'fonte',
+    chave='id_categoria_profissional',
+    atributos=[
+        'categoria_profissional_nome'
+    ]
+) }}
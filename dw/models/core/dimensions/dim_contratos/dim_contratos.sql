@@ -4,11 +4,24 @@ config(
     schema='prata',
     tags=['core','dimension'],
     unique_key='id_contrato',
-    incremental_strategy='merge'
+    incremental_strategy='delete+insert',
+    on_schema_change='append_new_columns'
 )
 }}
 
-SELECT
-    numero_contrato,
-    hash(numero_contrato) AS id_contrato
-FROM {{ ref('brutos_terceirizados') }}
+-- Uma linha por terceirizado-mês na bronze; ultima_versao deixa uma por chave
+WITH fonte AS (
+    SELECT
+        numero_contrato,
+        hash(numero_contrato) AS id_contrato,
+        (ano * 100 + mes_numero)::int AS id_tempo
+    FROM {{ ref('brutos_terceirizados') }}
+),
+
+{{ ultima_versao(
+    'fonte',
+    chave='id_contrato',
+    atributos=[
+        'numero_contrato'
+    ]
+) }}
@@ -4,15 +4,32 @@ config(
     schema='prata',
     tags=['core','dimension'],
     unique_key='id_orgao',
-    incremental_strategy='merge'
+    incremental_strategy='delete+insert',
+    on_schema_change='append_new_columns'
 )
 }}
 
-SELECT
-    orgao_nome,
-    orgao_sigla,
-    orgao_codigo_siafi,
-    orgao_codigo_siape,
-    hash(orgao_nome, orgao_sigla) AS id_orgao,
-    hash(unidade_gestora_nome, unidade_gestora_codigo) AS id_orgao_superior
-FROM {{ ref('brutos_terceirizados') }}
+-- Uma linha por terceirizado-mês na bronze; ultima_versao deixa uma por chave
+WITH fonte AS (
+    SELECT
+        orgao_nome,
+        orgao_sigla,
+        orgao_codigo_siafi,
+        orgao_codigo_siape,
+        hash(orgao_nome, orgao_sigla) AS id_orgao,
+        hash(unidade_gestora_nome, unidade_gestora_codigo) AS id_orgao_superior,
+        (ano * 100 + mes_numero)::int AS id_tempo
+    FROM {{ ref('brutos_terceirizados') }}
+),
+
+{{ ultima_versao(
+    'fonte',
+    chave='id_orgao',
+    atributos=[
+        'orgao_nome',
+        'orgao_sigla',
+        'orgao_codigo_siafi',
+        'orgao_codigo_siape',
+        'id_orgao_superior'
+    ]
+) }}
@@ -4,16 +4,34 @@ config(
     schema='prata',
     tags=['core','dimension'],
     unique_key='id_terceirizado',
-    incremental_strategy='merge'
+    incremental_strategy='delete+insert',
+    on_schema_change='append_new_columns'
 )
 }}
 
-SELECT
-    id_terceirizado,
-    cpf,
-    cnpj,
-    terceirizado_nome,
-    razao_social,
-    id_categoria_profissional,
-    escolaridade
-FROM {{ ref('brutos_terceirizados') }}
+-- Uma linha por terceirizado-mês na bronze; ultima_versao deixa uma por chave
+WITH fonte AS (
+    SELECT
+        id_terceirizado,
+        cpf,
+        cnpj,
+        terceirizado_nome,
+        razao_social,
+        id_categoria_profissional,
+        escolaridade,
+        (ano * 100 + mes_numero)::int AS id_tempo
+    FROM {{ ref('brutos_terceirizados') }}
+),
+
+{{ ultima_versao(
+    'fonte',
+    chave='id_terceirizado',
+    atributos=[
+        'cpf',
+        'cnpj',
+        'terceirizado_nome',
+        'razao_social',
+        'id_categoria_profissional',
+        'escolaridade'
+    ]
+) }}
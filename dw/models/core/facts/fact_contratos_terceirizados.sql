@@ -3,8 +3,9 @@ config(
     materialized='incremental',
     schema='prata',
     tags=['core', 'fact'],
-    incremental_strategy='merge',
-    unique_key=['id_fato']
+    incremental_strategy='delete+insert',
+    unique_key='id_tempo',
+    on_schema_change='append_new_columns'
 )
 }}
 
@@ -20,7 +21,9 @@ with source as (
         hash(numero_contrato) as id_contrato,
         hash(orgao_nome, orgao_sigla) as id_orgao,
 
-        hash(unidade_gestora_nome, unidade_gestora_codigo) as id_orgao_superior
+        hash(unidade_gestora_nome, unidade_gestora_codigo) as id_orgao_superior,
+
+        id_categoria_profissional
 
     from {{ ref('brutos_terceirizados') }}
 )
@@ -30,7 +33,6 @@ select
     hash(s.id_terceirizado, s.id_contrato, s.id_orgao, s.id_tempo) as id_fato
 from source as s
 
-{% if is_incremental() %}
-    -- No modo incremental, pegamos apenas dados novos para processar
-    where s.id_tempo >= (select max(t.id_tempo) from {{ this }} as t)
-{% endif %}
+-- No modo incremental, cada mês do lote substitui o mês inteiro na fato
+-- (delete+insert por id_tempo): um mês reprocessado não duplica linhas
+{{ filtro_particoes('s.id_tempo') }}
@@ -0,0 +1,82 @@
+{{
+config(
+    materialized='incremental',
+    schema='ouro',
+    tags=['mart','metricas_terceirizados'],
+    incremental_strategy='delete+insert',
+    unique_key='id_tempo',
+    on_schema_change='append_new_columns'
+)
+}}
+
+-- Agregados por mês x órgão superior x categoria profissional, para que os
+-- painéis leiam alguns milhares de linhas em vez da fato inteira. No modo
+-- incremental só os meses do lote são reagregados e substituídos
+
+with
+
+metricas as (
+    select
+        id_tempo,
+        id_orgao_superior,
+        id_categoria_profissional,
+        count(*) as qtd_vinculos,
+        count(distinct id_terceirizado) as qtd_terceirizados,
+        -- Vínculos com valor informado: denominadores das médias recalculadas
+        -- a partir das somas (salario_total / qtd_salarios)
+        count(salario_mensal_valor) as qtd_salarios,
+        count(custo_mensal_valor) as qtd_custos,
+        sum(salario_mensal_valor) as salario_total,
+        avg(salario_mensal_valor) as salario_medio,
+        quantile_cont(salario_mensal_valor, 0.5) as salario_p50,
+        quantile_cont(salario_mensal_valor, 0.9) as salario_p90,
+        sum(custo_mensal_valor) as custo_total,
+        avg(custo_mensal_valor) as custo_medio,
+        quantile_cont(custo_mensal_valor, 0.5) as custo_p50,
+        quantile_cont(custo_mensal_valor, 0.9) as custo_p90
+    from {{ ref('fact_contratos_terceirizados') }}
+    {{ filtro_particoes('id_tempo') }}
+    group by id_tempo, id_orgao_superior, id_categoria_profissional
+),
+
+-- Dimensões com uma linha por chave (ultima_versao + delete+insert pela
+-- chave, com teste unique): o join não multiplica os agregados
+orgaos_superiores as (
+    select
+        id_orgao_superior,
+        orgao_superior_sigla,
+        unidade_gestora_nome
+    from {{ ref('dim_orgaos_superiores') }}
+),
+
+categorias as (
+    select
+        id_categoria_profissional,
+        categoria_profissional_nome
+    from {{ ref('dim_categoria_profissional') }}
+)
+
+select
+    m.id_tempo,
+    m.id_orgao_superior,
+    orgaos_superiores.orgao_superior_sigla,
+    orgaos_superiores.unidade_gestora_nome,
+    m.id_categoria_profissional,
+    categorias.categoria_profissional_nome,
+    m.qtd_vinculos,
+    m.qtd_terceirizados,
+    m.qtd_salarios,
+    m.qtd_custos,
+    m.salario_total,
+    m.salario_medio,
+    m.salario_p50,
+    m.salario_p90,
+    m.custo_total,
+    m.custo_medio,
+    m.custo_p50,
+    m.custo_p90
+from metricas as m
+left join orgaos_superiores
+    on m.id_orgao_superior = orgaos_superiores.id_orgao_superior
+left join categorias
+    on m.id_categoria_profissional = categorias.id_categoria_profissional
@@ -1,14 +1,28 @@
 {{ config(
-    materialized='view',
+    materialized='table',
     schema='bronze',
     tags=['staging', 'bronze', 'brutos_tercerizados']
 ) }}
 
+-- Tabela, não view: a raw do lote é baixada e tipada uma vez por run, e as
+-- dimensões e a fato leem daqui em vez de reler o parquet remoto cada uma
+
+{#- parquet_path é um caminho/glob ou a lista de partições do lote incremental -#}
+{%- set parquet_path = var("parquet_path") %}
 
 with source_data as (
 
+    -- Com a raw tipada (ano=/mes=), as colunas já chegam com os tipos abaixo
+    -- e os casts viram no-op; o filtro de partição é resolvido pelo caminho
     select *
-    from read_parquet('{{ var("parquet_path") }}')
+    from read_parquet(
+        {% if parquet_path is string or parquet_path is none -%}
+            '{{ parquet_path }}'
+        {%- else -%}
+            [{% for path in parquet_path %}'{{ path }}'{{ ", " if not loop.last }}{% endfor %}]
+        {%- endif %},
+        hive_partitioning = {{ var("raw_hive_partitioning", false) }}
+    )
 
 ),
 
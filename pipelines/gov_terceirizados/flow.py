@@ -1,9 +1,19 @@
 from prefect import flow, task, get_run_logger
-from prefect_dbt import PrefectDbtRunner, PrefectDbtSettings
+from prefect.cache_policies import NONE
+from dbt.cli.main import dbtRunner
+from google.cloud import storage
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
+import contextvars
 import duckdb
+import hashlib
+import json
+import logging
 import os
+import re
+import threading
+import time
 import dotenv
 
 # PIPELINE CONFIG
@@ -12,12 +22,43 @@ REF_DATE = datetime.now().strftime("%Y-%m")
 DBT_PROJECT_DIR = Path("dw")
 DBT_PROFILES_DIR = DBT_PROJECT_DIR / ".dbt"
 
+# Modelos independentes de uma camada rodam em paralelo, respeitando o DAG
+DBT_THREADS = int(os.environ.get("DBT_THREADS", "4"))
+# Níveis dos eventos do dbt repassados ao log do Prefect (debug fica de fora)
+DBT_LOG_LEVELS = {"info": logging.INFO, "warn": logging.WARNING, "error": logging.ERROR}
+# Exports simultâneos enquanto a camada ainda roda no dbt
+EXPORT_MAX_WORKERS = int(os.environ.get("EXPORT_MAX_WORKERS", "4"))
+
+# Opções do COPY de cada export. EXPORT_OPTIONS sobrepõe o padrão por modelo
+# (ex: {"fact_contratos_terceirizados": {"partition_by": ["id_tempo"]}}); com
+# partition_by, o destino vira o diretório do modelo, particionado em hive.
+# `replaces` lista objetos de layouts antigos, removidos após um export ok
+EXPORT_DEFAULTS = {
+    "compression": "zstd",
+    "row_group_size": 122_880,
+    "partition_by": None,
+    "replaces": [],
+}
+EXPORT_OPTIONS = {
+    # A bronze só tem o lote do run: cada export acrescenta (ou substitui) as
+    # partições do lote e mantém as demais no bucket. Antes era um arquivo
+    # único, fora do diretório do modelo
+    "brutos_terceirizados": {
+        "partition_by": ["ano", "mes_numero"],
+        "replaces": ["gs://dw-bucket-storage/bronze/brutos_tercerizados.parquet"],
+    },
+    # Particionada por mês: o modo incremental reescreve só os meses do lote
+    "fact_contratos_terceirizados": {"partition_by": ["id_tempo"]},
+}
+
+# Seletores dbt de cada camada (tags dos modelos)
+DIMENSIONS_SELECTOR = "tag:dimension"
+FACTS_SELECTOR = "tag:fact"
+GOLD_SELECTOR = "tag:mart"
+
 ## PROJECT DIRECTORIES
 BRONZE_DIR = Path("/app/dw/models/staging")
 SILVER_DIR = Path("/app/dw/models/core")
-DIMENSIONS_DIR = SILVER_DIR / "dimensions"
-FACTS_DIR = SILVER_DIR / "facts"
-GOLD_DIR = Path("/app/dw/models/mart")
 
 # PROJECT BUCKETS
 RAW_BUCKET = "gs://dw-bucket-storage/raw"
@@ -25,33 +66,304 @@ BRONZE_BUCKET = "gs://dw-bucket-storage/bronze"
 SILVER_BUCKET = "gs://dw-bucket-storage/silver"
 GOLD_BUCKET = "gs://dw-bucket-storage/gold"
 
+DW_DATABASE_PATH = "/app/dw/dev.duckdb"
+
+# Partições da raw já processadas (com a assinatura dos blobs na época), no
+# mesmo banco das tabelas incrementais que elas alimentaram
+PARTITION_STATE_TABLE = "main_controle.particoes_processadas"
+
+# BANCO DA API: artefato .duckdb pronto para servir, publicado junto do gold
+API_BUCKET_NAME = "dw-bucket-storage"
+API_DATABASE_BLOB = "gold/app_database/app.duckdb"
+API_MANIFEST_BLOB = "gold/app_database/manifest.json"
+# Parquets gold de que o banco é montado: o manifesto grava as generations, e
+# a API ignora o banco se um run posterior os trocou sem publicá-lo
+API_SOURCE_BLOBS = (
+    "gold/app_terceirizados/app_terceirizados.parquet",
+    "gold/metricas_terceirizados/metricas_terceirizados.parquet",
+)
+API_DATABASE_PATH = Path("/tmp/app_database.duckdb")
+# Layout esperado pela API (api/app/db.py: DATABASE_LAYOUT e build_database).
+# Mudou tabela, ordenação ou índice? Sobe a versão dos dois lados.
+API_DATABASE_LAYOUT = 1
+API_SEARCH_COLUMNS = ("cnpj", "cpf", "orgao_superior_sigla")
+
 # Load environment variables from .env file
 
 
-def export_to_gcs(model_name: str, schema: str, path_to_parquet: str):
-    logger = get_run_logger()
-    dotenv.load_dotenv("/app/.env")
-    con = duckdb.connect("/app/dw/dev.duckdb")
-    # set credenciais do GCS para o DuckDB
-    # 1. Instalar e carregar extensões necessárias para nuvem
-    con.execute("INSTALL httpfs; LOAD httpfs;")
-
-    # 2. Configurar as credenciais GCS na sessão atual
-    con.execute(f"SET s3_access_key_id='{os.environ.get('GCS_ACCESS_ID')}';")
-    con.execute(f"SET s3_secret_access_key='{os.environ.get('GCS_SECRET')}';")
-    con.execute("SET s3_endpoint='storage.googleapis.com';")
-
-    logger.info(f"Exportando {model_name} para {path_to_parquet}...")
-    try:
-        con.execute(
-            f"COPY main_{schema}.{model_name} TO '{path_to_parquet}' (FORMAT PARQUET)"
+class ExportManager:
+    """
+    Sessão DuckDB única para os exports do run: httpfs e credenciais do GCS
+    configurados uma vez, um cursor por export e até `max_workers` exports
+    simultâneos. Cada export loga linhas, bytes e segundos.
+    """
+
+    def __init__(
+        self,
+        database_path: str = DW_DATABASE_PATH,
+        max_workers: int = EXPORT_MAX_WORKERS,
+        options: dict | None = None,
+    ):
+        self.database_path = database_path
+        self.options = {**EXPORT_OPTIONS, **(options or {})}
+        self._con = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="export"
         )
-    except Exception as e:
-        logger.error(f"Erro ao exportar {model_name} para GCS: {e}")
-    con.close()
+        # Os exports são submetidos das threads do dbt: rodam numa cópia do
+        # contexto de quem criou o manager, para o get_run_logger funcionar
+        self._context = contextvars.copy_context()
+
+    def connection(self):
+        with self._lock:
+            if self._con is None:
+                dotenv.load_dotenv("/app/.env")
+                con = duckdb.connect(self.database_path)
+                con.execute("INSTALL httpfs; LOAD httpfs;")
+                # Secret vale para a instância inteira, inclusive os cursores
+                con.execute(
+                    f"""
+                    CREATE OR REPLACE SECRET dw_gcs (
+                        TYPE gcs,
+                        KEY_ID '{os.environ.get('GCS_ACCESS_ID')}',
+                        SECRET '{os.environ.get('GCS_SECRET')}'
+                    );
+                """
+                )
+                self._con = con
+        return self._con
+
+    def model_options(self, model_name: str) -> dict:
+        return {**EXPORT_DEFAULTS, **self.options.get(model_name, {})}
+
+    def list_objects(self, directory: str) -> set[str]:
+        """Objetos (gs://bucket/caminho) sob o diretório `directory`."""
+        bucket_name, _, prefix = directory.removeprefix("gs://").partition("/")
+        return {
+            f"gs://{bucket_name}/{blob.name}"
+            for blob in storage.Client().list_blobs(
+                bucket_name, prefix=prefix.rstrip("/") + "/"
+            )
+        }
+
+    def existing_objects(self, urls: list[str]) -> list[str]:
+        if not urls:
+            return []
+        client = storage.Client()
+        existing = []
+        for url in urls:
+            bucket_name, _, name = url.removeprefix("gs://").partition("/")
+            if client.bucket(bucket_name).get_blob(name) is not None:
+                existing.append(url)
+        return existing
+
+    def delete_objects(self, urls: list[str]):
+        client = storage.Client()
+        for url in urls:
+            bucket_name, _, name = url.removeprefix("gs://").partition("/")
+            client.bucket(bucket_name).blob(name).delete()
+
+    def legacy_objects(
+        self, directory: str | None, before: set[str] | None, replaces: list[str]
+    ) -> list[str]:
+        """
+        Objetos do layout antigo do modelo: os de `replaces` que existem e, num
+        export particionado, os arquivos soltos na raiz do diretório (o layout
+        de arquivo único). Guardam as linhas de todos os meses até o primeiro
+        export completo no layout novo.
+        """
+        legacy = self.existing_objects(replaces)
+        if before is not None:
+            legacy += sorted(
+                url for url in before if url.rsplit("/", 1)[0] == directory
+            )
+        return legacy
+
+    def uncovered_objects(
+        self, legacy: list[str], partition_by: list[str], objects: set[str]
+    ) -> list[str]:
+        """
+        Arquivos do layout antigo com linhas de partições que o layout novo
+        (`objects`, caminhos coluna=valor) ainda não tem. Acontece quando a
+        tabela do modelo só tem o lote, como a bronze de um run incremental.
+        """
+        covered = {
+            tuple(
+                dict(
+                    segment.split("=", 1)
+                    for segment in url.split("/")
+                    if "=" in segment
+                ).get(column)
+                for column in partition_by
+            )
+            for url in objects
+        }
+        columns = ", ".join(partition_by)
+        cursor = self.connection().cursor()
+        try:
+            uncovered = []
+            for url in legacy:
+                partitions = {
+                    tuple("NULL" if value is None else str(value) for value in row)
+                    for row in cursor.execute(
+                        f"SELECT DISTINCT {columns} FROM read_parquet('{url}')"
+                    ).fetchall()
+                }
+                if not partitions <= covered:
+                    uncovered.append(url)
+            return uncovered
+        finally:
+            cursor.close()
+
+    def stale_objects(self, before: set[str], written: set[str]) -> list[str]:
+        """
+        Objetos das partições reescritas que o COPY não regravou. O
+        OVERWRITE_OR_IGNORE só substitui arquivos de mesmo nome; as partições
+        fora do lote ficam.
+        """
+        rewritten = {url.rsplit("/", 1)[0] for url in written}
+        return sorted(
+            url for url in before - written if url.rsplit("/", 1)[0] in rewritten
+        )
+
+    def export(
+        self,
+        model_name: str,
+        schema: str,
+        destination: str,
+        partitions: dict[str, list] | None = None,
+    ) -> dict | None:
+        """
+        Exporta main_{schema}.{model_name} para `destination` (um .parquet) e
+        retorna {"rows", "bytes", "files", "seconds"}; None se falhou.
+        Num modelo particionado, `partitions` ({coluna: valores}) limita o
+        export às partições informadas; as demais ficam como estão no bucket.
+        """
+        logger = get_run_logger()
+        options = self.model_options(model_name)
+
+        filters = [
+            f"{column} IN ({', '.join(repr(value) for value in values)})"
+            for column, values in (partitions or {}).items()
+            if values and column in (options["partition_by"] or [])
+        ]
+
+        copy_options = [
+            "FORMAT PARQUET",
+            f"COMPRESSION {options['compression']}",
+            f"ROW_GROUP_SIZE {options['row_group_size']}",
+            "RETURN_STATS true",
+        ]
+        before = None
+        try:
+            if options["partition_by"]:
+                destination = destination.rsplit("/", 1)[0]
+                before = self.list_objects(destination)
+                copy_options += [
+                    f"PARTITION_BY ({', '.join(options['partition_by'])})",
+                    "OVERWRITE_OR_IGNORE true",
+                ]
+            legacy = self.legacy_objects(destination, before, options["replaces"])
+        except Exception as e:
+            logger.error(f"Erro ao listar os arquivos de {model_name}: {e}")
+            return None
+
+        # O layout antigo só sai depois que o novo tem todas as linhas dele:
+        # com arquivos antigos no bucket, o export do lote vira completo (e,
+        # se a tabela só tem o lote, eles ficam até um run com partition='*')
+        if legacy and filters:
+            logger.info(
+                f"[EXPORT] {model_name}: layout antigo ainda no bucket; "
+                "exportando todas as partições antes de removê-lo"
+            )
+            filters = []
+
+        source = f"main_{schema}.{model_name}"
+        if filters:
+            source = f"(SELECT * FROM {source} WHERE {' AND '.join(filters)})"
+
+        logger.info(f"Exportando {model_name} para {destination}...")
+        start = time.perf_counter()
+        cursor = self.connection().cursor()
+        try:
+            files = cursor.execute(
+                f"""
+                COPY {source} TO '{destination}'
+                ({', '.join(copy_options)})
+            """
+            ).fetchall()
+        except Exception as e:
+            logger.error(f"Erro ao exportar {model_name} para GCS: {e}")
+            return None
+        finally:
+            cursor.close()
+
+        # Só depois do COPY: quem lê o diretório nunca encontra a partição vazia
+        try:
+            written = {file[0] for file in files}
+            stale = list(legacy)
+            if legacy and before is not None:
+                kept = self.uncovered_objects(
+                    legacy, options["partition_by"], before | written
+                )
+                if kept:
+                    logger.warning(
+                        f"[EXPORT] {model_name}: {', '.join(kept)} mantido(s): "
+                        "há partições que o layout novo ainda não tem; rode com "
+                        "partition='*' para completá-lo"
+                    )
+                stale = [url for url in legacy if url not in kept]
+            if before is not None:
+                stale += self.stale_objects(before, written)
+            if stale:
+                self.delete_objects(stale)
+                logger.info(
+                    f"[EXPORT] {model_name}: {len(stale)} arquivo(s) antigo(s) "
+                    f"removido(s): {', '.join(stale)}"
+                )
+        except Exception as e:
+            logger.error(f"Erro ao remover arquivos antigos de {model_name}: {e}")
+            return None
+
+        stats = {
+            "rows": sum(file[1] for file in files),
+            "bytes": sum(file[2] for file in files),
+            "files": len(files),
+            "seconds": time.perf_counter() - start,
+        }
+        logger.info(
+            f"[EXPORT] {model_name}: {stats['rows']} linhas, "
+            f"{stats['bytes'] / 1e6:.1f} MB em {stats['files']} arquivo(s), "
+            f"{stats['seconds']:.1f}s ({options['compression']}, "
+            f"row group {options['row_group_size']})"
+        )
+        return stats
+
+    def submit(
+        self,
+        model_name: str,
+        schema: str,
+        destination: str,
+        partitions: dict[str, list] | None = None,
+    ):
+        return self._executor.submit(
+            self._context.copy().run,
+            self.export,
+            model_name,
+            schema,
+            destination,
+            partitions,
+        )
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        if self._con is not None:
+            self._con.close()
+            self._con = None
 
 
-def run_dbt_commands(commands: list[list[str]], vars: dict | None = None) -> None:
+def load_dbt_env():
     logger = get_run_logger()
 
     if dotenv.load_dotenv("/app/.env"):
@@ -63,118 +375,490 @@ def run_dbt_commands(commands: list[list[str]], vars: dict | None = None) -> Non
             "Não foi possível carregar as variáveis de ambiente do arquivo .env"
         )
 
-    settings = PrefectDbtSettings(
-        project_dir=str(DBT_PROJECT_DIR), profiles_dir=str(DBT_PROFILES_DIR)
+
+def run_dbt_layer(
+    selector: str,
+    schema: str,
+    exports: ExportManager,
+    export_path,
+    threads: int = DBT_THREADS,
+    vars: dict | None = None,
+    partitions: dict[str, list] | None = None,
+) -> dict[str, dict]:
+    """
+    Roda a camada numa única invocação do dbt (`--select selector`), com o
+    DAG decidindo o que roda em paralelo, e exporta cada modelo para o GCS
+    assim que ele termina, enquanto o resto da camada segue rodando.
+    `partitions` restringe os exports particionados às partições do lote.
+    Retorna os tempos por modelo: {modelo: {"dbt": s, "export": s}}.
+    Um export que falha falha a camada: no modo incremental, o lote só é
+    marcado como processado se tudo chegou ao bucket.
+    """
+    logger = get_run_logger()
+    load_dbt_env()
+
+    timings = {}
+    pending = {}
+
+    def on_node_finished(event):
+        node = event.data.node_info
+        result = event.data.run_result
+        if not node.unique_id.startswith("model."):
+            return
+
+        timings[node.node_name] = {"dbt": result.execution_time}
+        if result.status != "success":
+            return
+        logger.info(
+            f"[DBT] {node.node_name} concluído em {result.execution_time:.1f}s; "
+            "exportando"
+        )
+        pending[node.node_name] = exports.submit(
+            node.node_name, schema, export_path(node.node_name), partitions
+        )
+
+    def on_event(event):
+        # Callback público do dbtRunner, chamado das threads do dbt para cada
+        # evento: repassa o log ao Prefect e dispara o export de cada modelo
+        level = DBT_LOG_LEVELS.get(event.info.level)
+        if level is not None and event.info.msg:
+            logger.log(level, event.info.msg)
+        if event.info.name == "NodeFinished":
+            on_node_finished(event)
+
+    runner = dbtRunner(callbacks=[on_event])
+
+    cmd_parts = ["run", "--select", selector, "--threads", str(threads)]
+    if vars:
+        cmd_parts += ["--vars", json.dumps(vars)]
+
+    logger.info(f"Executando: dbt {' '.join(cmd_parts)}")
+    try:
+        result = runner.invoke(
+            cmd_parts
+            + ["--project-dir", str(DBT_PROJECT_DIR)]
+            + ["--profiles-dir", str(DBT_PROFILES_DIR)]
+        )
+    finally:
+        # Mesmo com falha na camada, os modelos que terminaram são exportados
+        failed_exports = []
+        for model_name, future in pending.items():
+            stats = future.result()
+            if stats is None:
+                failed_exports.append(model_name)
+            else:
+                timings[model_name]["export"] = stats["seconds"]
+
+    if not result.success:
+        raise Exception(
+            f"Erro ao executar dbt {' '.join(cmd_parts)}: "
+            f"{result.exception or 'há modelos com falha'}"
+        )
+    if failed_exports:
+        raise Exception(f"Erro ao exportar {', '.join(failed_exports)} para o GCS")
+    return timings
+
+
+def log_timings(layers: dict[str, dict]):
+    """Resumo do run: tempo de dbt e de export por modelo, camada a camada."""
+    logger = get_run_logger()
+    logger.info(f"[TEMPOS] {'camada':<8} {'modelo':<32} {'dbt':>8} {'export':>8}")
+    for layer, timings in layers.items():
+        ordered = sorted(timings.items(), key=lambda item: -item[1]["dbt"])
+        for model_name, timing in ordered:
+            export = timing.get("export")
+            logger.info(
+                f"[TEMPOS] {layer:<8} {model_name:<32} {timing['dbt']:>7.1f}s "
+                + (f"{export:>7.1f}s" if export is not None else f"{'-':>8}")
+            )
+
+
+def schema_hash(con, catalog, schema, table):
+    """Hash das colunas (nome e tipo, em ordem); a API calcula igual ao validar."""
+    columns = con.execute(
+        """
+        SELECT column_name, data_type
+        FROM information_schema.columns
+        WHERE table_catalog = ? AND table_schema = ? AND table_name = ?
+        ORDER BY ordinal_position
+        """,
+        [catalog, schema, table],
+    ).fetchall()
+    return hashlib.sha256(json.dumps(columns).encode()).hexdigest()
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_api_database(db_path: Path) -> dict:
+    """
+    Monta o banco servido pela API a partir do gold do dbt: tabelas ordenadas,
+    índice ART no id e cópias por coluna de busca, com CHECKPOINT no fim.
+    Retorna o manifesto (sem a generation, conhecida só após o upload).
+    """
+    logger = get_run_logger()
+    db_path.unlink(missing_ok=True)
+    built_at = datetime.now(timezone.utc)
+
+    con = duckdb.connect(DW_DATABASE_PATH)
+    con.execute(f"ATTACH '{db_path}' AS artefato;")
+    con.execute("CREATE SCHEMA artefato.ouro;")
+    con.execute(
+        """
+        CREATE TABLE artefato.ouro.app_terceirizados AS
+        SELECT * FROM main_ouro.app_terceirizados
+        ORDER BY id_terceirizado;
+    """
+    )
+    con.execute(
+        """
+        CREATE INDEX idx_app_terceirizados_id
+        ON artefato.ouro.app_terceirizados (id_terceirizado);
+    """
+    )
+    for column in API_SEARCH_COLUMNS:
+        con.execute(
+            f"""
+            CREATE TABLE artefato.ouro.app_terceirizados_por_{column} AS
+            SELECT * FROM artefato.ouro.app_terceirizados
+            ORDER BY {column}, id_terceirizado;
+        """
+        )
+    con.execute(
+        """
+        CREATE TABLE artefato.ouro.metricas_terceirizados AS
+        SELECT * FROM main_ouro.metricas_terceirizados
+        ORDER BY id_tempo, orgao_superior_sigla, id_categoria_profissional;
+    """
     )
 
-    runner = PrefectDbtRunner(
-        settings=settings,
-        raise_on_failure=True,
+    row_count = con.execute(
+        "SELECT COUNT(*) FROM artefato.ouro.app_terceirizados"
+    ).fetchone()[0]
+    metrics_count = con.execute(
+        "SELECT COUNT(*) FROM artefato.ouro.metricas_terceirizados"
+    ).fetchone()[0]
+    app_schema_hash = schema_hash(con, "artefato", "ouro", "app_terceirizados")
+    version = f"{built_at:%Y%m%dT%H%M%SZ}-{app_schema_hash[:12]}"
+
+    con.execute(
+        "CREATE TABLE artefato.ouro.app_snapshot AS SELECT ?::VARCHAR AS version;",
+        [version],
     )
+    con.execute("CHECKPOINT artefato;")
+    con.execute("DETACH artefato;")
+    con.close()
 
-    for cmd_parts in commands:
-        if vars:
-            import json
+    manifest = {
+        "layout": API_DATABASE_LAYOUT,
+        "version": version,
+        "built_at": built_at.isoformat(),
+        "row_count": row_count,
+        "schema_hash": app_schema_hash,
+        "tables": {
+            "ouro.app_terceirizados": row_count,
+            "ouro.metricas_terceirizados": metrics_count,
+        },
+        "size": db_path.stat().st_size,
+        "sha256": file_sha256(db_path),
+    }
+    logger.info(
+        f"[API DB] {db_path} montado: {row_count} linhas, "
+        f"{manifest['size'] / 1e6:.1f} MB, versão {version}"
+    )
+    return manifest
 
-            vars_string = json.dumps(vars)
-            cmd_parts = cmd_parts + ["--vars", vars_string]
 
-        logger.info(f"Executando: dbt {' '.join(cmd_parts)}")
-        result = runner.invoke(cmd_parts)
+@task(name="Publish API Database")
+def publish_api_database(db_path: Path = API_DATABASE_PATH):
+    """
+    Publica o banco da API e, depois dele, o manifesto que aponta para a
+    generation enviada: quem lê o manifesto nunca baixa um banco de outra
+    execução. O manifesto guarda também as generations dos parquets gold
+    exportados neste run, com que a API detecta um banco desatualizado.
+    """
+    logger = get_run_logger()
+    manifest = build_api_database(db_path)
+
+    bucket = storage.Client().bucket(API_BUCKET_NAME)
+    manifest["sources"] = {
+        name: source.generation
+        for name in API_SOURCE_BLOBS
+        if (source := bucket.get_blob(name)) is not None
+    }
+    blob = bucket.blob(API_DATABASE_BLOB)
+    blob.upload_from_filename(db_path)
+    manifest["generation"] = blob.generation
+
+    bucket.blob(API_MANIFEST_BLOB).upload_from_string(
+        json.dumps(manifest, indent=2), content_type="application/json"
+    )
+    db_path.unlink(missing_ok=True)
+    logger.info(
+        f"[API DB] Publicado em {API_BUCKET_NAME}/{API_DATABASE_BLOB} "
+        f"(generation {manifest['generation']})"
+    )
+    return manifest
 
-        if not result.success:
-            raise Exception(f"Erro ao executar dbt {' '.join(cmd_parts)}")
 
+def raw_parquet_path(partition: str = "*", typed_raw: bool = False) -> str:
+    """Caminho lido pela bronze: arquivos planos ou a raw tipada em ano=/mes=."""
+    if not typed_raw:
+        if partition == "*":
+            return RAW_BUCKET + "/*.parquet"
+        return RAW_BUCKET + f"/terceirizados_{partition}.parquet"
 
-@task(name="Run Bronze Layer")
-def dbt_run_bronze(partition: str = "*"):
+    # Particionada: o próprio caminho seleciona (e poda) a partição pedida
     if partition == "*":
-        parquet_path = "*.parquet"
-    else:
-        parquet_path = f"terceirizados_{partition}.parquet"
+        return RAW_BUCKET + "/terceirizados/*/*/*.parquet"
+    ano, mes = partition.split("-")
+    return RAW_BUCKET + f"/terceirizados/ano={ano}/mes={mes}/*.parquet"
 
-    run_dbt_commands(
-        commands=[["run", "--select", "brutos_terceirizados"]],
-        vars={"parquet_path": RAW_BUCKET + f"/{parquet_path}"},
-    )
 
-    export_to_gcs(
-        model_name="brutos_terceirizados",
-        schema="bronze",
-        path_to_parquet=str(BRONZE_BUCKET + "/brutos_tercerizados.parquet"),
+def raw_blob_partition(blob_name: str, typed_raw: bool = False) -> str | None:
+    """Partição AAAA-MM de um blob da raw (plano ou ano=/mes=), ou None."""
+    if typed_raw:
+        match = re.fullmatch(
+            r"raw/terceirizados/ano=(\d{4})/mes=(\d{2})/[^/]+\.parquet", blob_name
+        )
+    else:
+        match = re.fullmatch(r"raw/terceirizados_(\d{4})-(\d{2})\.parquet", blob_name)
+    return f"{match[1]}-{match[2]}" if match else None
+
+
+def open_partition_state():
+    con = duckdb.connect(DW_DATABASE_PATH)
+    con.execute("CREATE SCHEMA IF NOT EXISTS main_controle;")
+    con.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {PARTITION_STATE_TABLE} (
+            particao VARCHAR PRIMARY KEY,
+            assinatura VARCHAR,
+            processado_em TIMESTAMP
+        );
+    """
     )
+    return con
 
 
-@task(name="Run Silver Dimensions")
-def dbt_run_silver_dims(dimensions_dir: Path):
-    sql_files = sorted([file.name for file in dimensions_dir.rglob("*.sql")])
+@task(name="Find Changed Partitions")
+def find_changed_partitions(typed_raw: bool = False) -> dict[str, str]:
+    """
+    Partições da raw novas ou alteradas desde o último processamento: a
+    assinatura de cada uma (generations dos blobs) é comparada com a gravada
+    em PARTITION_STATE_TABLE. Retorna {particao: assinatura}.
+    """
+    logger = get_run_logger()
 
-    for sql_file in sql_files:
-        model_name, _ = sql_file.split(".")  # nome do arquivo sem .sql
+    bucket_name, prefix = RAW_BUCKET.replace("gs://", "").split("/")
+    generations = {}
+    for blob in storage.Client().list_blobs(bucket_name, prefix=f"{prefix}/"):
+        partition = raw_blob_partition(blob.name, typed_raw)
+        if partition is not None:
+            generations.setdefault(partition, []).append(str(blob.generation))
+    signatures = {
+        partition: "-".join(sorted(values)) for partition, values in generations.items()
+    }
+
+    con = open_partition_state()
+    processed = dict(
+        con.execute(
+            f"SELECT particao, assinatura FROM {PARTITION_STATE_TABLE}"
+        ).fetchall()
+    )
+    con.close()
 
-        run_dbt_commands(commands=[["run", "--select", model_name]])
+    changed = {
+        partition: signature
+        for partition, signature in sorted(signatures.items())
+        if processed.get(partition) != signature
+    }
+    logger.info(
+        f"[INCREMENTAL] {len(signatures)} partições na raw, "
+        f"{len(changed)} novas ou alteradas: {', '.join(changed) or '-'}"
+    )
+    return changed
+
+
+@task(name="Mark Partitions Processed")
+def mark_partitions_processed(signatures: dict[str, str]):
+    con = open_partition_state()
+    con.executemany(
+        f"""
+        INSERT OR REPLACE INTO {PARTITION_STATE_TABLE}
+        VALUES (?, ?, current_timestamp)
+        """,
+        list(signatures.items()),
+    )
+    con.close()
 
-        export_to_gcs(
-            model_name=model_name,
-            schema="prata",
-            path_to_parquet=str(
-                SILVER_BUCKET + f"/{model_name}" + f"/{model_name}.parquet"
-            ),
-        )
 
+def partition_id_tempos(partitions: list[str]) -> list[int] | None:
+    """id_tempo (AAAAMM) das partições do lote; None quando é a raw inteira."""
+    if "*" in partitions:
+        return None
+    return [int(partition.replace("-", "")) for partition in partitions]
 
-@task(name="Run Silver Facts")
-def dbt_run_silver_facts(facts_dir: Path):
-    sql_files = sorted([file.name for file in facts_dir.rglob("*.sql")])
 
-    for sql_file in sql_files:
-        model_name, _ = sql_file.split(".")  # nome do arquivo sem .sql
+def model_parquet_path(bucket: str):
+    """Destino padrão dos exports: <bucket>/<modelo>/<modelo>.parquet."""
+    return lambda model_name: f"{bucket}/{model_name}/{model_name}.parquet"
 
-        run_dbt_commands(commands=[["run", "--select", model_name]])
 
-        export_to_gcs(
-            model_name=model_name,
-            schema="prata",
-            path_to_parquet=str(
-                SILVER_BUCKET + f"/{model_name}" + f"/{model_name}.parquet"
-            ),
-        )
+@task(name="Run Bronze Layer", cache_policy=NONE)
+def dbt_run_bronze(
+    exports: ExportManager, partitions: list[str], typed_raw: bool = False
+):
+    paths = [raw_parquet_path(partition, typed_raw) for partition in partitions]
+    return run_dbt_layer(
+        selector="brutos_terceirizados",
+        schema="bronze",
+        exports=exports,
+        export_path=model_parquet_path(BRONZE_BUCKET),
+        vars={
+            "parquet_path": paths[0] if len(paths) == 1 else paths,
+            "raw_hive_partitioning": typed_raw,
+        },
+    )
 
 
-@task(name="Run Gold Layer")
-def dbt_run_gold():
-    sql_files = sorted([file.name for file in GOLD_DIR.rglob("*.sql")])
+@task(name="Run Silver Dimensions", cache_policy=NONE)
+def dbt_run_silver_dims(
+    exports: ExportManager,
+    selector: str = DIMENSIONS_SELECTOR,
+    threads: int = DBT_THREADS,
+):
+    return run_dbt_layer(
+        selector=selector,
+        schema="prata",
+        exports=exports,
+        export_path=model_parquet_path(SILVER_BUCKET),
+        threads=threads,
+    )
 
-    for sql_file in sql_files:
-        model_name, _ = sql_file.split(".")  # nome do arquivo sem .sql
 
-        run_dbt_commands(commands=[["run", "--select", model_name]])
+@task(name="Run Silver Facts", cache_policy=NONE)
+def dbt_run_silver_facts(
+    exports: ExportManager,
+    id_tempos: list[int] | None = None,
+    selector: str = FACTS_SELECTOR,
+    threads: int = DBT_THREADS,
+):
+    return run_dbt_layer(
+        selector=selector,
+        schema="prata",
+        exports=exports,
+        export_path=model_parquet_path(SILVER_BUCKET),
+        threads=threads,
+        vars={"id_tempos": id_tempos} if id_tempos else None,
+        partitions={"id_tempo": id_tempos} if id_tempos else None,
+    )
 
-        export_to_gcs(
-            model_name=model_name,
-            schema="ouro",
-            path_to_parquet=str(
-                GOLD_BUCKET + f"/{model_name}" + f"/{model_name}.parquet"
-            ),
-        )
+
+@task(name="Run Gold Layer", cache_policy=NONE)
+def dbt_run_gold(
+    exports: ExportManager,
+    id_tempos: list[int] | None = None,
+    selector: str = GOLD_SELECTOR,
+    threads: int = DBT_THREADS,
+):
+    return run_dbt_layer(
+        selector=selector,
+        schema="ouro",
+        exports=exports,
+        export_path=model_parquet_path(GOLD_BUCKET),
+        threads=threads,
+        vars={"id_tempos": id_tempos} if id_tempos else None,
+        partitions={"id_tempo": id_tempos} if id_tempos else None,
+    )
 
 
 @flow(name="terceirizados-pipeline")
 def gov_terceirizados_flow(
     partition: str = REF_DATE,
-    dimensions_dir: Path = DIMENSIONS_DIR,
-    facts_dir: Path = FACTS_DIR,
+    incremental: bool = False,
+    dimensions_selector: str = DIMENSIONS_SELECTOR,
+    facts_selector: str = FACTS_SELECTOR,
+    gold_selector: str = GOLD_SELECTOR,
+    dbt_threads: int = DBT_THREADS,
+    typed_raw: bool = False,
+    publish_database: bool = True,
+    export_max_workers: int = EXPORT_MAX_WORKERS,
+    export_options: dict[str, dict] | None = None,
 ):
     """
     Pipeline completo:
-    raw (parquet) -> bronze (merge) -> silver -> gold
+    raw (parquet) -> bronze (merge) -> silver -> gold (-> banco da API)
+
+    Com `incremental=True`, `partition` é ignorada: o lote são as partições da
+    raw novas ou alteradas desde o último run, e só elas passam pelas camadas
+    (dimensões com as chaves do lote, fato e métricas substituindo os meses
+    do lote, exports particionados só desses meses).
     """
+    logger = get_run_logger()
 
-    bronze = dbt_run_bronze(partition=partition)
-    silver_dims = dbt_run_silver_dims(dimensions_dir=dimensions_dir, wait_for=[bronze])
-    silver_facts = dbt_run_silver_facts(facts_dir=facts_dir, wait_for=[silver_dims])
-    dbt_run_gold(wait_for=[silver_facts])
+    if incremental:
+        signatures = find_changed_partitions(typed_raw=typed_raw)
+        if not signatures:
+            logger.info("[INCREMENTAL] Nenhuma partição nova; nada a processar")
+            return
+        partitions = list(signatures)
+    else:
+        signatures = None
+        partitions = [partition]
+    id_tempos = partition_id_tempos(partitions)
+
+    # Uma sessão de export para o run inteiro; export_options sobrepõe
+    # EXPORT_OPTIONS por modelo (compression, row_group_size, partition_by)
+    exports = ExportManager(max_workers=export_max_workers, options=export_options)
+    try:
+        bronze = dbt_run_bronze(
+            exports=exports, partitions=partitions, typed_raw=typed_raw
+        )
+        silver_dims = dbt_run_silver_dims(
+            exports=exports,
+            selector=dimensions_selector,
+            threads=dbt_threads,
+            wait_for=[bronze],
+        )
+        silver_facts = dbt_run_silver_facts(
+            exports=exports,
+            id_tempos=id_tempos,
+            selector=facts_selector,
+            threads=dbt_threads,
+            wait_for=[silver_dims],
+        )
+        gold = dbt_run_gold(
+            exports=exports,
+            id_tempos=id_tempos,
+            selector=gold_selector,
+            threads=dbt_threads,
+            wait_for=[silver_facts],
+        )
+    finally:
+        exports.close()
+
+    if publish_database:
+        publish_api_database(wait_for=[gold])
+
+    # Só depois de todas as camadas: um run que falha reprocessa o lote
+    if signatures:
+        mark_partitions_processed(signatures, wait_for=[gold])
+
+    log_timings(
+        {
+            "bronze": bronze,
+            "dims": silver_dims,
+            "facts": silver_facts,
+            "gold": gold,
+        }
+    )
 
 
 if __name__ == "__main__":
-    gov_terceirizados_flow(dimensions_dir=DIMENSIONS_DIR, facts_dir=FACTS_DIR)
+    gov_terceirizados_flow()
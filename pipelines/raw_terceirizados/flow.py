@@ -1,4 +1,5 @@
 from prefect import flow, task, get_run_logger
+from prefect.cache_policies import NONE
 from pathlib import Path
 from datetime import datetime
 import dotenv
@@ -6,14 +7,23 @@ import os
 import sys
 import requests
 from requests.adapters import HTTPAdapter, Retry
-from bs4 import BeautifulSoup
+import lxml.html
 import re
+import csv
 import pandas as pd
 import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
 import pyarrow.parquet as pq
 from google.cloud import storage
 import yaml
 import time
+import io
+import queue
+import threading
+import urllib3
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 
 
 # PIPELINE DATE
@@ -24,6 +34,7 @@ ROOT_DIR = Path(__file__).resolve().parents[2]
 CONFIG_PATH = ROOT_DIR / "config" / "sync_gcs_config.yml"
 DOWNLOAD_DIR = ROOT_DIR / "downloads"
 DOWNLOAD_DIR.mkdir(parents=True, exist_ok=True)
+INDEX_PATH = DOWNLOAD_DIR / "listing_index.sqlite"
 
 # PROJECT BUCKETS
 RAW_BUCKET = "gs://dw-bucket-storage/raw"
@@ -31,6 +42,49 @@ RAW_BUCKET = "gs://dw-bucket-storage/raw"
 # --- CONFIGURAÇÕES ---
 BASE_URL = "https://www.gov.br/cgu/pt-br/acesso-a-informacao/dados-abertos/arquivos/terceirizados/arquivos/"
 PAGE_SIZE = 20
+HEAD_MAX_WORKERS = 8  # HEADs simultâneos no servidor do gov.br
+DOWNLOAD_BACKOFF = 5  # segundos; dobra a cada nova tentativa
+CRAWL_MAX_WORKERS = 4  # páginas da listagem buscadas em paralelo
+CRAWL_WAVE_DELAY = 0.5  # pausa entre cada leva de páginas
+ENTRY_XPATH = (
+    "//article[contains(concat(' ', normalize-space(@class), ' '), ' entry ')]"
+)
+PERIOD_NUM_RE = re.compile(r"((?:19|20)\d{2})(0[1-9]|1[0-2])")
+
+# CONVERSÃO EM STREAMING
+CSV_ENCODING = "latin-1"
+CSV_DELIMITER = ";"
+CSV_BLOCK_SIZE = 1 << 20  # 1MB por bloco lido do CSV
+ROW_GROUP_SIZE = 100_000
+# CAMADA RAW TIPADA (particionada em ano=/mes=)
+RAW_TYPED_COMPRESSION = "zstd"
+LOW_CARDINALITY = pa.dictionary(pa.int32(), pa.string())
+RAW_TYPES = {
+    "id_terc": pa.int32(),
+    "sg_orgao_sup_tabela_ug": LOW_CARDINALITY,
+    "cd_ug_gestora": pa.int32(),
+    "nm_ug_tabela_ug": LOW_CARDINALITY,
+    "sg_ug_gestora": LOW_CARDINALITY,
+    "nm_razao_social": LOW_CARDINALITY,
+    "nm_categoria_profissional": LOW_CARDINALITY,
+    "nm_escolaridade": LOW_CARDINALITY,
+    "nm_unidade_prestacao": LOW_CARDINALITY,
+    "vl_mensal_salario": pa.decimal128(18, 2),
+    "vl_mensal_custo": pa.decimal128(18, 2),
+    "num_mes_carga": pa.int32(),
+    "mes_carga": LOW_CARDINALITY,
+    "ano_carga": pa.int32(),
+    "sg_orgao": LOW_CARDINALITY,
+    "nm_orgao": LOW_CARDINALITY,
+    "cd_orgao_siafi": pa.int32(),
+    "cd_orgao_siape": pa.int32(),
+}
+
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # múltiplo de 256KB exigido pelo GCS
+_UPLOAD_ABORT = object()
+
+# BACKFILL
+BACKFILL_MAX_WORKERS = 4  # períodos baixados/convertidos/enviados ao mesmo tempo
 
 os.makedirs(DOWNLOAD_DIR, exist_ok=True)
 
@@ -72,7 +126,11 @@ def get_secure_session():
     retries = Retry(
         total=5, backoff_factor=3, status_forcelist=[429, 500, 502, 503, 504]
     )
-    session.mount("https://", HTTPAdapter(max_retries=retries))
+    # O pool precisa comportar as requisições concorrentes do filtro de versões
+    session.mount(
+        "https://",
+        HTTPAdapter(max_retries=retries, pool_maxsize=HEAD_MAX_WORKERS),
+    )
     return session
 
 
@@ -99,146 +157,621 @@ def parse_human_input(user_input):
 # -- BUSCA --
 
 
-def fetch_candidates(session, user_input):
+def parse_listing_page(content):
+    """Retorna o primeiro href de cada `article.entry` da página (None se não houver)."""
+    if not content:
+        return []
+
+    tree = lxml.html.fromstring(content)
+    hrefs = []
+    for article in tree.xpath(ENTRY_XPATH):
+        links = article.xpath(".//a[@href]")
+        hrefs.append(links[0].get("href") if links else None)
+    return hrefs
+
+
+def fetch_listing_page(session, start):
+    response = session.get(f"{BASE_URL}?b_start:int={start}", timeout=30)
+    return parse_listing_page(response.content)
+
+
+def crawl_listing(session, max_workers=CRAWL_MAX_WORKERS, first_start=0):
+    """Gera as páginas da listagem em ordem, buscando-as em levas paralelas."""
+    start = first_start
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            starts = [start + i * PAGE_SIZE for i in range(max_workers)]
+            wave = executor.map(lambda s: fetch_listing_page(session, s), starts)
+
+            # As páginas são entregues na ordem da listagem
+            for hrefs in wave:
+                if not hrefs:
+                    return
+                yield hrefs
+                if len(hrefs) < PAGE_SIZE:
+                    return
+
+            start += max_workers * PAGE_SIZE
+            time.sleep(CRAWL_WAVE_DELAY)
+
+
+def extract_period(href):
+    """Extrai o período YYYYMM do nome do arquivo, se houver."""
+    href = href.lower()
+    num_match = PERIOD_NUM_RE.search(href)
+    if num_match:
+        return num_match.group(1) + num_match.group(2)
+
+    year_match = re.search(r"((?:19|20)\d{2})", href)
+    if year_match:
+        for num, name in MONTHS_MAP.items():
+            if name in href:
+                return year_match.group(1) + num
+    return None
+
+
+def href_matches(href, year, m_num, m_name):
+    href = href.lower()
+
+    is_file = ".csv" in href or ".xlsx" in href
+    match_num = f"{year}{m_num}" in href if (year and m_num) else False
+    match_text = (m_name in href and year in href) if (m_name and year) else False
+
+    return is_file and (match_num or match_text)
+
+
+class ListingOrder:
+    """
+    Acompanha a ordenação da listagem pelos períodos dos links lidos até aqui:
+    decrescente enquanto nenhum período for maior que o anterior.
+    """
+
+    def __init__(self):
+        self.first_period = None
+        self.last_period = None
+        self.descending = True
+
+    def observe(self, hrefs):
+        for href in hrefs:
+            period = extract_period(href) if href else None
+            if period:
+                self.first_period = self.first_period or period
+                if self.last_period and period > self.last_period:
+                    self.descending = False
+                self.last_period = period
+
+    def is_descending(self):
+        """Decrescente e com mais de um período visto: dá para parar antes do fim."""
+        return (
+            self.descending
+            and self.last_period is not None
+            and self.first_period > self.last_period
+        )
+
+
+def fetch_candidates(session, user_input, max_workers=CRAWL_MAX_WORKERS):
     logger = get_run_logger()
     year, m_num, m_name = parse_human_input(user_input)
     logger.info(f"[FETCH] Buscando candidatos para: {m_name or m_num}/{year}")
+    target = f"{year}{m_num}" if (year and m_num) else None
 
     candidates = []
-    start = 0
+    pages = 0
+    # Acompanha a ordenação da listagem para saber quando parar antes do fim
+    order = ListingOrder()
+
+    for hrefs in crawl_listing(session, max_workers):
+        pages += 1
+        order.observe(hrefs)
+        candidates += [
+            href for href in hrefs if href and href_matches(href, year, m_num, m_name)
+        ]
+
+        # Listagem em ordem decrescente já passou do período pedido
+        if target and order.is_descending() and order.last_period < target:
+            logger.info(
+                f"[FETCH] Listagem já está em {order.last_period}; "
+                f"encerrando busca na página {pages}"
+            )
+            break
+
+    logger.info(f"[FETCH] {pages} páginas lidas, {len(candidates)} candidatos")
+    return list(dict.fromkeys(candidates))
+
+
+# -- ÍNDICE LOCAL DA LISTAGEM --
+
+
+def open_listing_index(path=INDEX_PATH):
+    """Abre (ou cria) o índice local período -> links -> metadados HTTP."""
+    con = sqlite3.connect(path)
+    con.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS listing (
+            href TEXT PRIMARY KEY,
+            period TEXT,
+            last_modified TEXT,
+            etag TEXT,
+            size INTEGER,
+            seen_at TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_listing_period ON listing (period);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """
+    )
+    return con
 
-    while True:
-        url = f"{BASE_URL}?b_start:int={start}"
-        response = session.get(url, timeout=30)
-        soup = BeautifulSoup(response.text, "html.parser")
-        articles = soup.find_all("article", class_="entry")
 
-        if not articles:
-            break
+def get_index_meta(con, key):
+    row = con.execute("SELECT value FROM meta WHERE key = ?", [key]).fetchone()
+    return row[0] if row else None
 
-        for article in articles:
-            a_tag = article.find("a", href=True)
-            if not a_tag:
-                continue
 
-            href = a_tag["href"].lower()
+def set_index_meta(con, key, value):
+    con.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [key, value])
 
-            is_file = ".csv" in href or ".xlsx" in href
-            match_num = f"{year}{m_num}" in href if (year and m_num) else False
-            match_text = (
-                (m_name in href and year in href) if (m_name and year) else False
+
+def refresh_listing_index(session, con, max_workers=CRAWL_MAX_WORKERS, full=False):
+    """
+    Atualiza o índice com as entradas novas da listagem.
+    A primeira página é pedida com If-Modified-Since; se nada mudou, não há crawl.
+    Após um crawl completo, para na primeira página com entradas já conhecidas,
+    desde que a listagem venha em ordem decrescente de período (ListingOrder).
+    Com `full=True`, relê a listagem inteira, sem If-Modified-Since.
+    """
+    logger = get_run_logger()
+    headers = {}
+    listing_modified = get_index_meta(con, "listing_last_modified")
+    if listing_modified and not full:
+        headers["If-Modified-Since"] = listing_modified
+
+    response = session.get(f"{BASE_URL}?b_start:int=0", headers=headers, timeout=30)
+    if response.status_code == 304:
+        logger.info("[INDEX] Listagem não mudou desde a última atualização")
+        return 0
+
+    crawl_complete = get_index_meta(con, "crawl_complete") == "1" and not full
+    order = ListingOrder()
+    now = datetime.now().isoformat(timespec="seconds")
+
+    def insert_page(hrefs):
+        """Insere as entradas da página e diz se alguma delas já era conhecida."""
+        order.observe(hrefs)
+        rows = [(href, extract_period(href), now) for href in hrefs if href]
+        before = con.total_changes
+        con.executemany(
+            "INSERT OR IGNORE INTO listing (href, period, seen_at) VALUES (?, ?, ?)",
+            rows,
+        )
+        added = con.total_changes - before
+        return added, added < len(rows)
+
+    first_page = parse_listing_page(response.content)
+    new_entries, has_known = insert_page(first_page)
+    pages = 1
+    reached_end = len(first_page) < PAGE_SIZE
+    # Listagem ordenada: ao encontrar uma entrada conhecida, o resto já está no
+    # índice. Fora de ordem, entradas novas podem vir depois das conhecidas
+    stopped_early = crawl_complete and has_known and order.is_descending()
+
+    if not (reached_end or stopped_early):
+        for hrefs in crawl_listing(session, max_workers, first_start=PAGE_SIZE):
+            pages += 1
+            added, has_known = insert_page(hrefs)
+            new_entries += added
+            if crawl_complete and has_known and order.is_descending():
+                stopped_early = True
+                break
+        else:
+            reached_end = True
+
+    if reached_end or stopped_early:
+        set_index_meta(con, "crawl_complete", "1")
+        if response.headers.get("Last-Modified"):
+            set_index_meta(
+                con, "listing_last_modified", response.headers["Last-Modified"]
             )
+    set_index_meta(con, "refreshed_at", now)
+    con.commit()
 
-            if is_file and (match_num or match_text):
-                candidates.append(a_tag["href"])
+    logger.info(f"[INDEX] {pages} páginas lidas, {new_entries} entradas novas")
+    return new_entries
 
-        if len(articles) < PAGE_SIZE:
-            break
-        start += PAGE_SIZE
-        time.sleep(0.5)
 
-    return list(set(candidates))
+def lookup_candidates(con, user_input):
+    """Resolve os candidatos de um período direto no índice local."""
+    logger = get_run_logger()
+    year, m_num, m_name = parse_human_input(user_input)
+    rows = con.execute(
+        "SELECT href FROM listing WHERE period = ? ORDER BY rowid", [f"{year}{m_num}"]
+    ).fetchall()
+    candidates = [href for (href,) in rows if href_matches(href, year, m_num, m_name)]
+    logger.info(f"[INDEX] {len(candidates)} candidatos para {m_name or m_num}/{year}")
+    return candidates
+
+
+def load_index_metadata(con, candidates):
+    placeholders = ", ".join("?" for _ in candidates)
+    rows = con.execute(
+        f"SELECT href, last_modified, etag, size FROM listing "
+        f"WHERE href IN ({placeholders})",
+        candidates,
+    ).fetchall()
+    return {
+        href: {"last_modified": last_modified, "etag": etag, "size": size}
+        for href, last_modified, etag, size in rows
+    }
+
+
+def save_index_metadata(con, results):
+    con.executemany(
+        "UPDATE listing SET last_modified = ?, etag = ?, size = ? WHERE href = ?",
+        [
+            (r["last_modified"], r["etag"], r["size"], r["link"])
+            for r in results
+            if not r["error"]
+        ],
+    )
+    con.commit()
 
 
 # -- FILTRO --
 
 
-def filter_latest_version(session, candidates):
+def parse_http_date(value):
+    return datetime.strptime(value, "%a, %d %b %Y %H:%M:%S GMT") if value else None
+
+
+def probe_last_modified(session, link, cached=None):
+    """
+    Faz o HEAD de um candidato e retorna seus metadados e o tempo gasto.
+    Com metadados em cache, o HEAD é condicional e um 304 reaproveita o cache.
+    """
+    cached = cached or {}
+    result = {"link": link, "cached": False, "error": None}
+    start = time.perf_counter()
+    try:
+        headers = {}
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        # Força o endpoint de download para pegar o Last-Modified real do arquivo
+        target = link.replace("/view", "/@@download/file")
+        head = session.head(target, headers=headers, timeout=20, allow_redirects=True)
+
+        if head.status_code == 304:
+            result.update(cached, cached=True)
+        else:
+            size = head.headers.get("Content-Length")
+            result.update(
+                last_modified=head.headers.get("Last-Modified"),
+                etag=head.headers.get("ETag"),
+                size=int(size) if size else None,
+            )
+        # Converte string de data do servidor para objeto datetime
+        result["mod_date"] = parse_http_date(result.get("last_modified"))
+    except Exception as e:
+        result.update(mod_date=None, error=e)
+    result["elapsed"] = time.perf_counter() - start
+    return result
+
+
+def filter_latest_version(
+    session, candidates, max_workers=HEAD_MAX_WORKERS, index=None
+):
     logger = get_run_logger()
-    """Analisa os candidatos via HEAD e retorna apenas o link mais recente."""
+    """Analisa os candidatos via HEAD concorrentes e retorna o link mais recente."""
     if not candidates:
         return None
 
-    logger.info(f"[FILTER] Analisando metadados de {len(candidates)} arquivos...")
+    logger.info(
+        f"[FILTER] Analisando metadados de {len(candidates)} arquivos "
+        f"({max_workers} HEADs simultâneos)..."
+    )
+    cache = load_index_metadata(index, candidates) if index else {}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # map preserva a ordem dos candidatos, mantendo o mesmo desempate do laço serial
+        results = list(
+            executor.map(
+                lambda link: probe_last_modified(session, link, cache.get(link)),
+                candidates,
+            )
+        )
+    elapsed = time.perf_counter() - start
+
+    if index:
+        save_index_metadata(index, results)
+
     best_link = None
     latest_date = datetime.min
 
-    for link in candidates:
-        try:
-            # Força o endpoint de download para pegar o Last-Modified real do arquivo
-            target = link.replace("/view", "/@@download/file")
-            head = session.head(target, timeout=20, allow_redirects=True)
-            mod_header = head.headers.get("Last-Modified")
-
-            if mod_header:
-                # Converte string de data do servidor para objeto datetime
-                mod_date = datetime.strptime(mod_header, "%a, %d %b %Y %H:%M:%S GMT")
-
-                if mod_date > latest_date:
-                    latest_date = mod_date
-                    best_link = link
-            else:
-                # Se o servidor não responder a data, mantemos o primeiro como fallback
-                if not best_link:
-                    best_link = link
-        except Exception as e:
-            logger.error(f"Erro ao checar {link}: {e}")
-            if not best_link:
-                best_link = link
+    for result in results:
+        link, mod_date = result["link"], result["mod_date"]
+        if result["error"]:
+            logger.error(f"Erro ao checar {link}: {result['error']}")
+        else:
+            origem = "cache" if result["cached"] else "servidor"
+            logger.info(
+                f"[FILTER] HEAD {link} -> {mod_date} "
+                f"({result['elapsed']:.2f}s, {origem})"
+            )
 
+        if mod_date and mod_date > latest_date:
+            latest_date = mod_date
+            best_link = link
+        elif not best_link:
+            # Sem data (ou com erro), mantemos o primeiro como fallback
+            best_link = link
+
+    serial_time = sum(result["elapsed"] for result in results)
+    logger.info(
+        f"[FILTER] {len(results)} HEADs em {elapsed:.2f}s "
+        f"(soma sequencial: {serial_time:.2f}s)"
+    )
     return best_link
 
 
 # -- DOWNLOAD --
+def parse_total_size(response):
+    """Tamanho total a partir do Content-Range (206) ou do Content-Length (200)."""
+    content_range = response.headers.get("Content-Range")
+    if content_range and "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        return int(total) if total.isdigit() else None
+    length = response.headers.get("Content-Length")
+    return int(length) if length else None
+
+
 def download_with_retry(session, file_url, max_attempts=3):
+    """
+    Baixa o arquivo para um `.part`, retomando via Range a cada falha de conexão.
+    O `.part` só é renomeado depois de conferido o tamanho contra o Content-Length,
+    sem troca de ETag entre as tentativas. Retorna o caminho final ou None.
+    """
     logger = get_run_logger()
-
     download_target = file_url.replace("/view", "/@@download/file")
     filename = file_url.replace("/view", "").split("/")[-1]
     file_path = os.path.join(DOWNLOAD_DIR, filename)
+    part_path = file_path + ".part"
+    etag = None
+    expected_size = None
 
     for attempt in range(1, max_attempts + 1):
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        # Sem compressão, os bytes em disco batem com Content-Length/Content-Range
+        headers = {"Accept-Encoding": "identity"}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            # Se o arquivo mudou no servidor, o If-Range faz ele responder 200 (inteiro)
+            if etag:
+                headers["If-Range"] = etag
+
         try:
-            logger.info(f"[DOWNLOAD] {filename} - Tentativa {attempt}/{max_attempts}")
-            with session.get(download_target, stream=True, timeout=120) as r:
+            logger.info(
+                f"[DOWNLOAD] {filename} - Tentativa {attempt}/{max_attempts}"
+                + (f" (retomando do byte {offset})" if offset else "")
+            )
+            with session.get(
+                download_target, headers=headers, stream=True, timeout=120
+            ) as r:
+                if r.status_code == 416:
+                    # O .part não corresponde mais ao arquivo remoto
+                    logger.warning(f"[AVISO] Range inválido para {filename}")
+                    os.remove(part_path)
+                    continue
                 r.raise_for_status()
-                with open(file_path, "wb") as f:
+
+                new_etag = r.headers.get("ETag")
+                resumed = r.status_code == 206
+                if resumed and etag and new_etag and new_etag != etag:
+                    raise ValueError(f"ETag mudou durante o download: {new_etag}")
+                if not resumed and offset:
+                    logger.warning("[AVISO] Servidor ignorou o Range; recomeçando")
+
+                etag = new_etag or etag
+                expected_size = parse_total_size(r) or expected_size
+
+                with open(part_path, "ab" if resumed else "wb") as f:
                     for chunk in r.iter_content(chunk_size=65536):  # 64KB
                         if chunk:
                             f.write(chunk)
 
-            logger.info(f"[SUCESSO] Download concluído: {filename}")
-            return
+            downloaded = os.path.getsize(part_path)
+            if expected_size is not None and downloaded != expected_size:
+                logger.warning(
+                    f"[AVISO] {filename} incompleto: {downloaded}/{expected_size} bytes"
+                )
+                if downloaded > expected_size:
+                    os.remove(part_path)
+            else:
+                os.replace(part_path, file_path)
+                logger.info(
+                    f"[SUCESSO] Download concluído: {filename} ({downloaded} bytes)"
+                )
+                return file_path
 
         except (
             requests.exceptions.ConnectionError,
             requests.exceptions.ChunkedEncodingError,
+            requests.exceptions.Timeout,
         ) as e:
             logger.warning(
                 f"[AVISO] Conexão interrompida na tentativa {attempt}. Erro: {e}"
             )
-            time.sleep(5)  # Espera um pouco antes de tentar a próxima vez
+        except ValueError as e:
+            logger.warning(f"[AVISO] {e}; descartando download parcial")
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+        if attempt < max_attempts:
+            # Backoff exponencial antes da próxima tentativa
+            time.sleep(DOWNLOAD_BACKOFF * 2 ** (attempt - 1))
 
     logger.error(
         f"[ERRO] Não foi possível baixar {filename} após {max_attempts} tentativas."
     )
+    return None
 
 
 # --- CONVERSÃO DE TIPO DE DADOS
+def raw_blob_name(periodo, typed=False):
+    """Caminho do parquet do período na camada raw (plano ou particionado)."""
+    if typed:
+        ano, mes = periodo.split("-")
+        return f"raw/terceirizados/ano={ano}/mes={mes}/terceirizados_{periodo}.parquet"
+    return f"raw/terceirizados_{periodo}.parquet"
+
+
+def raw_schema_for(colunas, typed=False):
+    """Schema de saída: tipos de RAW_TYPES quando typed, string para o resto."""
+    return pa.schema(
+        [
+            (col, RAW_TYPES.get(col, pa.string()) if typed else pa.string())
+            for col in colunas
+        ]
+    )
+
+
+def write_csv_stream_to_parquet(
+    source, sink, row_group_size=ROW_GROUP_SIZE, typed=False
+):
+    """
+    Converte um CSV (stream binário) para parquet em lotes, sem carregá-lo inteiro.
+    As colunas são lidas como string (ou com o schema declarado, se typed) e cada
+    row group é escrito assim que fica cheio, limitando a memória a ~row_group_size linhas.
+    """
+    # O cabeçalho é lido à parte para declarar o tipo de todas as colunas
+    header = source.readline().decode(CSV_ENCODING)
+    colunas = next(csv.reader([header], delimiter=CSV_DELIMITER))
+    schema = raw_schema_for(colunas, typed)
+
+    reader = pacsv.open_csv(
+        source,
+        read_options=pacsv.ReadOptions(
+            encoding=CSV_ENCODING, block_size=CSV_BLOCK_SIZE, column_names=colunas
+        ),
+        parse_options=pacsv.ParseOptions(delimiter=CSV_DELIMITER),
+        convert_options=pacsv.ConvertOptions(
+            column_types={field.name: field.type for field in schema},
+            strings_can_be_null=True,
+        ),
+    )
+
+    buffer = []
+    buffered_rows = 0
+    total_rows = 0
+    with pq.ParquetWriter(
+        sink,
+        schema,
+        compression=RAW_TYPED_COMPRESSION if typed else "snappy",
+        write_statistics=True,
+    ) as writer:
+        for batch in reader:
+            buffer.append(batch)
+            buffered_rows += batch.num_rows
+
+            # Descarrega apenas row groups completos; o resto fica para o próximo lote
+            if buffered_rows >= row_group_size:
+                table = pa.Table.from_batches(buffer, schema=schema)
+                full_rows = (buffered_rows // row_group_size) * row_group_size
+                writer.write_table(
+                    table.slice(0, full_rows), row_group_size=row_group_size
+                )
+                buffer = table.slice(full_rows).to_batches()
+                buffered_rows -= full_rows
+                total_rows += full_rows
+
+        if buffered_rows:
+            writer.write_table(
+                pa.Table.from_batches(buffer, schema=schema),
+                row_group_size=row_group_size,
+            )
+            total_rows += buffered_rows
+
+    return total_rows
+
+
+def stream_csv_to_parquet(
+    file_path, parquet_path, row_group_size=ROW_GROUP_SIZE, typed=False
+):
+    with open(file_path, "rb") as source:
+        return write_csv_stream_to_parquet(source, parquet_path, row_group_size, typed)
+
+
+def cast_raw_table(table, typed=False):
+    """
+    Converte uma tabela só de strings para o schema de saída com as regras do
+    CSV em streaming: os null_values padrão do pyarrow (inclusive "") viram
+    nulo e as colunas tipadas são convertidas a partir do texto.
+    """
+    null_values = pa.array(pacsv.ConvertOptions().null_values, pa.string())
+    schema = raw_schema_for(table.column_names, typed)
+    columns = []
+    for field, column in zip(schema, table.columns):
+        column = pc.if_else(
+            pc.is_in(column, value_set=null_values),
+            pa.scalar(None, pa.string()),
+            column,
+        )
+        columns.append(column.cast(field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def write_pandas_to_parquet(df, parquet_path, typed=False):
+    """
+    Grava o DataFrame lido como texto (dtype=str, keep_default_na=False) com o
+    mesmo schema do caminho em streaming.
+    """
+    table = cast_raw_table(pa.Table.from_pandas(df, preserve_index=False), typed)
+    pq.write_table(
+        table,
+        parquet_path,
+        compression=RAW_TYPED_COMPRESSION if typed else "snappy",
+    )
+
+
 @task(name="Convert to Parquet")
-def convert_to_parquet(file_path, periodo):
+def convert_to_parquet(
+    file_path,
+    periodo,
+    streaming: bool = True,
+    row_group_size: int = ROW_GROUP_SIZE,
+    typed: bool = False,
+):
     logger = get_run_logger()
     date = datetime.strptime(periodo, "%Y-%m")
     date_str = date.strftime("%Y-%m")
     type_file = file_path.split(".")[-1].lower()
-    if "csv" in type_file:
-        df_tmp = pd.read_csv(file_path, delimiter=";", encoding="latin-1")
-        colunas = df_tmp.columns.tolist()
-        dtype = {col: "string" for col in colunas}
-        df = df_tmp.astype(dtype, errors="ignore")
-        parquet_path = f"terceirizados_{date_str}.parquet"
-        table = pa.Table.from_pandas(df)
-        pq.write_table(table, parquet_path, compression="snappy")
+    # Caminho local espelha o caminho do blob dentro de raw/
+    parquet_path = raw_blob_name(date_str, typed).removeprefix("raw/")
+    Path(parquet_path).parent.mkdir(parents=True, exist_ok=True)
+
+    if "csv" in type_file and streaming:
+        total_rows = stream_csv_to_parquet(
+            file_path, parquet_path, row_group_size, typed
+        )
+        logger.info(
+            f"[CONVERSÃO] {file_path} convertido para {parquet_path} "
+            f"em streaming ({total_rows} linhas, row groups de {row_group_size})"
+        )
+        return parquet_path
+    elif "csv" in type_file:
+        df = pd.read_csv(
+            file_path,
+            delimiter=CSV_DELIMITER,
+            encoding=CSV_ENCODING,
+            dtype=str,
+            keep_default_na=False,
+        )
+        write_pandas_to_parquet(df, parquet_path, typed)
         logger.info(f"[CONVERSÃO] {file_path} convertido para {parquet_path}")
         return parquet_path
     elif "xlsx" in type_file:
-        df_tmp = pd.read_excel(file_path)
-        colunas = df_tmp.columns.tolist()
-        dtype = {col: "string" for col in colunas}
-        df = df_tmp.astype(dtype, errors="ignore")
-        parquet_path = f"terceirizados_{periodo}.parquet"
-        table = pa.Table.from_pandas(df)
-        pq.write_table(table, parquet_path, compression="snappy")
+        df = pd.read_excel(file_path, dtype=str, keep_default_na=False)
+        write_pandas_to_parquet(df, parquet_path, typed)
         logger.info(f"[CONVERSÃO] {file_path} convertido para {parquet_path}")
         return parquet_path
     else:
@@ -246,56 +779,255 @@ def convert_to_parquet(file_path, periodo):
 
 
 # -- SEND TO GCS --
-@task(name="Send to GCS")
-def send_to_gcs(file_path, config):
+@task(name="Send to GCS", cache_policy=NONE)
+def send_to_gcs(file_path, config, client=None):
+    """
+    Envia o parquet local para raw/ no bucket. A falha é relançada: quem
+    chama (flow e backfill) não pode dar o período como enviado.
+    """
     bucket_name = config["bucket_name"]
     destination_blob_name = f"raw/{file_path}"
     logger = get_run_logger()
 
     try:
-        client = storage.Client()
+        client = client or storage.Client()
         bucket = client.bucket(bucket_name)
         blob = bucket.blob(destination_blob_name)
         blob.upload_from_filename(file_path)
         logger.info(f"[GCS] Arquivo enviado para {bucket_name}/{destination_blob_name}")
     except Exception as e:
         logger.error(f"[ERRO] Falha ao enviar para GCS: {e}")
+        raise
+
+
+# -- PIPELINE EM STREAMING (DOWNLOAD -> PARQUET -> GCS) --
+class GCSUploadPipe(io.RawIOBase):
+    """
+    Sink de escrita do ParquetWriter que repassa os bytes para uma thread de upload
+    resumable no GCS. A fila limitada dá backpressure: a conversão só espera
+    quando o upload fica mais de `max_pending` chunks para trás.
+    """
+
+    def __init__(self, blob, chunk_size=UPLOAD_CHUNK_SIZE, max_pending=4):
+        super().__init__()
+        self.chunk_size = chunk_size
+        self.uploaded_bytes = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._buffer = bytearray()
+        self._position = 0
+        self._error = None
+        self._thread = threading.Thread(target=self._upload, args=(blob,), daemon=True)
+        self._thread.start()
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def write(self, data):
+        self._raise_upload_error()
+        self._buffer += data
+        self._position += len(data)
+        if len(self._buffer) >= self.chunk_size:
+            self._queue.put(bytes(self._buffer))
+            self._buffer.clear()
+        return len(data)
+
+    def finish(self):
+        """Envia o restante do buffer e espera o upload ser finalizado no GCS."""
+        if self._buffer:
+            self._queue.put(bytes(self._buffer))
+            self._buffer.clear()
+        self._queue.put(None)
+        self._thread.join()
+        self._raise_upload_error()
+
+    def abort(self):
+        """Cancela o upload resumable; nenhum objeto parcial é criado no bucket."""
+        self._queue.put(_UPLOAD_ABORT)
+        self._thread.join()
+
+    def _raise_upload_error(self):
+        if self._error:
+            raise self._error
+
+    def _upload(self, blob):
+        chunk = b""
+        try:
+            with blob.open("wb", chunk_size=self.chunk_size, ignore_flush=True) as out:
+                while True:
+                    chunk = self._queue.get()
+                    if chunk is None:
+                        break
+                    if chunk is _UPLOAD_ABORT:
+                        raise RuntimeError("Upload cancelado")
+                    out.write(chunk)
+                    self.uploaded_bytes += len(chunk)
+        except Exception as e:
+            self._error = e
+            # Continua consumindo a fila para não travar quem está escrevendo
+            while chunk is not None and chunk is not _UPLOAD_ABORT:
+                chunk = self._queue.get()
+
+
+def stream_to_gcs(
+    session,
+    file_url,
+    periodo,
+    bucket,
+    row_group_size=ROW_GROUP_SIZE,
+    max_attempts=3,
+    typed=False,
+):
+    """
+    Baixa, converte e envia o CSV em um único fluxo: os bytes da resposta HTTP
+    viram row groups parquet que sobem para o GCS enquanto a conversão continua,
+    sem CSV intermediário em disco. Retorna o nome do blob ou None.
+    """
+    logger = get_run_logger()
+    download_target = file_url.replace("/view", "/@@download/file")
+    blob_name = raw_blob_name(periodo, typed)
 
+    for attempt in range(1, max_attempts + 1):
+        logger.info(f"[STREAM] {blob_name} - Tentativa {attempt}/{max_attempts}")
+        start = time.perf_counter()
+        try:
+            with session.get(
+                download_target,
+                headers={"Accept-Encoding": "identity"},
+                stream=True,
+                timeout=120,
+            ) as r:
+                r.raise_for_status()
+                # Mantém o stream "aberto" no EOF para o BufferedReader terminar a leitura
+                r.raw.auto_close = False
+                source = io.BufferedReader(r.raw, buffer_size=CSV_BLOCK_SIZE)
+                pipe = GCSUploadPipe(bucket.blob(blob_name))
+                try:
+                    total_rows = write_csv_stream_to_parquet(
+                        source, pipe, row_group_size, typed
+                    )
+                    pipe.finish()
+                except BaseException:
+                    pipe.abort()
+                    raise
+
+            logger.info(
+                f"[STREAM] {total_rows} linhas, {pipe.uploaded_bytes} bytes enviados "
+                f"para {bucket.name}/{blob_name} em {time.perf_counter() - start:.1f}s"
+            )
+            return blob_name
 
-@task(name="Fetch and download data")
-def fetch_and_download_data(periodo: str):
-    # Passo 1: Busca todos os possíveis
-    data = periodo.strip()
-    session = get_secure_session()
-    candidates = fetch_candidates(session, data)
+        except (
+            requests.exceptions.ConnectionError,
+            requests.exceptions.ChunkedEncodingError,
+            requests.exceptions.Timeout,
+            urllib3.exceptions.HTTPError,
+        ) as e:
+            logger.warning(
+                f"[AVISO] Conexão interrompida na tentativa {attempt}. Erro: {e}"
+            )
+            if attempt < max_attempts:
+                time.sleep(DOWNLOAD_BACKOFF * 2 ** (attempt - 1))
+
+    logger.error(f"[ERRO] Não foi possível gerar {blob_name} em streaming.")
+    return None
+
+
+def resolve_target_link(session, data, use_index=True):
+    """Busca os candidatos do período e retorna o link da versão mais recente."""
     logger = get_run_logger()
+    index = None
+
+    if use_index:
+        index = open_listing_index()
+        refresh_listing_index(session, index)
+        candidates = lookup_candidates(index, data)
+        if not candidates:
+            # O índice pode ter perdido entradas: relê a listagem antes de desistir
+            logger.info("[INDEX] Período fora do índice; refazendo o crawl completo")
+            refresh_listing_index(session, index, full=True)
+            candidates = lookup_candidates(index, data)
+    else:
+        candidates = fetch_candidates(session, data)
 
     if not candidates:
         logger.error("[ERRO] Nenhum arquivo encontrado.")
-        return
+        return None
 
-    # Passo 2: Filtra pela data de modificação
-    target_link = filter_latest_version(session, candidates)
+    # Filtra pela data de modificação
+    target_link = filter_latest_version(session, candidates, index=index)
 
-    if target_link:
-        logger.info("\n[SUCESSO] Arquivo mais recente identificado:")
-        logger.info(f" > {target_link}")
-        download_with_retry(session, target_link)
-    else:
+    if not target_link:
         logger.error("[ERRO] Não foi possível determinar o melhor arquivo.")
+        return None
+
+    logger.info("\n[SUCESSO] Arquivo mais recente identificado:")
+    logger.info(f" > {target_link}")
+    return target_link
 
-    # Passo 3: Converter para Parquet
-    filename = target_link.replace("/view", "").split("/")[-1]
-    local_file_path = os.path.join(DOWNLOAD_DIR, filename)
+
+@task(name="Fetch and download data")
+def fetch_and_download_data(periodo: str, use_index: bool = True):
+    # Passo 1 e 2: Busca os possíveis e filtra pelo mais recente
+    data = periodo.strip()
+    session = get_secure_session()
+    target_link = resolve_target_link(session, data, use_index=use_index)
+
+    if not target_link:
+        return None, data
+
+    # Passo 3: Download (None se não foi possível baixar o arquivo completo)
+    local_file_path = download_with_retry(session, target_link)
     return local_file_path, data
 
 
+@task(name="Fetch and stream data", cache_policy=NONE)
+def fetch_and_stream_data(
+    periodo: str,
+    config,
+    client=None,
+    use_index: bool = True,
+    row_group_size: int = ROW_GROUP_SIZE,
+    typed: bool = False,
+):
+    """Resolve o link do período e gera o parquet no GCS direto da resposta HTTP."""
+    data = periodo.strip()
+    session = get_secure_session()
+    target_link = resolve_target_link(session, data, use_index=use_index)
+
+    if not target_link:
+        return None
+
+    if ".csv" not in target_link.lower():
+        # xlsx precisa de acesso aleatório ao arquivo; segue o caminho em disco
+        local_file_path = download_with_retry(session, target_link)
+        if not local_file_path:
+            return None
+        parquet_path = convert_to_parquet(local_file_path, data, typed=typed)
+        send_to_gcs(parquet_path, config, client=client)
+        return f"raw/{parquet_path}"
+
+    bucket = (client or storage.Client()).bucket(config["bucket_name"])
+    return stream_to_gcs(
+        session, target_link, data, bucket, row_group_size, typed=typed
+    )
+
+
 # --- EXECUÇÃO ---
 @flow(name="pipeline-raw-terceirizados")
-def raw_terceirizados_flow(periodo: str):
+def raw_terceirizados_flow(
+    periodo: str,
+    streaming: bool = True,
+    row_group_size: int = ROW_GROUP_SIZE,
+    use_index: bool = True,
+    pipelined: bool = False,
+    typed: bool = False,
+):
     logger = get_run_logger()
     bucket_name, _ = RAW_BUCKET.replace("gs://", "").split("/")
-    blob_target = f"raw/terceirizados_{periodo}.parquet"
+    blob_target = raw_blob_name(periodo, typed)
 
     # 1. Verificação de Existência (Eficiente)
     dotenv.load_dotenv("/app/.env")  # Carrega as variáveis de ambiente do arquivo .env
@@ -310,15 +1042,38 @@ def raw_terceirizados_flow(periodo: str):
     logger.info(f"[INICIO] Processando dados para o período: {periodo}")
 
     try:
+        if pipelined:
+            # Download, conversão e upload sobrepostos, sem CSV em disco
+            config = load_config()
+            if not fetch_and_stream_data(
+                periodo,
+                config,
+                client=client,
+                use_index=use_index,
+                row_group_size=row_group_size,
+                typed=typed,
+            ):
+                logger.error("[ERRO] Falha ao gerar o parquet em streaming.")
+                return
+
+            logger.info(f"[SUCESSO] Arquivo {blob_target} enviado com sucesso.")
+            return
+
         # Busca e Download
-        local_file_path, data = fetch_and_download_data(periodo)
+        local_file_path, data = fetch_and_download_data(periodo, use_index=use_index)
 
         if not local_file_path:
             logger.error("[ERRO] Falha ao obter o arquivo para download.")
             return
 
         # Conversão e Upload
-        parquet_path = convert_to_parquet(local_file_path, data)
+        parquet_path = convert_to_parquet(
+            local_file_path,
+            data,
+            streaming=streaming,
+            row_group_size=row_group_size,
+            typed=typed,
+        )
 
         # Dica: Passe o bucket ou o client já criado para o send_to_gcs
         config = load_config()
@@ -331,5 +1086,157 @@ def raw_terceirizados_flow(periodo: str):
         raise e
 
 
+# --- BACKFILL ---
+def period_range(inicio: str, fim: str):
+    """Lista os períodos YYYY-MM entre inicio e fim (inclusive)."""
+    current = datetime.strptime(inicio, "%Y-%m")
+    end = datetime.strptime(fim, "%Y-%m")
+    periods = []
+    while current <= end:
+        periods.append(current.strftime("%Y-%m"))
+        year, month = divmod(current.month, 12)
+        current = current.replace(year=current.year + year, month=month + 1)
+    return periods
+
+
+@task(name="Process period", cache_policy=NONE)
+def process_period(
+    session,
+    periodo,
+    target_link,
+    config,
+    client,
+    streaming,
+    row_group_size,
+    pipelined=False,
+    typed=False,
+):
+    """Baixa, converte e envia um único período já resolvido no índice."""
+    logger = get_run_logger()
+    if pipelined and ".csv" in target_link.lower():
+        bucket = client.bucket(config["bucket_name"])
+        if not stream_to_gcs(
+            session, target_link, periodo, bucket, row_group_size, typed=typed
+        ):
+            raise RuntimeError(f"Falha ao gerar o parquet de {periodo} em streaming")
+        logger.info(f"[BACKFILL] {periodo} concluído")
+        return periodo
+
+    local_file_path = download_with_retry(session, target_link)
+    if not local_file_path:
+        raise RuntimeError(f"Falha ao baixar o arquivo de {periodo}")
+
+    parquet_path = convert_to_parquet(
+        local_file_path,
+        periodo,
+        streaming=streaming,
+        row_group_size=row_group_size,
+        typed=typed,
+    )
+    send_to_gcs(parquet_path, config, client=client)
+    logger.info(f"[BACKFILL] {periodo} concluído")
+    return periodo
+
+
+@flow(name="pipeline-raw-terceirizados-backfill")
+def raw_terceirizados_backfill_flow(
+    inicio: str,
+    fim: str = REF_DATE,
+    max_workers: int = BACKFILL_MAX_WORKERS,
+    streaming: bool = True,
+    row_group_size: int = ROW_GROUP_SIZE,
+    pipelined: bool = False,
+    typed: bool = False,
+):
+    """
+    Backfill de vários períodos com um único crawl da listagem e uma única
+    listagem do bucket; download, conversão e upload rodam em até
+    `max_workers` períodos ao mesmo tempo.
+    """
+    logger = get_run_logger()
+    dotenv.load_dotenv("/app/.env")
+    config = load_config()
+    bucket_name, prefix = RAW_BUCKET.replace("gs://", "").split("/")
+
+    # 1. Uma única listagem do bucket em vez de um exists() por período
+    client = storage.Client()
+    existing = {
+        blob.name
+        for blob in client.list_blobs(bucket_name, prefix=f"{prefix}/terceirizados")
+    }
+    periods = [
+        periodo
+        for periodo in period_range(inicio, fim)
+        if raw_blob_name(periodo, typed) not in existing
+    ]
+    logger.info(
+        f"[BACKFILL] {len(periods)} períodos pendentes entre {inicio} e {fim} "
+        f"({len(existing)} arquivos já no bucket)"
+    )
+    if not periods:
+        return []
+
+    # 2. Um único crawl para resolver todos os períodos
+    session = get_secure_session()
+    index = open_listing_index()
+    refresh_listing_index(session, index)
+    candidates = {periodo: lookup_candidates(index, periodo) for periodo in periods}
+    if not all(candidates.values()):
+        # Um único crawl completo para os períodos fora do índice
+        logger.info("[BACKFILL] Períodos fora do índice; refazendo o crawl completo")
+        refresh_listing_index(session, index, full=True)
+        candidates = {
+            periodo: found or lookup_candidates(index, periodo)
+            for periodo, found in candidates.items()
+        }
+
+    resolved = []
+    for periodo in periods:
+        target_link = filter_latest_version(session, candidates[periodo], index=index)
+        if target_link:
+            resolved.append((periodo, target_link))
+        else:
+            logger.warning(f"[BACKFILL] Nenhum arquivo encontrado para {periodo}")
+
+    # 3. Janela deslizante de no máximo max_workers períodos em execução
+    running = []
+    done = []
+    failed = []
+
+    def collect(future):
+        try:
+            done.append(future.result())
+        except Exception as e:
+            logger.error(f"[BACKFILL] Falha em um período: {e}")
+            failed.append(e)
+
+    for periodo, target_link in resolved:
+        if len(running) >= max_workers:
+            collect(running.pop(0))
+        running.append(
+            process_period.submit(
+                session,
+                periodo,
+                target_link,
+                config,
+                client,
+                streaming,
+                row_group_size,
+                pipelined,
+                typed,
+            )
+        )
+    for future in running:
+        collect(future)
+
+    logger.info(
+        f"[BACKFILL] {len(done)} períodos enviados, {len(failed)} com falha: "
+        f"{sorted(done)}"
+    )
+    if failed:
+        raise RuntimeError(f"{len(failed)} períodos falharam no backfill")
+    return sorted(done)
+
+
 if __name__ == "__main__":
     raw_terceirizados_flow(periodo=REF_DATE)
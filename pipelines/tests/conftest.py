@@ -0,0 +1,220 @@
+"""
+Fixtures da pipeline raw: um servidor HTTP local (http.server) no lugar do
+portal do gov.br e um bucket falso no lugar do GCS, sem rede.
+"""
+
+import io
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from pipelines.raw_terceirizados import flow as raw_flow
+
+LAST_MODIFIED = "Wed, 02 Oct 2024 10:00:00 GMT"
+
+
+@pytest.fixture(autouse=True)
+def raw_env(tmp_path, monkeypatch):
+    """Logger comum fora de um flow run, downloads em tmp_path e sem backoff."""
+    monkeypatch.setattr(
+        raw_flow, "get_run_logger", lambda: logging.getLogger("raw_terceirizados")
+    )
+    monkeypatch.setattr(raw_flow, "DOWNLOAD_DIR", tmp_path / "downloads")
+    monkeypatch.setattr(raw_flow, "DOWNLOAD_BACKOFF", 0)
+    (tmp_path / "downloads").mkdir()
+    return raw_flow
+
+
+class FileServer:
+    """
+    Estado do servidor: arquivos por caminho e o comportamento de cada teste.
+    - drop_after: caminho -> lista de bytes enviados antes de derrubar a
+      conexão, um item consumido por GET
+    - ignore_range: responde 200 com o arquivo inteiro mesmo com Range
+    - head_delay: espera em cada HEAD, para medir a concorrência
+    """
+
+    def __init__(self):
+        self.files = {}
+        self.drop_after = {}
+        self.ignore_range = False
+        self.head_delay = 0
+        self.requests = []
+        self.active_heads = 0
+        self.max_active_heads = 0
+        self.lock = threading.Lock()
+        self.url = None
+
+    def add(self, path, body, etag='"v1"', last_modified=LAST_MODIFIED):
+        self.files[path] = {
+            "body": body,
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+
+    def link(self, name):
+        """Link da listagem (/view) para o arquivo servido em /@@download/file."""
+        return f"{self.url}/{name}/view"
+
+
+def make_handler(server):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def file_for_path(self):
+            entry = server.files.get(self.path.replace("/@@download/file", ""))
+            if entry is None:
+                self.send_error(404)
+            return entry
+
+        def send_entry_headers(self, entry, status, length):
+            self.send_response(status)
+            self.send_header("Content-Length", str(length))
+            self.send_header("ETag", entry["etag"])
+            self.send_header("Last-Modified", entry["last_modified"])
+
+        def do_HEAD(self):
+            with server.lock:
+                server.requests.append(("HEAD", self.path, dict(self.headers)))
+                server.active_heads += 1
+                server.max_active_heads = max(
+                    server.max_active_heads, server.active_heads
+                )
+            try:
+                time.sleep(server.head_delay)
+                entry = self.file_for_path()
+                if entry is None:
+                    return
+                if self.headers.get("If-None-Match") == entry["etag"]:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_entry_headers(entry, 200, len(entry["body"]))
+                self.end_headers()
+            finally:
+                with server.lock:
+                    server.active_heads -= 1
+
+        def do_GET(self):
+            with server.lock:
+                server.requests.append(("GET", self.path, dict(self.headers)))
+            entry = self.file_for_path()
+            if entry is None:
+                return
+            body = entry["body"]
+            size = len(body)
+            start = 0
+            byte_range = self.headers.get("Range")
+            if_range = self.headers.get("If-Range")
+            if (
+                byte_range
+                and not server.ignore_range
+                and if_range in (None, entry["etag"])
+            ):
+                start = int(byte_range.removeprefix("bytes=").rstrip("-"))
+                if start >= size:
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{size}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_entry_headers(entry, 206, size - start)
+                self.send_header("Content-Range", f"bytes {start}-{size - 1}/{size}")
+            else:
+                self.send_entry_headers(entry, 200, size)
+            self.end_headers()
+
+            payload = body[start:]
+            drops = server.drop_after.get(self.path.split("/@@")[0])
+            if drops:
+                # Conexão cai no meio do corpo, antes do Content-Length anunciado
+                self.wfile.write(payload[: drops.pop(0)])
+                self.wfile.flush()
+                self.close_connection = True
+                return
+            self.wfile.write(payload)
+
+    return Handler
+
+
+@pytest.fixture
+def file_server():
+    server = FileServer()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(server))
+    server.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    thread = threading.Thread(
+        target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    )
+    thread.start()
+    yield server
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def session():
+    with requests.Session() as session:
+        yield session
+
+
+class FakeWriter(io.BytesIO):
+    """Upload resumable falso: o objeto só passa a existir no close sem erro."""
+
+    def __init__(self, blob):
+        super().__init__()
+        self.blob = blob
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.blob.data = self.getvalue()
+        self.blob.aborted = exc_type is not None
+        return super().__exit__(exc_type, exc, tb)
+
+
+class FakeBlob:
+    def __init__(self, name, fail_after=None):
+        self.name = name
+        self.data = None
+        self.aborted = False
+        self.opened = 0
+        self.fail_after = fail_after
+
+    def open(self, mode, chunk_size=None, ignore_flush=False):
+        self.opened += 1
+        writer = FakeWriter(self)
+        if self.fail_after is not None:
+            write, limit = writer.write, self.fail_after
+
+            def failing_write(data):
+                if writer.tell() + len(data) > limit:
+                    raise ConnectionError("upload recusado")
+                return write(data)
+
+            writer.write = failing_write
+        return writer
+
+
+class FakeBucket:
+    name = "bucket-teste"
+
+    def __init__(self):
+        self.blobs = {}
+
+    def blob(self, name):
+        return self.blobs.setdefault(name, FakeBlob(name))
+
+
+@pytest.fixture
+def bucket():
+    return FakeBucket()
+
+
+def make_csv(rows, header="id_terc;nm_razao_social;vl_mensal_salario", eol="\n"):
+    """CSV latin-1 como o do portal, com `rows` linhas."""
+    lines = [header] + [f"{i};Empresa {i % 3} Ç;{i}.50" for i in range(rows)]
+    return eol.join(lines).encode(raw_flow.CSV_ENCODING) + eol.encode()
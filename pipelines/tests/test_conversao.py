@@ -0,0 +1,62 @@
+import io
+from decimal import Decimal
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from conftest import make_csv
+from pipelines.raw_terceirizados.flow import write_csv_stream_to_parquet
+
+
+def convert(csv_bytes, **kwargs):
+    sink = io.BytesIO()
+    rows = write_csv_stream_to_parquet(io.BytesIO(csv_bytes), sink, **kwargs)
+    sink.seek(0)
+    return rows, pq.ParquetFile(sink)
+
+
+def test_grava_row_groups_cheios_e_o_resto_no_fim():
+    rows, parquet = convert(make_csv(25), row_group_size=10)
+
+    assert rows == 25
+    assert [
+        parquet.metadata.row_group(i).num_rows
+        for i in range(parquet.metadata.num_row_groups)
+    ] == [10, 10, 5]
+    table = parquet.read()
+    assert table["id_terc"].to_pylist() == [str(i) for i in range(25)]
+    assert table["nm_razao_social"][0].as_py() == "Empresa 0 Ç"
+
+
+def test_sem_typed_todas_as_colunas_sao_texto():
+    _, parquet = convert(make_csv(3))
+
+    assert set(parquet.schema_arrow.types) == {pa.string()}
+
+
+def test_typed_converte_as_colunas_declaradas():
+    csv_bytes = make_csv(2) + b"2;Empresa;\n"
+    _, parquet = convert(csv_bytes, typed=True)
+
+    table = parquet.read()
+    assert table.schema.field("id_terc").type == pa.int32()
+    assert table["vl_mensal_salario"].to_pylist() == [
+        Decimal("0.50"),
+        Decimal("1.50"),
+        None,
+    ]
+
+
+def test_cabecalho_entre_aspas_e_fim_de_linha_crlf():
+    csv_bytes = make_csv(
+        4,
+        header='"id_terc";"nm_razao_social";"vl_mensal_salario"',
+        eol="\r\n",
+    )
+
+    rows, parquet = convert(csv_bytes, row_group_size=3)
+
+    table = parquet.read()
+    assert rows == 4
+    assert table.column_names == ["id_terc", "nm_razao_social", "vl_mensal_salario"]
+    assert table["vl_mensal_salario"].to_pylist() == ["0.50", "1.50", "2.50", "3.50"]
@@ -0,0 +1,101 @@
+import os
+
+from pipelines.raw_terceirizados import flow as raw_flow
+from pipelines.raw_terceirizados.flow import download_with_retry
+
+NAME = "terceirizados_202409.csv"
+BODY = bytes(range(256)) * 1000
+# O .part recebe os blocos de 64KB já completos quando a conexão cai
+CHUNK = 65536
+
+
+def gets(file_server):
+    return [headers for method, _, headers in file_server.requests if method == "GET"]
+
+
+def part_path():
+    return raw_flow.DOWNLOAD_DIR / f"{NAME}.part"
+
+
+def test_download_inteiro(file_server, session):
+    file_server.add(f"/{NAME}", BODY)
+
+    path = download_with_retry(session, file_server.link(NAME))
+
+    assert path == os.path.join(raw_flow.DOWNLOAD_DIR, NAME)
+    assert open(path, "rb").read() == BODY
+    assert not part_path().exists()
+    assert "Range" not in gets(file_server)[0]
+
+
+def test_conexao_caida_retoma_com_range_e_if_range(file_server, session):
+    file_server.add(f"/{NAME}", BODY, etag='"abc"')
+    file_server.drop_after[f"/{NAME}"] = [100_000]
+
+    path = download_with_retry(session, file_server.link(NAME))
+
+    assert open(path, "rb").read() == BODY
+    first, second = gets(file_server)
+    assert "Range" not in first
+    assert second["Range"] == f"bytes={CHUNK}-"
+    assert second["If-Range"] == '"abc"'
+
+
+def test_retoma_de_um_part_deixado_por_outro_run(file_server, session):
+    file_server.add(f"/{NAME}", BODY)
+    part_path().write_bytes(BODY[:10_000])
+
+    path = download_with_retry(session, file_server.link(NAME))
+
+    assert open(path, "rb").read() == BODY
+    assert gets(file_server)[0]["Range"] == "bytes=10000-"
+
+
+def test_200_para_um_range_recomeca_do_zero(file_server, session):
+    file_server.add(f"/{NAME}", BODY)
+    file_server.ignore_range = True
+    part_path().write_bytes(b"lixo de outra versao")
+
+    path = download_with_retry(session, file_server.link(NAME))
+
+    # O corpo inteiro sobrescreve o .part em vez de ser anexado a ele
+    assert open(path, "rb").read() == BODY
+    assert gets(file_server)[0]["Range"] == "bytes=20-"
+
+
+def test_arquivo_trocado_no_servidor_baixa_a_versao_nova(
+    file_server, session, monkeypatch
+):
+    file_server.add(f"/{NAME}", BODY, etag='"v1"')
+    file_server.drop_after[f"/{NAME}"] = [100_000]
+
+    def swap_version(seconds):
+        # Entre as tentativas, o portal publica outra versão do arquivo
+        file_server.add(f"/{NAME}", BODY[::-1], etag='"v2"')
+
+    monkeypatch.setattr(raw_flow.time, "sleep", swap_version)
+    path = download_with_retry(session, file_server.link(NAME))
+
+    # If-Range com o ETag antigo: o servidor responde 200 com a versão nova
+    assert gets(file_server)[1]["If-Range"] == '"v1"'
+    assert open(path, "rb").read() == BODY[::-1]
+
+
+def test_part_maior_que_o_arquivo_e_descartado(file_server, session):
+    file_server.add(f"/{NAME}", BODY)
+    part_path().write_bytes(BODY + b"sobra")
+
+    path = download_with_retry(session, file_server.link(NAME))
+
+    # 416 para o Range além do fim: o .part é apagado e o download recomeça
+    assert open(path, "rb").read() == BODY
+    assert "Range" not in gets(file_server)[1]
+
+
+def test_desiste_depois_de_max_attempts(file_server, session):
+    file_server.add(f"/{NAME}", BODY)
+    file_server.drop_after[f"/{NAME}"] = [0, 0, 0]
+
+    assert download_with_retry(session, file_server.link(NAME), max_attempts=3) is None
+    assert len(gets(file_server)) == 3
+    assert not (raw_flow.DOWNLOAD_DIR / NAME).exists()
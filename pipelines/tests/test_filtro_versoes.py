@@ -0,0 +1,92 @@
+from datetime import datetime
+
+from pipelines.raw_terceirizados.flow import (
+    filter_latest_version,
+    open_listing_index,
+    probe_last_modified,
+)
+
+
+def add_versions(file_server, dates):
+    links = []
+    for i, date in enumerate(dates):
+        name = f"terceirizados_202409_v{i}.csv"
+        file_server.add(f"/{name}", b"x" * (i + 1), etag=f'"v{i}"', last_modified=date)
+        links.append(file_server.link(name))
+    return links
+
+
+def test_escolhe_a_versao_mais_recente(file_server, session):
+    links = add_versions(
+        file_server,
+        [
+            "Mon, 02 Sep 2024 10:00:00 GMT",
+            "Thu, 03 Oct 2024 10:00:00 GMT",
+            "Tue, 01 Oct 2024 10:00:00 GMT",
+        ],
+    )
+
+    assert filter_latest_version(session, links) == links[1]
+    # O HEAD vai no endpoint de download, que tem o Last-Modified do arquivo
+    assert {path for _, path, _ in file_server.requests} == {
+        f"/terceirizados_202409_v{i}.csv/@@download/file" for i in range(3)
+    }
+
+
+def test_heads_rodam_em_paralelo(file_server, session):
+    file_server.head_delay = 0.2
+    links = add_versions(file_server, ["Mon, 02 Sep 2024 10:00:00 GMT"] * 4)
+
+    filter_latest_version(session, links, max_workers=4)
+
+    assert file_server.max_active_heads > 1
+
+
+def test_empate_e_falhas_mantem_o_primeiro_candidato(file_server, session):
+    links = add_versions(file_server, ["Mon, 02 Sep 2024 10:00:00 GMT"] * 2)
+    missing = file_server.link("nao_existe.csv")
+
+    assert filter_latest_version(session, links) == links[0]
+    assert filter_latest_version(session, [missing, *links]) == links[0]
+    assert filter_latest_version(session, [missing]) == missing
+
+
+def test_erro_de_conexao_nao_derruba_os_outros_probes(file_server, session):
+    links = add_versions(file_server, ["Mon, 02 Sep 2024 10:00:00 GMT"])
+    offline = "http://127.0.0.1:9/terceirizados_202409.csv/view"
+
+    result = probe_last_modified(session, offline)
+
+    assert result["error"] is not None and result["mod_date"] is None
+    assert filter_latest_version(session, [offline, *links]) == links[0]
+
+
+def test_metadados_do_indice_viram_head_condicional(file_server, session, tmp_path):
+    links = add_versions(file_server, ["Mon, 02 Sep 2024 10:00:00 GMT"])
+    index = open_listing_index(tmp_path / "listing.sqlite")
+    index.execute(
+        "INSERT INTO listing (href, period, seen_at) VALUES (?, '202409', 'x')",
+        [links[0]],
+    )
+
+    filter_latest_version(session, links, index=index)
+    first = index.execute("SELECT last_modified, etag, size FROM listing").fetchone()
+    filter_latest_version(session, links, index=index)
+
+    assert first == ("Mon, 02 Sep 2024 10:00:00 GMT", '"v0"', 1)
+    _, _, headers = file_server.requests[-1]
+    assert headers["If-None-Match"] == '"v0"'
+    # O 304 reaproveita o cache e não apaga os metadados
+    assert (
+        index.execute("SELECT last_modified, etag, size FROM listing").fetchone()
+        == first
+    )
+
+
+def test_probe_converte_a_data_do_servidor(file_server, session):
+    links = add_versions(file_server, ["Thu, 03 Oct 2024 10:00:00 GMT"])
+
+    result = probe_last_modified(session, links[0])
+
+    assert result["mod_date"] == datetime(2024, 10, 3, 10, 0, 0)
+    assert result["size"] == 1
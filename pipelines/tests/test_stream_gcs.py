@@ -0,0 +1,131 @@
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from conftest import FakeBlob, make_csv
+from pipelines.raw_terceirizados.flow import GCSUploadPipe, stream_to_gcs
+
+NAME = "terceirizados_202409.csv"
+BLOB = "raw/terceirizados_2024-09.parquet"
+
+
+def read_blob(blob):
+    return pq.read_table(io.BytesIO(blob.data))
+
+
+def test_pipe_sobe_os_bytes_em_chunks_e_finaliza(bucket):
+    blob = bucket.blob("teste")
+    pipe = GCSUploadPipe(blob, chunk_size=4, max_pending=1)
+
+    for part in (b"ab", b"cdef", b"g"):
+        pipe.write(part)
+    pipe.finish()
+
+    assert blob.data == b"abcdefg"
+    assert pipe.tell() == pipe.uploaded_bytes == 7
+
+
+def test_abort_cancela_o_upload_sem_criar_objeto(bucket):
+    blob = bucket.blob("teste")
+    pipe = GCSUploadPipe(blob, chunk_size=4, max_pending=1)
+    pipe.write(b"abcdefgh")
+
+    pipe.abort()
+
+    assert blob.data is None
+    assert blob.aborted
+    assert not pipe._thread.is_alive()
+
+
+def test_erro_no_upload_chega_a_quem_escreve_sem_travar():
+    blob = FakeBlob("teste", fail_after=8)
+    pipe = GCSUploadPipe(blob, chunk_size=4, max_pending=1)
+
+    with pytest.raises(ConnectionError):
+        # A fila cheia não trava: a thread segue consumindo depois do erro
+        for _ in range(100):
+            pipe.write(b"abcd")
+    pipe.abort()
+
+    assert blob.data is None
+    assert not pipe._thread.is_alive()
+
+
+def test_erro_no_upload_falha_o_stream(file_server, session, bucket):
+    file_server.add(f"/{NAME}", make_csv(50_000))
+    bucket.blobs[BLOB] = FakeBlob(BLOB, fail_after=0)
+
+    with pytest.raises(ConnectionError):
+        stream_to_gcs(
+            session, file_server.link(NAME), "2024-09", bucket, row_group_size=1000
+        )
+
+    assert bucket.blobs[BLOB].data is None
+
+
+def test_stream_converte_e_sobe_o_parquet(file_server, session, bucket):
+    file_server.add(f"/{NAME}", make_csv(25))
+
+    blob_name = stream_to_gcs(
+        session, file_server.link(NAME), "2024-09", bucket, row_group_size=10
+    )
+
+    assert blob_name == BLOB
+    table = read_blob(bucket.blobs[BLOB])
+    assert table.num_rows == 25
+    assert table["id_terc"].to_pylist() == [str(i) for i in range(25)]
+    _, _, headers = file_server.requests[0]
+    assert headers["Accept-Encoding"] == "identity"
+
+
+def test_stream_typed_vai_para_a_particao_ano_mes(file_server, session, bucket):
+    file_server.add(f"/{NAME}", make_csv(3))
+
+    blob_name = stream_to_gcs(
+        session, file_server.link(NAME), "2024-09", bucket, typed=True
+    )
+
+    assert (
+        blob_name == "raw/terceirizados/ano=2024/mes=09/terceirizados_2024-09.parquet"
+    )
+    assert read_blob(bucket.blobs[blob_name]).schema.field("id_terc").type == pa.int32()
+
+
+def test_conexao_caida_aborta_o_upload_e_tenta_de_novo(file_server, session, bucket):
+    csv_bytes = make_csv(50_000)
+    file_server.add(f"/{NAME}", csv_bytes)
+    file_server.drop_after[f"/{NAME}"] = [len(csv_bytes) // 2]
+
+    blob_name = stream_to_gcs(
+        session, file_server.link(NAME), "2024-09", bucket, row_group_size=10_000
+    )
+
+    blob = bucket.blobs[blob_name]
+    # O upload da primeira tentativa foi cancelado; o objeto é o da segunda
+    assert blob.opened == 2
+    assert read_blob(blob).num_rows == 50_000
+
+
+def test_csv_invalido_aborta_o_upload_e_propaga_o_erro(file_server, session, bucket):
+    file_server.add(f"/{NAME}", make_csv(3) + b"1;2;3;4;5\n")
+
+    with pytest.raises(pa.ArrowInvalid):
+        stream_to_gcs(session, file_server.link(NAME), "2024-09", bucket)
+
+    assert bucket.blobs[BLOB].data is None
+    assert bucket.blobs[BLOB].aborted
+
+
+def test_desiste_depois_de_max_attempts(file_server, session, bucket):
+    csv_bytes = make_csv(50_000)
+    file_server.add(f"/{NAME}", csv_bytes)
+    file_server.drop_after[f"/{NAME}"] = [1000, 1000]
+
+    result = stream_to_gcs(
+        session, file_server.link(NAME), "2024-09", bucket, max_attempts=2
+    )
+
+    assert result is None
+    assert bucket.blobs[BLOB].data is None
@@ -2,18 +2,22 @@ import argparse
 import os
 import requests
 import time
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 import re
 import sys
 import yaml
 from google.cloud import storage
-from bs4 import BeautifulSoup
+import lxml.html
 from urllib3.util import Retry
 from requests.adapters import HTTPAdapter
 from datetime import datetime
 import pandas as pd
 import pyarrow as pa
+import pyarrow.csv as pacsv
 import pyarrow.parquet as pq
 import logging
+import csv
 
 logging.basicConfig(level=logging.INFO)
 filename = os.path.basename(__file__)
@@ -23,7 +27,22 @@ logger = logging.getLogger(filename)
 BASE_URL = "https://www.gov.br/cgu/pt-br/acesso-a-informacao/dados-abertos/arquivos/terceirizados/arquivos/"
 DOWNLOAD_DIR = "downloads"
 CONTROL_FILE = "file_control_log.txt"
+INDEX_PATH = os.path.join(DOWNLOAD_DIR, "listing_index.sqlite")
 PAGE_SIZE = 20
+HEAD_MAX_WORKERS = 8  # HEADs simultâneos no servidor do gov.br
+DOWNLOAD_BACKOFF = 5  # segundos; dobra a cada nova tentativa
+CRAWL_MAX_WORKERS = 4  # páginas da listagem buscadas em paralelo
+CRAWL_WAVE_DELAY = 0.5  # pausa entre cada leva de páginas
+ENTRY_XPATH = (
+    "//article[contains(concat(' ', normalize-space(@class), ' '), ' entry ')]"
+)
+PERIOD_NUM_RE = re.compile(r"((?:19|20)\d{2})(0[1-9]|1[0-2])")
+
+# CONVERSÃO EM STREAMING
+CSV_ENCODING = "latin-1"
+CSV_DELIMITER = ";"
+CSV_BLOCK_SIZE = 1 << 20  # 1MB por bloco lido do CSV
+ROW_GROUP_SIZE = 100_000
 
 os.makedirs(DOWNLOAD_DIR, exist_ok=True)
 
@@ -31,6 +50,9 @@ sys.path.append(
     os.path.join(os.path.dirname(__file__), "..")
 )  # Adiciona o diretório pai ao sys.path
 
+# Mesma detecção de ordem da listagem que o flow: o índice é compartilhado
+from pipelines.raw_terceirizados.flow import ListingOrder  # noqa: E402
+
 
 def load_config():
     with open("config/sync_gcs_config.yml", "r") as f:
@@ -63,7 +85,11 @@ def get_secure_session():
     retries = Retry(
         total=5, backoff_factor=3, status_forcelist=[429, 500, 502, 503, 504]
     )
-    session.mount("https://", HTTPAdapter(max_retries=retries))
+    # O pool precisa comportar as requisições concorrentes do filtro de versões
+    session.mount(
+        "https://",
+        HTTPAdapter(max_retries=retries, pool_maxsize=HEAD_MAX_WORKERS),
+    )
     return session
 
 
@@ -90,123 +116,502 @@ def parse_human_input(user_input):
 # -- BUSCA --
 
 
-def fetch_candidates(session, user_input):
+def parse_listing_page(content):
+    """Retorna o primeiro href de cada `article.entry` da página (None se não houver)."""
+    if not content:
+        return []
+
+    tree = lxml.html.fromstring(content)
+    hrefs = []
+    for article in tree.xpath(ENTRY_XPATH):
+        links = article.xpath(".//a[@href]")
+        hrefs.append(links[0].get("href") if links else None)
+    return hrefs
+
+
+def fetch_listing_page(session, start):
+    response = session.get(f"{BASE_URL}?b_start:int={start}", timeout=30)
+    return parse_listing_page(response.content)
+
+
+def crawl_listing(session, max_workers=CRAWL_MAX_WORKERS, first_start=0):
+    """Gera as páginas da listagem em ordem, buscando-as em levas paralelas."""
+    start = first_start
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            starts = [start + i * PAGE_SIZE for i in range(max_workers)]
+            wave = executor.map(lambda s: fetch_listing_page(session, s), starts)
+
+            # As páginas são entregues na ordem da listagem
+            for hrefs in wave:
+                if not hrefs:
+                    return
+                yield hrefs
+                if len(hrefs) < PAGE_SIZE:
+                    return
+
+            start += max_workers * PAGE_SIZE
+            time.sleep(CRAWL_WAVE_DELAY)
+
+
+def extract_period(href):
+    """Extrai o período YYYYMM do nome do arquivo, se houver."""
+    href = href.lower()
+    num_match = PERIOD_NUM_RE.search(href)
+    if num_match:
+        return num_match.group(1) + num_match.group(2)
+
+    year_match = re.search(r"((?:19|20)\d{2})", href)
+    if year_match:
+        for num, name in MONTHS_MAP.items():
+            if name in href:
+                return year_match.group(1) + num
+    return None
+
+
+def href_matches(href, year, m_num, m_name):
+    href = href.lower()
+
+    is_file = ".csv" in href or ".xlsx" in href
+    match_num = f"{year}{m_num}" in href if (year and m_num) else False
+    match_text = (m_name in href and year in href) if (m_name and year) else False
+
+    return is_file and (match_num or match_text)
+
+
+def fetch_candidates(session, user_input, max_workers=CRAWL_MAX_WORKERS):
     year, m_num, m_name = parse_human_input(user_input)
     logger.info(f"[FETCH] Buscando candidatos para: {m_name or m_num}/{year}")
+    target = f"{year}{m_num}" if (year and m_num) else None
 
     candidates = []
-    start = 0
+    pages = 0
+    # Acompanha a ordenação da listagem para saber quando parar antes do fim
+    order = ListingOrder()
+
+    for hrefs in crawl_listing(session, max_workers):
+        pages += 1
+        order.observe(hrefs)
+        candidates += [
+            href for href in hrefs if href and href_matches(href, year, m_num, m_name)
+        ]
+
+        # Listagem em ordem decrescente já passou do período pedido
+        if target and order.is_descending() and order.last_period < target:
+            logger.info(
+                f"[FETCH] Listagem já está em {order.last_period}; "
+                f"encerrando busca na página {pages}"
+            )
+            break
 
-    while True:
-        url = f"{BASE_URL}?b_start:int={start}"
-        response = session.get(url, timeout=30)
-        soup = BeautifulSoup(response.text, "html.parser")
-        articles = soup.find_all("article", class_="entry")
+    logger.info(f"[FETCH] {pages} páginas lidas, {len(candidates)} candidatos")
+    return list(dict.fromkeys(candidates))
+
+
+# -- ÍNDICE LOCAL DA LISTAGEM --
+
+
+def open_listing_index(path=INDEX_PATH):
+    """Abre (ou cria) o índice local período -> links -> metadados HTTP."""
+    con = sqlite3.connect(path)
+    con.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS listing (
+            href TEXT PRIMARY KEY,
+            period TEXT,
+            last_modified TEXT,
+            etag TEXT,
+            size INTEGER,
+            seen_at TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_listing_period ON listing (period);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """
+    )
+    return con
+
+
+def get_index_meta(con, key):
+    row = con.execute("SELECT value FROM meta WHERE key = ?", [key]).fetchone()
+    return row[0] if row else None
+
+
+def set_index_meta(con, key, value):
+    con.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [key, value])
+
+
+def refresh_listing_index(session, con, max_workers=CRAWL_MAX_WORKERS, full=False):
+    """
+    Atualiza o índice com as entradas novas da listagem.
+    A primeira página é pedida com If-Modified-Since; se nada mudou, não há crawl.
+    Após um crawl completo, para na primeira página com entradas já conhecidas,
+    desde que a listagem venha em ordem decrescente de período (ListingOrder).
+    Com `full=True`, relê a listagem inteira, sem If-Modified-Since.
+    """
+    headers = {}
+    listing_modified = get_index_meta(con, "listing_last_modified")
+    if listing_modified and not full:
+        headers["If-Modified-Since"] = listing_modified
+
+    response = session.get(f"{BASE_URL}?b_start:int=0", headers=headers, timeout=30)
+    if response.status_code == 304:
+        logger.info("[INDEX] Listagem não mudou desde a última atualização")
+        return 0
+
+    crawl_complete = get_index_meta(con, "crawl_complete") == "1" and not full
+    order = ListingOrder()
+    now = datetime.now().isoformat(timespec="seconds")
+
+    def insert_page(hrefs):
+        """Insere as entradas da página e diz se alguma delas já era conhecida."""
+        order.observe(hrefs)
+        rows = [(href, extract_period(href), now) for href in hrefs if href]
+        before = con.total_changes
+        con.executemany(
+            "INSERT OR IGNORE INTO listing (href, period, seen_at) VALUES (?, ?, ?)",
+            rows,
+        )
+        added = con.total_changes - before
+        return added, added < len(rows)
+
+    first_page = parse_listing_page(response.content)
+    new_entries, has_known = insert_page(first_page)
+    pages = 1
+    reached_end = len(first_page) < PAGE_SIZE
+    # Listagem ordenada: ao encontrar uma entrada conhecida, o resto já está no
+    # índice. Fora de ordem, entradas novas podem vir depois das conhecidas
+    stopped_early = crawl_complete and has_known and order.is_descending()
+
+    if not (reached_end or stopped_early):
+        for hrefs in crawl_listing(session, max_workers, first_start=PAGE_SIZE):
+            pages += 1
+            added, has_known = insert_page(hrefs)
+            new_entries += added
+            if crawl_complete and has_known and order.is_descending():
+                stopped_early = True
+                break
+        else:
+            reached_end = True
+
+    if reached_end or stopped_early:
+        set_index_meta(con, "crawl_complete", "1")
+        if response.headers.get("Last-Modified"):
+            set_index_meta(
+                con, "listing_last_modified", response.headers["Last-Modified"]
+            )
+    set_index_meta(con, "refreshed_at", now)
+    con.commit()
 
-        if not articles:
-            break
+    logger.info(f"[INDEX] {pages} páginas lidas, {new_entries} entradas novas")
+    return new_entries
 
-        for article in articles:
-            a_tag = article.find("a", href=True)
-            if not a_tag:
-                continue
 
-            href = a_tag["href"].lower()
+def lookup_candidates(con, user_input):
+    """Resolve os candidatos de um período direto no índice local."""
+    year, m_num, m_name = parse_human_input(user_input)
+    rows = con.execute(
+        "SELECT href FROM listing WHERE period = ? ORDER BY rowid", [f"{year}{m_num}"]
+    ).fetchall()
+    candidates = [href for (href,) in rows if href_matches(href, year, m_num, m_name)]
+    logger.info(f"[INDEX] {len(candidates)} candidatos para {m_name or m_num}/{year}")
+    return candidates
+
+
+def load_index_metadata(con, candidates):
+    placeholders = ", ".join("?" for _ in candidates)
+    rows = con.execute(
+        f"SELECT href, last_modified, etag, size FROM listing "
+        f"WHERE href IN ({placeholders})",
+        candidates,
+    ).fetchall()
+    return {
+        href: {"last_modified": last_modified, "etag": etag, "size": size}
+        for href, last_modified, etag, size in rows
+    }
+
+
+def save_index_metadata(con, results):
+    con.executemany(
+        "UPDATE listing SET last_modified = ?, etag = ?, size = ? WHERE href = ?",
+        [
+            (r["last_modified"], r["etag"], r["size"], r["link"])
+            for r in results
+            if not r["error"]
+        ],
+    )
+    con.commit()
 
-            is_file = ".csv" in href or ".xlsx" in href
-            match_num = f"{year}{m_num}" in href if (year and m_num) else False
-            match_text = (
-                (m_name in href and year in href) if (m_name and year) else False
-            )
 
-            if is_file and (match_num or match_text):
-                candidates.append(a_tag["href"])
+# -- FILTRO --
 
-        if len(articles) < PAGE_SIZE:
-            break
-        start += PAGE_SIZE
-        time.sleep(0.5)
 
-    return list(set(candidates))
+def parse_http_date(value):
+    return datetime.strptime(value, "%a, %d %b %Y %H:%M:%S GMT") if value else None
 
 
-# -- FILTRO --
+def probe_last_modified(session, link, cached=None):
+    """
+    Faz o HEAD de um candidato e retorna seus metadados e o tempo gasto.
+    Com metadados em cache, o HEAD é condicional e um 304 reaproveita o cache.
+    """
+    cached = cached or {}
+    result = {"link": link, "cached": False, "error": None}
+    start = time.perf_counter()
+    try:
+        headers = {}
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        # Força o endpoint de download para pegar o Last-Modified real do arquivo
+        target = link.replace("/view", "/@@download/file")
+        head = session.head(target, headers=headers, timeout=20, allow_redirects=True)
+
+        if head.status_code == 304:
+            result.update(cached, cached=True)
+        else:
+            size = head.headers.get("Content-Length")
+            result.update(
+                last_modified=head.headers.get("Last-Modified"),
+                etag=head.headers.get("ETag"),
+                size=int(size) if size else None,
+            )
+        # Converte string de data do servidor para objeto datetime
+        result["mod_date"] = parse_http_date(result.get("last_modified"))
+    except Exception as e:
+        result.update(mod_date=None, error=e)
+    result["elapsed"] = time.perf_counter() - start
+    return result
 
 
-def filter_latest_version(session, candidates):
-    """Analisa os candidatos via HEAD e retorna apenas o link mais recente."""
+def filter_latest_version(
+    session, candidates, max_workers=HEAD_MAX_WORKERS, index=None
+):
+    """Analisa os candidatos via HEAD concorrentes e retorna o link mais recente."""
     if not candidates:
         return None
 
-    logger.info(f"[FILTER] Analisando metadados de {len(candidates)} arquivos...")
+    logger.info(
+        f"[FILTER] Analisando metadados de {len(candidates)} arquivos "
+        f"({max_workers} HEADs simultâneos)..."
+    )
+    cache = load_index_metadata(index, candidates) if index else {}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # map preserva a ordem dos candidatos, mantendo o mesmo desempate do laço serial
+        results = list(
+            executor.map(
+                lambda link: probe_last_modified(session, link, cache.get(link)),
+                candidates,
+            )
+        )
+    elapsed = time.perf_counter() - start
+
+    if index:
+        save_index_metadata(index, results)
+
     best_link = None
     latest_date = datetime.min
 
-    for link in candidates:
-        try:
-            # Força o endpoint de download para pegar o Last-Modified real do arquivo
-            target = link.replace("/view", "/@@download/file")
-            head = session.head(target, timeout=20, allow_redirects=True)
-            mod_header = head.headers.get("Last-Modified")
-
-            if mod_header:
-                # Converte string de data do servidor para objeto datetime
-                mod_date = datetime.strptime(mod_header, "%a, %d %b %Y %H:%M:%S GMT")
-
-                if mod_date > latest_date:
-                    latest_date = mod_date
-                    best_link = link
-            else:
-                # Se o servidor não responder a data, mantemos o primeiro como fallback
-                if not best_link:
-                    best_link = link
-        except Exception as e:
-            logger.error(f"Erro ao checar {link}: {e}")
-            if not best_link:
-                best_link = link
+    for result in results:
+        link, mod_date = result["link"], result["mod_date"]
+        if result["error"]:
+            logger.error(f"Erro ao checar {link}: {result['error']}")
+        else:
+            origem = "cache" if result["cached"] else "servidor"
+            logger.info(
+                f"[FILTER] HEAD {link} -> {mod_date} "
+                f"({result['elapsed']:.2f}s, {origem})"
+            )
 
+        if mod_date and mod_date > latest_date:
+            latest_date = mod_date
+            best_link = link
+        elif not best_link:
+            # Sem data (ou com erro), mantemos o primeiro como fallback
+            best_link = link
+
+    serial_time = sum(result["elapsed"] for result in results)
+    logger.info(
+        f"[FILTER] {len(results)} HEADs em {elapsed:.2f}s "
+        f"(soma sequencial: {serial_time:.2f}s)"
+    )
     return best_link
 
 
 # -- DOWNLOAD --
+def parse_total_size(response):
+    """Tamanho total a partir do Content-Range (206) ou do Content-Length (200)."""
+    content_range = response.headers.get("Content-Range")
+    if content_range and "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        return int(total) if total.isdigit() else None
+    length = response.headers.get("Content-Length")
+    return int(length) if length else None
+
+
 def download_with_retry(session, file_url, max_attempts=3):
+    """
+    Baixa o arquivo para um `.part`, retomando via Range a cada falha de conexão.
+    O `.part` só é renomeado depois de conferido o tamanho contra o Content-Length,
+    sem troca de ETag entre as tentativas. Retorna o caminho final ou None.
+    """
     download_target = file_url.replace("/view", "/@@download/file")
     filename = file_url.replace("/view", "").split("/")[-1]
     file_path = os.path.join(DOWNLOAD_DIR, filename)
+    part_path = file_path + ".part"
+    etag = None
+    expected_size = None
 
     for attempt in range(1, max_attempts + 1):
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        # Sem compressão, os bytes em disco batem com Content-Length/Content-Range
+        headers = {"Accept-Encoding": "identity"}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            # Se o arquivo mudou no servidor, o If-Range faz ele responder 200 (inteiro)
+            if etag:
+                headers["If-Range"] = etag
+
         try:
-            logger.info(f"[DOWNLOAD] {filename} - Tentativa {attempt}/{max_attempts}")
-            with session.get(download_target, stream=True, timeout=120) as r:
+            logger.info(
+                f"[DOWNLOAD] {filename} - Tentativa {attempt}/{max_attempts}"
+                + (f" (retomando do byte {offset})" if offset else "")
+            )
+            with session.get(
+                download_target, headers=headers, stream=True, timeout=120
+            ) as r:
+                if r.status_code == 416:
+                    # O .part não corresponde mais ao arquivo remoto
+                    logger.warning(f"[AVISO] Range inválido para {filename}")
+                    os.remove(part_path)
+                    continue
                 r.raise_for_status()
-                with open(file_path, "wb") as f:
+
+                new_etag = r.headers.get("ETag")
+                resumed = r.status_code == 206
+                if resumed and etag and new_etag and new_etag != etag:
+                    raise ValueError(f"ETag mudou durante o download: {new_etag}")
+                if not resumed and offset:
+                    logger.warning("[AVISO] Servidor ignorou o Range; recomeçando")
+
+                etag = new_etag or etag
+                expected_size = parse_total_size(r) or expected_size
+
+                with open(part_path, "ab" if resumed else "wb") as f:
                     for chunk in r.iter_content(chunk_size=65536):  # 64KB
                         if chunk:
                             f.write(chunk)
 
-            logger.info(f"[SUCESSO] Download concluído: {filename}")
-            return
+            downloaded = os.path.getsize(part_path)
+            if expected_size is not None and downloaded != expected_size:
+                logger.warning(
+                    f"[AVISO] {filename} incompleto: {downloaded}/{expected_size} bytes"
+                )
+                if downloaded > expected_size:
+                    os.remove(part_path)
+            else:
+                os.replace(part_path, file_path)
+                logger.info(
+                    f"[SUCESSO] Download concluído: {filename} ({downloaded} bytes)"
+                )
+                return file_path
 
         except (
             requests.exceptions.ConnectionError,
             requests.exceptions.ChunkedEncodingError,
+            requests.exceptions.Timeout,
         ) as e:
             logger.warning(
                 f"[AVISO] Conexão interrompida na tentativa {attempt}. Erro: {e}"
             )
-            time.sleep(5)  # Espera um pouco antes de tentar a próxima vez
+        except ValueError as e:
+            logger.warning(f"[AVISO] {e}; descartando download parcial")
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+        if attempt < max_attempts:
+            # Backoff exponencial antes da próxima tentativa
+            time.sleep(DOWNLOAD_BACKOFF * 2 ** (attempt - 1))
 
     logger.error(
         f"[ERRO] Não foi possível baixar {filename} após {max_attempts} tentativas."
     )
+    return None
 
 
 # --- CONVERSÃO DE TIPO DE DADOS
-def convert_to_parquet(file_path, periodo):
+def read_csv_header(file_path):
+    with open(file_path, "r", encoding=CSV_ENCODING, newline="") as f:
+        return next(csv.reader(f, delimiter=CSV_DELIMITER))
+
+
+def stream_csv_to_parquet(file_path, parquet_path, row_group_size=ROW_GROUP_SIZE):
+    """
+    Converte o CSV para parquet em lotes, sem carregar o arquivo inteiro.
+    Todas as colunas são lidas como string e cada row group é escrito
+    assim que fica cheio, mantendo a memória limitada a ~row_group_size linhas.
+    """
+    colunas = read_csv_header(file_path)
+    schema = pa.schema([(col, pa.string()) for col in colunas])
+
+    reader = pacsv.open_csv(
+        file_path,
+        read_options=pacsv.ReadOptions(
+            encoding=CSV_ENCODING, block_size=CSV_BLOCK_SIZE
+        ),
+        parse_options=pacsv.ParseOptions(delimiter=CSV_DELIMITER),
+        convert_options=pacsv.ConvertOptions(
+            column_types={col: pa.string() for col in colunas},
+            strings_can_be_null=True,
+        ),
+    )
+
+    buffer = []
+    buffered_rows = 0
+    total_rows = 0
+    with pq.ParquetWriter(parquet_path, schema, compression="snappy") as writer:
+        for batch in reader:
+            buffer.append(batch)
+            buffered_rows += batch.num_rows
+
+            # Descarrega apenas row groups completos; o resto fica para o próximo lote
+            if buffered_rows >= row_group_size:
+                table = pa.Table.from_batches(buffer, schema=schema)
+                full_rows = (buffered_rows // row_group_size) * row_group_size
+                writer.write_table(
+                    table.slice(0, full_rows), row_group_size=row_group_size
+                )
+                buffer = table.slice(full_rows).to_batches()
+                buffered_rows -= full_rows
+                total_rows += full_rows
+
+        if buffered_rows:
+            writer.write_table(
+                pa.Table.from_batches(buffer, schema=schema),
+                row_group_size=row_group_size,
+            )
+            total_rows += buffered_rows
+
+    return total_rows
+
+
+def convert_to_parquet(
+    file_path, periodo, streaming: bool = True, row_group_size: int = ROW_GROUP_SIZE
+):
     date = datetime.strptime(periodo, "%Y-%m")
     date_str = date.strftime("%Y-%m")
     type_file = file_path.split(".")[-1].lower()
-    if "csv" in type_file:
+    if "csv" in type_file and streaming:
+        parquet_path = f"terceirizados_{date_str}.parquet"
+        total_rows = stream_csv_to_parquet(file_path, parquet_path, row_group_size)
+        logger.info(
+            f"[CONVERSÃO] {file_path} convertido para {parquet_path} "
+            f"em streaming ({total_rows} linhas, row groups de {row_group_size})"
+        )
+        return parquet_path
+    elif "csv" in type_file:
         df_tmp = pd.read_csv(file_path)
         colunas = df_tmp.columns.tolist()
         dtype = {col: "string" for col in colunas}
@@ -257,31 +662,66 @@ def main(periodo=None):
         type=str,
         help="Mês e ano do arquivo (ex: 'março 2024' ou '03/2024')",
     )
+    parser.add_argument(
+        "--no-streaming",
+        action="store_true",
+        help="Converte o CSV carregando o arquivo inteiro no pandas",
+    )
+    parser.add_argument(
+        "--no-index",
+        action="store_true",
+        help="Ignora o índice local e percorre a listagem do gov.br",
+    )
+    parser.add_argument(
+        "--row-group-size",
+        type=int,
+        default=ROW_GROUP_SIZE,
+        help="Número de linhas por row group do parquet",
+    )
     args = parser.parse_args()
     data = args.periodo.strip() if not periodo else periodo.strip()
 
-    # # Passo 1: Busca todos os possíveis
+    # # Passo 1: Busca todos os possíveis (no índice local ou na listagem)
     session = get_secure_session()
-    candidates = fetch_candidates(session, data)
+    index = None
+
+    if args.no_index:
+        candidates = fetch_candidates(session, data)
+    else:
+        index = open_listing_index()
+        refresh_listing_index(session, index)
+        candidates = lookup_candidates(index, data)
+        if not candidates:
+            # O índice pode ter perdido entradas: relê a listagem antes de desistir
+            logger.info("[INDEX] Período fora do índice; refazendo o crawl completo")
+            refresh_listing_index(session, index, full=True)
+            candidates = lookup_candidates(index, data)
 
     if not candidates:
         logger.error("[ERRO] Nenhum arquivo encontrado.")
         return
 
     # Passo 2: Filtra pela data de modificação
-    target_link = filter_latest_version(session, candidates)
+    target_link = filter_latest_version(session, candidates, index=index)
 
-    if target_link:
-        logger.info("\n[SUCESSO] Arquivo mais recente identificado:")
-        logger.info(f" > {target_link}")
-        download_with_retry(session, target_link)
-    else:
+    if not target_link:
         logger.error("[ERRO] Não foi possível determinar o melhor arquivo.")
+        return
+
+    logger.info("\n[SUCESSO] Arquivo mais recente identificado:")
+    logger.info(f" > {target_link}")
+    local_file_path = download_with_retry(session, target_link)
+
+    if not local_file_path:
+        sys.exit(1)
 
     # Passo 3: Converter para Parquet
-    filename = target_link.replace("/view", "").split("/")[-1]
-    local_file_path = os.path.join(DOWNLOAD_DIR, filename)
-    parquet_path = convert_to_parquet(local_file_path, data)
+    parquet_path = convert_to_parquet(
+        local_file_path,
+        data,
+        streaming=not args.no_streaming,
+        row_group_size=args.row_group_size,
+    )
 
     # Passo 4: Enviar para GCS
     # Carrega configuração do GCS